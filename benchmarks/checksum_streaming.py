@@ -0,0 +1,65 @@
+"""
+Compare checksum throughput of the buffered, overlapped streaming engine against the original
+1 KiB `iter_chunks` loop.
+
+Usage: python -m benchmarks.checksum_streaming [--size-mib=N] [--buffer-size-mib=N]
+"""
+from argparse import ArgumentParser, Namespace
+from hashlib import sha256
+from io import BytesIO
+from os import urandom
+from time import perf_counter
+from typing import Callable
+
+from botocore.response import StreamingBody
+
+from geostore.check_files_checksums.streaming import update_digest_from_stream
+from geostore.s3 import CHUNK_SIZE
+
+BYTES_PER_MIB = 1024 * 1024
+
+
+def parse_arguments() -> Namespace:
+    argument_parser = ArgumentParser()
+    argument_parser.add_argument("--size-mib", type=int, default=512)
+    argument_parser.add_argument("--buffer-size-mib", type=int, default=8)
+    return argument_parser.parse_args()
+
+
+def chunk_loop(contents: bytes) -> str:
+    digest = sha256()
+    for chunk in StreamingBody(BytesIO(contents), len(contents)).iter_chunks(chunk_size=CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def streaming_engine(contents: bytes, buffer_size: int) -> str:
+    digest = sha256()
+    update_digest_from_stream(
+        digest, StreamingBody(BytesIO(contents), len(contents)), buffer_size=buffer_size
+    )
+    return digest.hexdigest()
+
+
+def measure(name: str, byte_count: int, function: Callable[[], str]) -> str:
+    start = perf_counter()
+    hex_digest = function()
+    elapsed = perf_counter() - start
+    print(f"{name:>20}: {byte_count / BYTES_PER_MIB / elapsed:10.1f} MB/s ({elapsed:.2f} s)")
+    return hex_digest
+
+
+def main() -> None:
+    arguments = parse_arguments()
+    contents = urandom(arguments.size_mib * BYTES_PER_MIB)
+    buffer_size = arguments.buffer_size_mib * BYTES_PER_MIB
+
+    expected = measure("iter_chunks loop", len(contents), lambda: chunk_loop(contents))
+    actual = measure(
+        "streaming engine", len(contents), lambda: streaming_engine(contents, buffer_size)
+    )
+    assert actual == expected, f"Digest mismatch: {actual} != {expected}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Measure end-to-end `ChecksumValidator` throughput for synthetic assets served from a local S3
+stand-in, with DynamoDB replaced by in-memory tables which count the requests made.
+
+Usage: AWS_DEFAULT_REGION=ap-southeast-2 python -m benchmarks.checksum_throughput
+    [--object-count=N] [--object-size-mib=N] [--concurrency=N] [--ranged-get-threshold-mib=N]
+    [--result-writer={buffered,item}]
+
+The region is only needed because `geostore.s3` creates an STS client on import; no AWS requests
+are made.
+"""
+from argparse import ArgumentParser, Namespace
+from hashlib import sha256
+from logging import getLogger
+from os import urandom
+from resource import RUSAGE_SELF, getrusage
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from unittest.mock import patch
+
+from multihash import SHA2_256
+
+from geostore.check_files_checksums.utils import ChecksumValidator
+from geostore.models import DB_KEY_SEPARATOR
+from geostore.processing_assets_model import ProcessingAssetType
+from geostore.s3 import S3_URL_PREFIX
+from geostore.step_function import get_hash_key
+from geostore.validation_results_model import (
+    BufferedValidationResultFactory,
+    ValidationResult,
+    ValidationResultFactory,
+)
+
+from .local_aws import LocalDynamoDB, LocalS3Client
+
+BYTES_PER_MIB = 1024 * 1024
+KIB_PER_MIB = 1024
+SHA256_BYTE_COUNT = 32
+
+ASSETS_TABLE_NAME = "processing-assets"
+RESULTS_TABLE_NAME = "validation-results"
+BUCKET_NAME = "staging"
+
+
+def parse_arguments() -> Namespace:
+    argument_parser = ArgumentParser()
+    argument_parser.add_argument("--object-count", type=int, default=64)
+    argument_parser.add_argument("--object-size-mib", type=int, default=16)
+    argument_parser.add_argument("--concurrency", type=int, default=4)
+    argument_parser.add_argument("--ranged-get-threshold-mib", type=int)
+    argument_parser.add_argument(
+        "--result-writer", choices=["buffered", "item"], default="buffered"
+    )
+    return argument_parser.parse_args()
+
+
+def create_assets(
+    arguments: Namespace, s3_client: LocalS3Client, local_dynamodb: LocalDynamoDB, hash_key: str
+) -> None:
+    items = []
+    for index in range(arguments.object_count):
+        contents = urandom(arguments.object_size_mib * BYTES_PER_MIB)
+        key = f"asset-{index}"
+        s3_client.put_object(Bucket=BUCKET_NAME, Key=key, Body=contents)
+        items.append(
+            {
+                "pk": {"S": hash_key},
+                "sk": {"S": f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}"},
+                "url": {"S": f"{S3_URL_PREFIX}{BUCKET_NAME}/{key}"},
+                "multihash": {
+                    "S": f"{SHA2_256:x}{SHA256_BYTE_COUNT:x}{sha256(contents).hexdigest()}"
+                },
+            }
+        )
+    local_dynamodb.put_items(ASSETS_TABLE_NAME, items)
+
+
+def main() -> None:
+    arguments = parse_arguments()
+    hash_key = get_hash_key("dataset", "version")
+    range_keys = [
+        f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}"
+        for index in range(arguments.object_count)
+    ]
+    ranged_get_threshold = (
+        None
+        if arguments.ranged_get_threshold_mib is None
+        else arguments.ranged_get_threshold_mib * BYTES_PER_MIB
+    )
+
+    with TemporaryDirectory() as root_directory, LocalDynamoDB() as local_dynamodb:
+        s3_client = LocalS3Client(root_directory)
+        create_assets(arguments, s3_client, local_dynamodb, hash_key)
+        getLogger().disabled = True
+
+        with patch(
+            "geostore.check_files_checksums.utils.get_s3_client_for_role", return_value=s3_client
+        ):
+            start = perf_counter()
+            if arguments.result_writer == "buffered":
+                with BufferedValidationResultFactory(
+                    hash_key, RESULTS_TABLE_NAME
+                ) as validation_result_factory:
+                    ChecksumValidator(
+                        ASSETS_TABLE_NAME,
+                        validation_result_factory,
+                        "arn:aws:iam::123456789012:role/benchmark",
+                        getLogger(),
+                        ranged_get_threshold=ranged_get_threshold,
+                    ).validate_all(hash_key, range_keys, arguments.concurrency)
+            else:
+                ChecksumValidator(
+                    ASSETS_TABLE_NAME,
+                    ValidationResultFactory(hash_key, RESULTS_TABLE_NAME),
+                    "arn:aws:iam::123456789012:role/benchmark",
+                    getLogger(),
+                    ranged_get_threshold=ranged_get_threshold,
+                ).validate_all(hash_key, range_keys, arguments.concurrency)
+            elapsed = perf_counter() - start
+
+        results = local_dynamodb.get_items(RESULTS_TABLE_NAME)
+        assert len(results) == arguments.object_count, len(results)
+        assert all(
+            result["result"]["S"] == ValidationResult.PASSED.value for result in results
+        ), results
+
+    byte_count = arguments.object_count * arguments.object_size_mib * BYTES_PER_MIB
+    print(f"{'Throughput':>20}: {byte_count / BYTES_PER_MIB / elapsed:10.1f} MB/s")
+    print(f"{'Objects':>20}: {arguments.object_count / elapsed:10.1f} objects/s")
+    print(f"{'Elapsed':>20}: {elapsed:10.2f} s")
+    print(f"{'Peak RSS':>20}: {getrusage(RUSAGE_SELF).ru_maxrss / KIB_PER_MIB:10.1f} MiB")
+    for operation_name, count in sorted(
+        {**s3_client.call_counts, **local_dynamodb.call_counts}.items()
+    ):
+        print(f"{operation_name:>20}: {count:10d} requests")
+
+
+if __name__ == "__main__":
+    main()
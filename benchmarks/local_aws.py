@@ -0,0 +1,149 @@
+"""
+Minimal local stand-ins for the AWS services used by the benchmarks, so that they measure Geostore
+code rather than the network. Only the operations the benchmarked code paths use are implemented.
+"""
+from os import makedirs, stat
+from os.path import dirname, join
+from threading import Lock
+from typing import Any, Counter, Dict, List, Optional, Tuple
+
+from botocore.response import StreamingBody
+from pynamodb.connection.base import Connection
+
+from geostore.types import JsonObject
+
+DynamoDBItem = Dict[str, Dict[str, Any]]
+
+
+class LocalS3Client:
+    """Serves objects from files under `root_directory`, laid out as `<bucket>/<key>`."""
+
+    def __init__(self, root_directory: str):
+        self.root_directory = root_directory
+        self.call_counts: Counter[str] = Counter()
+
+    def get_path(self, bucket: str, key: str) -> str:
+        return join(self.root_directory, bucket, key)
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes) -> None:  # pylint:disable=invalid-name
+        path = self.get_path(Bucket, Key)
+        makedirs(dirname(path), exist_ok=True)
+        with open(path, "wb") as file_object:
+            file_object.write(Body)
+
+    def head_object(self, Bucket: str, Key: str) -> JsonObject:  # pylint:disable=invalid-name
+        self.call_counts["HeadObject"] += 1
+        return self.get_metadata(Bucket, Key)
+
+    def get_metadata(self, bucket: str, key: str) -> JsonObject:
+        path_stat = stat(self.get_path(bucket, key))
+        return {
+            "ContentLength": path_stat.st_size,
+            "ETag": f'"{path_stat.st_mtime_ns:x}"',
+        }
+
+    def get_object(  # pylint:disable=invalid-name
+        self, Bucket: str, Key: str, Range: Optional[str] = None, **_conditions: str
+    ) -> JsonObject:
+        self.call_counts["GetObject"] += 1
+        response = self.get_metadata(Bucket, Key)
+
+        file_object = open(self.get_path(Bucket, Key), "rb")  # pylint:disable=consider-using-with
+        content_length = response["ContentLength"]
+        if Range is not None:
+            first_byte, last_byte = (int(byte) for byte in Range[len("bytes=") :].split("-"))
+            file_object.seek(first_byte)
+            content_length = min(last_byte + 1, content_length) - first_byte
+
+        response["Body"] = StreamingBody(file_object, content_length)
+        response["ContentLength"] = content_length
+        return response
+
+
+class LocalDynamoDB:
+    """
+    Replaces the PynamoDB connection's API call hook with in-memory tables keyed on `pk` and `sk`,
+    counting the requests made per operation.
+    """
+
+    def __init__(self) -> None:
+        self.tables: Dict[str, Dict[Tuple[str, str], DynamoDBItem]] = {}
+        self.call_counts: Counter[str] = Counter()
+        self.lock = Lock()
+        self.original_make_api_call = Connection._make_api_call  # pylint:disable=protected-access
+
+    def __enter__(self) -> "LocalDynamoDB":
+        local_dynamodb = self
+
+        def make_api_call(
+            _connection: Connection,
+            operation_name: str,
+            operation_kwargs: JsonObject,
+            *_args: Any,
+            **_kwargs: Any,
+        ) -> JsonObject:
+            return local_dynamodb.handle(operation_name, operation_kwargs)
+
+        Connection._make_api_call = make_api_call  # type: ignore[assignment]
+        return self
+
+    def __exit__(self, *_exception_info: object) -> None:
+        Connection._make_api_call = self.original_make_api_call  # type: ignore[assignment]
+
+    def put_items(self, table_name: str, items: List[DynamoDBItem]) -> None:
+        """Seed a table without counting any requests."""
+        table = self.tables.setdefault(table_name, {})
+        for item in items:
+            table[get_key(item)] = item
+
+    def get_items(self, table_name: str) -> List[DynamoDBItem]:
+        return list(self.tables.get(table_name, {}).values())
+
+    def handle(self, operation_name: str, operation_kwargs: JsonObject) -> JsonObject:
+        with self.lock:
+            self.call_counts[operation_name] += 1
+            handler = getattr(self, f"handle_{operation_name.lower()}")
+            response: JsonObject = handler(operation_kwargs)
+            return response
+
+    @staticmethod
+    def handle_describetable(operation_kwargs: JsonObject) -> JsonObject:
+        return {
+            "Table": {
+                "TableName": operation_kwargs["TableName"],
+                "KeySchema": [
+                    {"AttributeName": "pk", "KeyType": "HASH"},
+                    {"AttributeName": "sk", "KeyType": "RANGE"},
+                ],
+                "AttributeDefinitions": [
+                    {"AttributeName": "pk", "AttributeType": "S"},
+                    {"AttributeName": "sk", "AttributeType": "S"},
+                ],
+            }
+        }
+
+    def handle_getitem(self, operation_kwargs: JsonObject) -> JsonObject:
+        table = self.tables.get(operation_kwargs["TableName"], {})
+        item = table.get(get_key(operation_kwargs["Key"]))
+        return {} if item is None else {"Item": item}
+
+    def handle_putitem(self, operation_kwargs: JsonObject) -> JsonObject:
+        self.put_items(operation_kwargs["TableName"], [operation_kwargs["Item"]])
+        return {}
+
+    def handle_batchgetitem(self, operation_kwargs: JsonObject) -> JsonObject:
+        responses = {}
+        for table_name, request in operation_kwargs["RequestItems"].items():
+            table = self.tables.get(table_name, {})
+            keys = (get_key(key) for key in request["Keys"])
+            responses[table_name] = [table[key] for key in keys if key in table]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def handle_batchwriteitem(self, operation_kwargs: JsonObject) -> JsonObject:
+        for table_name, requests in operation_kwargs["RequestItems"].items():
+            self.put_items(table_name, [request["PutRequest"]["Item"] for request in requests])
+        return {"UnprocessedItems": {}}
+
+
+def get_key(item: DynamoDBItem) -> Tuple[str, str]:
+    return item["pk"]["S"], item["sk"]["S"]
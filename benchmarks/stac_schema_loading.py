@@ -0,0 +1,83 @@
+"""
+Measure the cold start cost of the STAC schema validators: importing their module, and the first
+validation with each of them. Each measurement runs in a fresh interpreter, once with the schemas
+read from their individual files and once from the pre-serialised artefact written when bundling
+the Lambda function. Third party modules are imported before measuring.
+
+Needs the schema submodules to be checked out.
+
+Usage: python -m benchmarks.stac_schema_loading [--runs=N]
+"""
+from argparse import ArgumentParser, Namespace
+from json import loads
+from os import remove
+from os.path import exists
+from statistics import median
+from subprocess import run
+from sys import executable
+from typing import Dict, List
+
+from geostore.check_stac_metadata.stac_validators import (
+    SERIALISED_SCHEMAS_PATH,
+    write_serialised_schemas,
+)
+
+CHILD_SCRIPT = """
+from json import dumps
+from time import perf_counter
+
+import jsonschema
+
+start = perf_counter()
+from geostore.check_stac_metadata.stac_validators import (
+    STACCatalogSchemaValidator,
+    STACCollectionSchemaValidator,
+    STACItemSchemaValidator,
+)
+imported = perf_counter()
+for validator in [
+    STACCatalogSchemaValidator, STACCollectionSchemaValidator, STACItemSchemaValidator
+]:
+    list(validator.iter_errors({}))
+validated = perf_counter()
+
+print(dumps({"import": imported - start, "first validation": validated - imported}))
+"""
+
+
+def parse_arguments() -> Namespace:
+    argument_parser = ArgumentParser()
+    argument_parser.add_argument("--runs", type=int, default=10)
+    return argument_parser.parse_args()
+
+
+def measure(runs: int) -> Dict[str, float]:
+    timings: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        output = run([executable, "-c", CHILD_SCRIPT], capture_output=True, check=True, text=True)
+        for phase, seconds in loads(output.stdout).items():
+            timings.setdefault(phase, []).append(seconds)
+    return {phase: median(seconds) for phase, seconds in timings.items()}
+
+
+def main() -> None:
+    arguments = parse_arguments()
+    had_serialised_schemas = exists(SERIALISED_SCHEMAS_PATH)
+
+    try:
+        if had_serialised_schemas:
+            remove(SERIALISED_SCHEMAS_PATH)
+        individual_files = measure(arguments.runs)
+        write_serialised_schemas()
+        serialised = measure(arguments.runs)
+    finally:
+        if not had_serialised_schemas and exists(SERIALISED_SCHEMAS_PATH):
+            remove(SERIALISED_SCHEMAS_PATH)
+
+    print(f"{'Phase':<18} {'Schema files ms':>16} {'Pre-serialised ms':>18}")
+    for phase, seconds in individual_files.items():
+        print(f"{phase:<18} {seconds * 1000:>16.1f} {serialised[phase] * 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Measure how `STACDatasetValidator` traversal time and memory grow with the number of metadata
+files, using synthetic catalogs which are generated on demand rather than held in memory.
+
+The "wide" shape is a catalog of collections with `--items-per-collection` items each, and the
+"deep" shape is a chain of nested catalogs. Schema validation is skipped unless
+`--validate-schemas` is given, so that the traversal itself is measured.
+
+Usage: AWS_DEFAULT_REGION=ap-southeast-2 python -m benchmarks.stac_traversal
+    [--node-counts N [N ...]] [--shape={wide,deep}] [--items-per-collection=N]
+    [--concurrency=N] [--validate-schemas]
+"""
+from argparse import ArgumentParser, Namespace
+from copy import deepcopy
+from io import BytesIO
+from json import dumps
+from resource import RUSAGE_SELF, getrusage
+from time import perf_counter
+from typing import Optional
+from unittest.mock import patch
+
+from botocore.response import StreamingBody
+from linz_logger import LogLevel, set_level
+
+from geostore.check import Check
+from geostore.check_stac_metadata.stac_validators import STAC_TYPE_VALIDATION_MAP
+from geostore.check_stac_metadata.utils import STACDatasetValidator
+from geostore.s3 import S3_URL_PREFIX
+from geostore.stac_format import (
+    STAC_ASSETS_KEY,
+    STAC_FILE_CHECKSUM_KEY,
+    STAC_HREF_KEY,
+    STAC_LINKS_KEY,
+)
+from geostore.types import JsonObject
+from geostore.validation_results_model import ValidationResult, ValidationResultFactory
+from tests.stac_generators import any_asset_name, any_hex_multihash
+from tests.stac_objects import (
+    MINIMAL_VALID_STAC_CATALOG_OBJECT,
+    MINIMAL_VALID_STAC_COLLECTION_OBJECT,
+    MINIMAL_VALID_STAC_ITEM_OBJECT,
+)
+
+KIB_PER_MIB = 1024
+
+BASE_URL = f"{S3_URL_PREFIX}benchmark"
+ROOT_URL = f"{BASE_URL}/catalog.json"
+COLLECTION_FILENAME = "collection.json"
+
+
+class SyntheticCatalog:
+    """Serves generated metadata files with `node_count` files in total, including the root."""
+
+    def __init__(self, node_count: int, shape: str, items_per_collection: int):
+        self.node_count = node_count
+        self.shape = shape
+        self.items_per_collection = items_per_collection
+        self.asset_multihash = any_hex_multihash()
+
+    def read(self, url: str) -> StreamingBody:
+        path = url[len(BASE_URL) + 1 :]
+        if self.shape == "deep":
+            stac_object = self.get_deep_catalog(path)
+        elif url == ROOT_URL:
+            stac_object = self.get_root_catalog()
+        elif path.endswith(COLLECTION_FILENAME):
+            stac_object = self.get_collection(int(path.split("/")[0]))
+        else:
+            stac_object = self.get_item(path)
+
+        contents = dumps(stac_object).encode()
+        return StreamingBody(BytesIO(contents), len(contents))
+
+    def get_deep_catalog(self, path: str) -> JsonObject:
+        depth = 0 if path == "catalog.json" else int(path[: -len(".json")])
+        stac_object = deepcopy(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+        stac_object[STAC_LINKS_KEY] = [{STAC_HREF_KEY: ROOT_URL, "rel": "root"}]
+        if depth + 1 < self.node_count:
+            stac_object[STAC_LINKS_KEY].append(
+                {STAC_HREF_KEY: f"./{depth + 1}.json", "rel": "child"}
+            )
+        return stac_object
+
+    def get_root_catalog(self) -> JsonObject:
+        item_count = self.node_count - 1
+        collection_count = -(-item_count // (self.items_per_collection + 1))
+        stac_object = deepcopy(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+        stac_object[STAC_LINKS_KEY] = [
+            {STAC_HREF_KEY: ROOT_URL, "rel": "root"},
+            *(
+                {STAC_HREF_KEY: f"./{index}/{COLLECTION_FILENAME}", "rel": "child"}
+                for index in range(collection_count)
+            ),
+        ]
+        return stac_object
+
+    def get_collection(self, index: int) -> JsonObject:
+        first_node = 1 + index * (self.items_per_collection + 1)
+        item_count = min(self.items_per_collection, self.node_count - first_node - 1)
+        stac_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+        stac_object[STAC_LINKS_KEY] = [
+            {STAC_HREF_KEY: ROOT_URL, "rel": "root"},
+            *({STAC_HREF_KEY: f"./{item}.json", "rel": "item"} for item in range(item_count)),
+        ]
+        return stac_object
+
+    def get_item(self, path: str) -> JsonObject:
+        directory, filename = path.split("/")
+        stac_object = deepcopy(MINIMAL_VALID_STAC_ITEM_OBJECT)
+        stac_object[STAC_LINKS_KEY] = [
+            {STAC_HREF_KEY: ROOT_URL, "rel": "root"},
+            {STAC_HREF_KEY: f"{BASE_URL}/{directory}/{COLLECTION_FILENAME}", "rel": "parent"},
+        ]
+        stac_object[STAC_ASSETS_KEY] = {
+            any_asset_name(): {
+                STAC_HREF_KEY: filename.replace(".json", ".tif"),
+                STAC_FILE_CHECKSUM_KEY: self.asset_multihash,
+            }
+        }
+        return stac_object
+
+
+class DiscardingValidationResultFactory(ValidationResultFactory):
+    def __init__(self) -> None:  # pylint:disable=super-init-not-called
+        pass
+
+    def save(
+        self,
+        url: str,
+        check: Check,
+        result: ValidationResult,
+        details: Optional[JsonObject] = None,
+    ) -> None:
+        pass
+
+
+class NoOpSchemaValidator:  # pylint:disable=too-few-public-methods
+    @staticmethod
+    def validate(_stac_object: JsonObject) -> None:
+        pass
+
+
+def parse_arguments() -> Namespace:
+    argument_parser = ArgumentParser()
+    argument_parser.add_argument(
+        "--node-counts", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    argument_parser.add_argument("--shape", choices=["wide", "deep"], default="wide")
+    argument_parser.add_argument("--items-per-collection", type=int, default=10_000)
+    argument_parser.add_argument("--concurrency", type=int, default=1)
+    argument_parser.add_argument("--validate-schemas", action="store_true")
+    return argument_parser.parse_args()
+
+
+def main() -> None:
+    arguments = parse_arguments()
+    set_level(LogLevel.warning)
+    schema_validators = (
+        {}
+        if arguments.validate_schemas
+        else {stac_type: NoOpSchemaValidator for stac_type in STAC_TYPE_VALIDATION_MAP}
+    )
+
+    print(f"{'Nodes':>10} {'Seconds':>10} {'Nodes/s':>10} {'Peak RSS MiB':>14}")
+    with patch.dict(STAC_TYPE_VALIDATION_MAP, schema_validators), patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ):
+        for node_count in sorted(arguments.node_counts):
+            catalog = SyntheticCatalog(node_count, arguments.shape, arguments.items_per_collection)
+            validator = STACDatasetValidator(
+                "benchmark",
+                catalog.read,
+                DiscardingValidationResultFactory(),
+                concurrency=arguments.concurrency,
+            )
+
+            start = perf_counter()
+            validator.validate(ROOT_URL)
+            elapsed = perf_counter() - start
+            validator.stop_reading_ahead()
+
+            assert len(validator.dataset_metadata) == node_count, len(validator.dataset_metadata)
+            peak_rss = getrusage(RUSAGE_SELF).ru_maxrss / KIB_PER_MIB
+            print(
+                f"{node_count:>10} {elapsed:>10.2f} {node_count / elapsed:>10.0f} {peak_rss:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -30,3 +30,11 @@ pip install --quiet --cache-dir="$work_dir" --no-deps --requirement="$requiremen
 mkdir --parents "${asset_root}/geostore/${1}"
 cp --archive --update "${script_dir}/"*.py "${asset_root}/geostore/"
 cp --archive --update "${script_dir}/${1}" "${asset_root}/geostore/"
+
+if [[ -f "${asset_root}/geostore/${1}/stac_validators.py" ]]
+then
+    # Pre-serialise, hash and compile the JSON schemas, so that cold starts read one file rather than
+    # one per schema, identify the schema set without hashing every schema, and import the compiled
+    # validators rather than compiling them
+    PYTHONPATH="$asset_root" python -m "geostore.${1}.stac_validators"
+fi
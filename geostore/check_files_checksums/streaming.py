@@ -0,0 +1,121 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from threading import Event, Thread
+from typing import TYPE_CHECKING, Callable, Optional, Tuple, Union
+
+from botocore.response import StreamingBody
+
+if TYPE_CHECKING:
+    from hashlib import _Hash
+else:
+    _Hash = object  # pragma: no mutate
+
+STREAM_BUFFER_SIZE = 8 * 1024 * 1024
+STREAM_BUFFER_COUNT = 2
+
+FilledBuffer = Tuple[bytearray, int]
+StreamEvent = Union[FilledBuffer, Exception, None]
+
+
+def update_digest_from_stream(
+    digest: _Hash,
+    stream: StreamingBody,
+    buffer_size: int = STREAM_BUFFER_SIZE,
+    buffer_count: int = STREAM_BUFFER_COUNT,
+) -> None:
+    """
+    Feed the whole stream into the digest, downloading the next buffer on a separate thread while
+    the current one is being hashed. The buffers are allocated once and reused for the whole stream.
+    However hashing ends, the reader thread is stopped and the stream closed before returning.
+    """
+    free_buffers: "Queue[bytearray]" = Queue()
+    for _ in range(buffer_count):
+        free_buffers.put(bytearray(buffer_size))
+    filled_buffers: "Queue[StreamEvent]" = Queue()
+    stopped = Event()
+
+    reader = Thread(
+        target=read_stream_into_buffers,
+        args=(stream, free_buffers, filled_buffers, stopped),
+        daemon=True,
+    )
+    reader.start()
+
+    try:
+        while (filled_buffer := filled_buffers.get()) is not None:
+            if isinstance(filled_buffer, Exception):
+                raise filled_buffer
+
+            buffer, length = filled_buffer
+            with memoryview(buffer) as view:
+                digest.update(view[:length])
+            free_buffers.put(buffer)
+    finally:
+        stopped.set()
+        # An empty buffer wakes up a reader waiting for a free one, and ends its reading
+        free_buffers.put(bytearray())
+        stream.close()
+        reader.join()
+
+
+def read_stream_into_buffers(
+    stream: StreamingBody,
+    free_buffers: "Queue[bytearray]",
+    filled_buffers: "Queue[StreamEvent]",
+    stopped: Event,
+) -> None:
+    """Producer side of `update_digest_from_stream`; ends with `None` or the exception raised."""
+    try:
+        while not stopped.is_set() and (
+            length := fill_buffer(stream, buffer := free_buffers.get())
+        ):
+            filled_buffers.put((buffer, length))
+        filled_buffers.put(None)
+    except Exception as error:  # pylint:disable=broad-except
+        filled_buffers.put(error)
+
+
+def fill_buffer(stream: StreamingBody, buffer: bytearray) -> int:
+    """Read from the stream until the buffer is full or the stream is exhausted."""
+    readinto = getattr(stream, "readinto", None)
+    length = 0
+    with memoryview(buffer) as view:
+        while length < len(buffer):
+            read_count: Optional[int]
+            if readinto is None:
+                chunk = stream.read(len(buffer) - length)
+                read_count = len(chunk)
+                view[length : length + read_count] = chunk
+            else:
+                read_count = readinto(view[length:])
+
+            if not read_count:
+                break
+            length += read_count
+    return length
+
+
+def update_digest_from_parts(
+    digest: _Hash, read_part: Callable[[int], bytes], part_count: int, max_in_flight: int
+) -> None:
+    """
+    Download parts concurrently while feeding them into the digest strictly in order. At most
+    `max_in_flight` parts are being downloaded or waiting to be hashed at any time, which caps
+    memory use at roughly `max_in_flight + 1` parts.
+    """
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        pending = deque(
+            executor.submit(read_part, index) for index in range(min(max_in_flight, part_count))
+        )
+        next_index = len(pending)
+        try:
+            while pending:
+                part = pending.popleft().result()
+                if next_index < part_count:
+                    pending.append(executor.submit(read_part, next_index))
+                    next_index += 1
+                digest.update(part)
+        finally:
+            for future in pending:
+                future.cancel()
@@ -1,17 +1,50 @@
 #!/usr/bin/env python3
 from argparse import ArgumentParser, Namespace
 from logging import Logger
+from os import sched_getaffinity
+from typing import List
 
 from linz_logger import get_log
 
+from ..api_keys import SUCCESS_KEY
+from ..content_iterator_keys import (
+    ASSETS_TABLE_NAME_KEY,
+    CHECKSUM_CACHE_TABLE_NAME_KEY,
+    FIRST_ITEM_KEY,
+    ITERATION_SIZE_KEY,
+    RESULTS_TABLE_NAME_KEY,
+)
 from ..models import DB_KEY_SEPARATOR
-from ..processing_assets_model import ProcessingAssetType
+from ..processing_assets_model import (
+    ProcessingAssetType,
+    checksum_shard_model_with_meta,
+    get_checksum_shard_range_key,
+)
 from ..step_function import get_hash_key
-from ..validation_results_model import ValidationResultFactory
-from .utils import ChecksumValidator, get_job_offset
+from ..step_function_keys import DATASET_ID_KEY, S3_ROLE_ARN_KEY, VERSION_ID_KEY
+from ..types import JsonObject
+from ..validation_policy import (
+    ValidationPolicy,
+    get_validation_policy,
+    is_version_failure_limit_reached,
+    parse_failure_limit,
+)
+from ..validation_results_model import (
+    BufferedValidationResultFactory,
+    ValidationResultFactory,
+    validation_results_model_with_meta,
+)
+from .utils import (
+    LOG_MESSAGE_VALIDATION_SKIPPED,
+    RANGED_GET_THRESHOLD,
+    ChecksumValidator,
+    get_job_offset,
+)
 
 LOGGER: Logger = get_log()
 
+LAMBDA_CONCURRENCY = 8
+
 
 def parse_arguments() -> Namespace:
     argument_parser = ArgumentParser()
@@ -21,23 +54,139 @@ def parse_arguments() -> Namespace:
     argument_parser.add_argument("--results-table-name", required=True)
     argument_parser.add_argument("--assets-table-name", required=True)
     argument_parser.add_argument("--s3-role-arn", required=True)
+    argument_parser.add_argument("--assets-per-job", type=int, default=1)
+    argument_parser.add_argument("--iteration-size", type=int)
+    argument_parser.add_argument(
+        "--shard-count",
+        type=int,
+        default=0,
+        help="Checksum shards planned for the page; 0 means none, using --assets-per-job instead",
+    )
+    argument_parser.add_argument("--concurrency", type=int, default=1)
+    argument_parser.add_argument(
+        "--processes", type=int, default=1, help="Hashing processes; 0 means one per available CPU"
+    )
+    argument_parser.add_argument("--ranged-get-threshold", type=int, default=RANGED_GET_THRESHOLD)
+    argument_parser.add_argument("--checksum-cache-table-name")
+    argument_parser.add_argument("--force-rehash", action="store_true")
+    argument_parser.add_argument(
+        "--max-failures", type=int, default=0, help="Failures to stop after; 0 means no limit"
+    )
+    argument_parser.add_argument(
+        "--max-failures-per-check",
+        type=int,
+        default=0,
+        help="Failures of each check to save in full; 0 means no limit",
+    )
     return argument_parser.parse_args()
 
 
 def main() -> None:
     arguments = parse_arguments()
-
-    index = arguments.first_item + get_job_offset()
     hash_key = get_hash_key(arguments.dataset_id, arguments.version_id)
-    range_key = f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}"
 
-    validation_result_factory = ValidationResultFactory(hash_key, arguments.results_table_name)
+    # Array jobs of a dataset version stop validating once they have failed enough between them
+    if is_version_failure_limit_reached(
+        validation_results_model_with_meta(arguments.results_table_name),
+        hash_key,
+        get_policy_from_arguments(arguments),
+    ):
+        LOGGER.info(LOG_MESSAGE_VALIDATION_SKIPPED, extra={"hash_key": hash_key})
+        return
 
-    checksum_validator = ChecksumValidator(
-        arguments.assets_table_name, validation_result_factory, arguments.s3_role_arn, LOGGER
+    range_keys = get_job_range_keys(arguments, hash_key)
+    if len(range_keys) == 1:
+        validation_result_factory = ValidationResultFactory(hash_key, arguments.results_table_name)
+        get_checksum_validator(arguments, validation_result_factory).validate(
+            hash_key, range_keys[0]
+        )
+    else:
+        with BufferedValidationResultFactory(
+            hash_key, arguments.results_table_name
+        ) as buffered_validation_result_factory:
+            get_checksum_validator(arguments, buffered_validation_result_factory).validate_all(
+                hash_key, range_keys, arguments.concurrency, get_process_count(arguments.processes)
+            )
+
+
+def get_job_range_keys(arguments: Namespace, hash_key: str) -> List[str]:
+    """
+    A job either checksums the assets of its shard of the page, as planned by the content
+    iterator, or a contiguous range of assets starting at its offset within the page.
+    """
+    if arguments.shard_count > 0:
+        checksum_shard = checksum_shard_model_with_meta(arguments.assets_table_name).get(
+            hash_key,
+            get_checksum_shard_range_key(arguments.first_item, get_job_offset()),
+            consistent_read=True,
+        )
+        return [get_range_key(index) for index in checksum_shard.indexes]
+
+    first_index = arguments.first_item + get_job_offset() * arguments.assets_per_job
+    last_index = first_index + arguments.assets_per_job
+    if arguments.iteration_size is not None:
+        last_index = min(last_index, arguments.first_item + arguments.iteration_size)
+    return get_range_keys(first_index, last_index)
+
+
+def get_checksum_validator(
+    arguments: Namespace, validation_result_factory: ValidationResultFactory
+) -> ChecksumValidator:
+    return ChecksumValidator(
+        arguments.assets_table_name,
+        validation_result_factory,
+        arguments.s3_role_arn,
+        LOGGER,
+        ranged_get_threshold=arguments.ranged_get_threshold,
+        checksum_cache_table_name=arguments.checksum_cache_table_name,
+        force_rehash=arguments.force_rehash,
+        validation_policy=get_policy_from_arguments(arguments),
     )
 
-    checksum_validator.validate(hash_key, range_key)
+
+def get_policy_from_arguments(arguments: Namespace) -> ValidationPolicy:
+    return ValidationPolicy(
+        parse_failure_limit(arguments.max_failures),
+        parse_failure_limit(arguments.max_failures_per_check),
+    )
+
+
+def lambda_handler(event: JsonObject, _context: bytes) -> JsonObject:
+    """
+    Checksum a whole page of small assets in one invocation, for pages the content iterator has
+    found small enough to not be worth scheduling a Batch job for.
+    """
+    hash_key = get_hash_key(event[DATASET_ID_KEY], event[VERSION_ID_KEY])
+    first_index = int(event[FIRST_ITEM_KEY])
+    range_keys = get_range_keys(first_index, first_index + event[ITERATION_SIZE_KEY])
+
+    with BufferedValidationResultFactory(
+        hash_key, event[RESULTS_TABLE_NAME_KEY]
+    ) as validation_result_factory:
+        ChecksumValidator(
+            event[ASSETS_TABLE_NAME_KEY],
+            validation_result_factory,
+            event[S3_ROLE_ARN_KEY],
+            LOGGER,
+            checksum_cache_table_name=event[CHECKSUM_CACHE_TABLE_NAME_KEY],
+            validation_policy=get_validation_policy(event),
+        ).validate_all(hash_key, range_keys, LAMBDA_CONCURRENCY)
+
+    return {SUCCESS_KEY: True}
+
+
+def get_process_count(processes: int) -> int:
+    if processes == 0:
+        return len(sched_getaffinity(0))
+    return processes
+
+
+def get_range_keys(first_index: int, last_index: int) -> List[str]:
+    return [get_range_key(index) for index in range(first_index, last_index)]
+
+
+def get_range_key(index: int) -> str:
+    return f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}"
 
 
 if __name__ == "__main__":
@@ -1,22 +1,69 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from logging import Logger
+from multiprocessing import get_context
 from os import environ
+from typing import TYPE_CHECKING, Callable, Iterable, List, NamedTuple, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 from botocore.exceptions import ClientError
+from linz_logger import get_log
 from multihash import FUNCS, decode
 
 from ..api_keys import MESSAGE_KEY
 from ..check import Check
+from ..checksum_cache_model import checksum_cache_model_with_meta, get_checksum_cache_range_key
 from ..error_response_keys import ERROR_KEY
 from ..logging_keys import LOG_MESSAGE_VALIDATION_COMPLETE
-from ..processing_assets_model import processing_assets_model_with_meta
-from ..s3 import CHUNK_SIZE, get_s3_client_for_role
+from ..processing_assets_model import get_processing_assets, processing_assets_model_with_meta
+from ..s3 import get_s3_client_for_role
+from ..s3_utils import get_bucket_and_key_from_url
 from ..step_function import Outcome
 from ..types import JsonObject
+from ..validation_policy import (
+    ValidationPolicy,
+    apply_validation_policy,
+    is_failure_limit_reached,
+    save_suppressed_failures,
+)
 from ..validation_results_model import ValidationResult, ValidationResultFactory
+from .streaming import fill_buffer, update_digest_from_parts, update_digest_from_stream
+
+if TYPE_CHECKING:
+    from hashlib import _Hash
+
+    from mypy_boto3_s3.type_defs import GetObjectOutputTypeDef, HeadObjectOutputTypeDef
+else:
+    _Hash = object  # pragma: no mutate
+    GetObjectOutputTypeDef = HeadObjectOutputTypeDef = JsonObject  # pragma: no mutate
 
 ARRAY_INDEX_VARIABLE_NAME = "AWS_BATCH_JOB_ARRAY_INDEX"
 
+RANGED_GET_THRESHOLD = 1024 ** 3
+RANGED_GET_PART_SIZE = 16 * 1024 * 1024
+RANGED_GET_MAX_IN_FLIGHT = 8
+
+LOG_MESSAGE_VALIDATION_SKIPPED = "Validation:Skipped"
+
+
+ValidationResultArguments = Tuple[str, Check, ValidationResult, Optional[JsonObject]]
+
+
+class WorkerClientError(NamedTuple):
+    """
+    The parts of a `ClientError` raised in a worker process which are needed to raise it again in
+    the parent process, since the error itself can't be unpickled.
+    """
+
+    code: str
+    message: str
+    operation_name: str
+
+
+WorkerOutcome = Tuple[
+    List[ValidationResultArguments], Optional[Union[Exception, WorkerClientError]]
+]
+
 
 class ChecksumMismatchError(Exception):
     def __init__(self, actual_hex_digest: str):
@@ -25,21 +72,41 @@ class ChecksumMismatchError(Exception):
         self.actual_hex_digest = actual_hex_digest
 
 
-class ChecksumValidator:
-    def __init__(
+class ChecksumValidator:  # pylint:disable=too-many-instance-attributes
+    def __init__(  # pylint:disable=too-many-arguments
         self,
         processing_assets_table_name: str,
         validation_result_factory: ValidationResultFactory,
         s3_role_arn: str,
         logger: Logger,
+        ranged_get_threshold: Optional[int] = RANGED_GET_THRESHOLD,
+        checksum_cache_table_name: Optional[str] = None,
+        force_rehash: bool = False,
+        validation_policy: ValidationPolicy = ValidationPolicy(),
     ):
-        self.validation_result_factory = validation_result_factory
+        self.validation_result_factory = apply_validation_policy(
+            validation_result_factory, validation_policy
+        )
         self.logger = logger
+        self.ranged_get_threshold = ranged_get_threshold
+        self.force_rehash = force_rehash
+        self.worker_arguments = WorkerArguments(
+            processing_assets_table_name,
+            s3_role_arn,
+            ranged_get_threshold,
+            checksum_cache_table_name,
+            force_rehash,
+        )
 
         self.processing_assets_model = processing_assets_model_with_meta(
             processing_assets_table_name
         )
 
+        if checksum_cache_table_name is None:
+            self.checksum_cache_model = None
+        else:
+            self.checksum_cache_model = checksum_cache_model_with_meta(checksum_cache_table_name)
+
         self.s3_client = get_s3_client_for_role(s3_role_arn)
 
     def log_failure(self, content: JsonObject) -> None:
@@ -47,59 +114,297 @@ class ChecksumValidator:
             LOG_MESSAGE_VALIDATION_COMPLETE, extra={"outcome": Outcome.FAILED, "error": content}
         )
 
+    def log_missing_item(self, hash_key: str, range_key: str) -> None:
+        self.log_failure(
+            {
+                ERROR_KEY: {MESSAGE_KEY: "Item does not exist"},
+                "parameters": {"hash_key": hash_key, "range_key": range_key},
+            }
+        )
+
     def validate(self, hash_key: str, range_key: str) -> None:
 
         try:
             item = self.processing_assets_model.get(hash_key, range_key=range_key)
         except self.processing_assets_model.DoesNotExist:
-            self.log_failure(
-                {
-                    ERROR_KEY: {MESSAGE_KEY: "Item does not exist"},
-                    "parameters": {"hash_key": hash_key, "range_key": range_key},
-                }
-            )
+            self.log_missing_item(hash_key, range_key)
             raise
 
+        self.validate_asset(item.url, item.multihash)
+
+    def validate_asset(self, url: str, hex_multihash: str) -> None:
+        if self.is_verified_in_checksum_cache(url, hex_multihash):
+            self.logger.info(
+                LOG_MESSAGE_VALIDATION_COMPLETE,
+                extra={"outcome": Outcome.PASSED, "checksum_cache": "hit"},
+            )
+            self.validation_result_factory.save(url, Check.CHECKSUM, ValidationResult.CACHED)
+            return
+
         try:
-            self.validate_url_multihash(item.url, item.multihash)
+            self.validate_url_multihash(url, hex_multihash)
         except ChecksumMismatchError as error:
             content = {
-                MESSAGE_KEY: f"Checksum mismatch: expected {item.multihash[4:]},"
+                MESSAGE_KEY: f"Checksum mismatch: expected {hex_multihash[4:]},"
                 f" got {error.actual_hex_digest}"
             }
             self.log_failure(content)
             self.validation_result_factory.save(
-                item.url, Check.CHECKSUM, ValidationResult.FAILED, details=content
+                url, Check.CHECKSUM, ValidationResult.FAILED, details=content
             )
         else:
             self.logger.info(LOG_MESSAGE_VALIDATION_COMPLETE, extra={"outcome": Outcome.PASSED})
-            self.validation_result_factory.save(item.url, Check.CHECKSUM, ValidationResult.PASSED)
+            self.validation_result_factory.save(url, Check.CHECKSUM, ValidationResult.PASSED)
+
+    def validate_all(
+        self, hash_key: str, range_keys: Iterable[str], concurrency: int, processes: int = 1
+    ) -> None:
+        """
+        Validate several assets using a bounded thread pool which shares this instance's S3 client
+        and validation result factory. The assets are bulk loaded, and hashing starts as soon as the
+        first page of them has arrived. Every asset is attempted before the first error is raised.
+
+        With more than one process the threads hand each asset over to a pool of worker processes,
+        so hashing can use more than one core. Only the URL and multihash are sent to the workers,
+        which download the objects themselves, and only the validation results are sent back to be
+        saved by this instance's validation result factory.
+
+        Once the validation policy allows no more failures the remaining assets are skipped, and
+        failures it did not allow to be saved are summarised at the end.
+        """
+        try:
+            if processes == 1:
+                self.validate_assets(hash_key, list(range_keys), concurrency, self.validate_asset)
+                return
+
+            with ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=get_context("spawn"),
+                initializer=initialise_worker,
+                initargs=(self.worker_arguments,),
+            ) as process_pool:
+                self.validate_assets(
+                    hash_key,
+                    list(range_keys),
+                    max(concurrency, processes),
+                    partial(self.validate_asset_in_process, process_pool),
+                )
+        finally:
+            save_suppressed_failures(self.validation_result_factory)
+
+    def validate_assets(
+        self,
+        hash_key: str,
+        range_keys: List[str],
+        concurrency: int,
+        validate_asset: Callable[[str, str], None],
+    ) -> None:
+        missing_range_keys = set(range_keys)
+        futures = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for asset in get_processing_assets(self.processing_assets_model, hash_key, range_keys):
+                missing_range_keys.discard(asset.range_key)
+                futures.append(
+                    executor.submit(
+                        self.validate_asset_within_failure_limit,
+                        validate_asset,
+                        asset.url,
+                        asset.multihash,
+                    )
+                )
+
+        for range_key in sorted(missing_range_keys):
+            self.log_missing_item(hash_key, range_key)
+
+        for future in futures:
+            future.result()
+
+        if missing_range_keys:
+            raise self.processing_assets_model.DoesNotExist()
+
+    def validate_asset_within_failure_limit(
+        self, validate_asset: Callable[[str, str], None], url: str, hex_multihash: str
+    ) -> None:
+        if is_failure_limit_reached(self.validation_result_factory):
+            self.logger.debug(LOG_MESSAGE_VALIDATION_SKIPPED, extra={"url": url})
+            return
+        validate_asset(url, hex_multihash)
+
+    def validate_asset_in_process(
+        self, process_pool: Executor, url: str, hex_multihash: str
+    ) -> None:
+        results, error = process_pool.submit(validate_asset_in_worker, url, hex_multihash).result()
+        for result_arguments in results:
+            self.validation_result_factory.save(*result_arguments)
+        if isinstance(error, WorkerClientError):
+            raise ClientError(
+                {"Error": {"Code": error.code, "Message": error.message}}, error.operation_name
+            )
+        if error is not None:
+            raise error
 
     def validate_url_multihash(self, url: str, hex_multihash: str) -> None:
         parsed_url = urlparse(url)
         bucket = parsed_url.netloc
         key = parsed_url.path.lstrip("/")
-        try:
-            url_stream = self.s3_client.get_object(Bucket=bucket, Key=key)["Body"]
-        except ClientError as error:
-            self.validation_result_factory.save(
-                url,
-                Check.STAGING_ACCESS,
-                ValidationResult.FAILED,
-                details={MESSAGE_KEY: str(error)},
-            )
-            raise
-
         checksum_function_code = int(hex_multihash[:2], 16)
         checksum_function = FUNCS[checksum_function_code]
-
         file_digest = checksum_function()
-        for chunk in url_stream.iter_chunks(chunk_size=CHUNK_SIZE):
-            file_digest.update(chunk)
+
+        try:
+            response = self.s3_client.get_object(Bucket=bucket, Key=key)
+            content_length = response.get("ContentLength")
+            if (
+                self.ranged_get_threshold is None
+                or content_length is None
+                or content_length <= self.ranged_get_threshold
+            ):
+                update_digest_from_stream(file_digest, response["Body"])
+            else:
+                self.update_digest_from_ranges(file_digest, bucket, key, response, content_length)
+        except ClientError as error:
+            self.save_staging_access_failure(url, error)
+            raise
 
         if file_digest.digest() != decode(bytes.fromhex(hex_multihash)):
             raise ChecksumMismatchError(file_digest.hexdigest())
 
+        if self.checksum_cache_model is not None:
+            self.checksum_cache_model(
+                hash_key=url, range_key=get_checksum_cache_range_key_for(response, hex_multihash)
+            ).save()
+
+    def is_verified_in_checksum_cache(self, url: str, hex_multihash: str) -> bool:
+        """
+        Look up the current identity of the object, as reported by a HEAD request, in the cache of
+        previously verified checksums.
+        """
+        if self.checksum_cache_model is None or self.force_rehash:
+            return False
+
+        bucket, key = get_bucket_and_key_from_url(url)
+        try:
+            response = self.s3_client.head_object(Bucket=bucket, Key=key)
+        except ClientError as error:
+            self.save_staging_access_failure(url, error)
+            raise
+
+        try:
+            self.checksum_cache_model.get(
+                url, range_key=get_checksum_cache_range_key_for(response, hex_multihash)
+            )
+        except self.checksum_cache_model.DoesNotExist:
+            return False
+        return True
+
+    def save_staging_access_failure(self, url: str, error: ClientError) -> None:
+        self.validation_result_factory.save(
+            url,
+            Check.STAGING_ACCESS,
+            ValidationResult.FAILED,
+            details={MESSAGE_KEY: str(error)},
+        )
+
+    def update_digest_from_ranges(  # pylint:disable=too-many-arguments
+        self,
+        file_digest: _Hash,
+        bucket: str,
+        key: str,
+        response: GetObjectOutputTypeDef,
+        content_length: int,
+    ) -> None:
+        """
+        Hash a large object by reading the first part from the already open response while
+        concurrent byte-range GETs fetch the rest. Every range is pinned to the version which was
+        first opened, so the digest can't mix two versions of the object.
+        """
+        if "VersionId" in response:
+            version_condition = {"VersionId": response["VersionId"]}
+        else:
+            version_condition = {"IfMatch": response["ETag"]}
+
+        def read_part(index: int) -> bytes:
+            if index == 0:
+                buffer = bytearray(RANGED_GET_PART_SIZE)
+                length = fill_buffer(response["Body"], buffer)
+                response["Body"].close()
+                with memoryview(buffer) as view:
+                    return view[:length].tobytes()
+
+            first_byte = index * RANGED_GET_PART_SIZE
+            last_byte = min(first_byte + RANGED_GET_PART_SIZE, content_length) - 1
+            part_response = self.s3_client.get_object(
+                Bucket=bucket,
+                Key=key,
+                Range=f"bytes={first_byte}-{last_byte}",
+                **version_condition,
+            )
+            return part_response["Body"].read()
+
+        part_count = -(-content_length // RANGED_GET_PART_SIZE)
+        update_digest_from_parts(file_digest, read_part, part_count, RANGED_GET_MAX_IN_FLIGHT)
+
+
+class WorkerArguments(NamedTuple):
+    processing_assets_table_name: str
+    s3_role_arn: str
+    ranged_get_threshold: Optional[int]
+    checksum_cache_table_name: Optional[str]
+    force_rehash: bool
+
+
+class ValidationResultCollector(ValidationResultFactory):  # pylint:disable=too-few-public-methods
+    """Keeps the results saved in a worker process, to be sent back to the parent process."""
+
+    def __init__(self) -> None:  # pylint:disable=super-init-not-called
+        self.results: List[ValidationResultArguments] = []
+
+    def save(
+        self, url: str, check: Check, result: ValidationResult, details: Optional[JsonObject] = None
+    ) -> None:
+        self.results.append((url, check, result, details))
+
+
+WORKER_CHECKSUM_VALIDATOR: Optional[ChecksumValidator] = None
+
+
+def initialise_worker(arguments: WorkerArguments) -> None:
+    global WORKER_CHECKSUM_VALIDATOR  # pylint:disable=global-statement
+    WORKER_CHECKSUM_VALIDATOR = ChecksumValidator(
+        arguments.processing_assets_table_name,
+        ValidationResultCollector(),
+        arguments.s3_role_arn,
+        get_log(),
+        ranged_get_threshold=arguments.ranged_get_threshold,
+        checksum_cache_table_name=arguments.checksum_cache_table_name,
+        force_rehash=arguments.force_rehash,
+    )
+
+
+def validate_asset_in_worker(url: str, hex_multihash: str) -> WorkerOutcome:
+    assert WORKER_CHECKSUM_VALIDATOR is not None
+    validation_result_collector = ValidationResultCollector()
+    WORKER_CHECKSUM_VALIDATOR.validation_result_factory = validation_result_collector
+    try:
+        WORKER_CHECKSUM_VALIDATOR.validate_asset(url, hex_multihash)
+    except ClientError as error:
+        return validation_result_collector.results, WorkerClientError(
+            error.response["Error"].get("Code", ""),
+            error.response["Error"].get("Message", ""),
+            error.operation_name,
+        )
+    except Exception as error:  # pylint:disable=broad-except
+        return validation_result_collector.results, error
+    return validation_result_collector.results, None
+
+
+def get_checksum_cache_range_key_for(
+    response: Union[GetObjectOutputTypeDef, HeadObjectOutputTypeDef], hex_multihash: str
+) -> str:
+    return get_checksum_cache_range_key(
+        response["ETag"], response.get("VersionId"), response["ContentLength"], hex_multihash
+    )
+
 
 def get_job_offset() -> int:
     return int(environ.get(ARRAY_INDEX_VARIABLE_NAME, 0))
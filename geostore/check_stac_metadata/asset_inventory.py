@@ -0,0 +1,38 @@
+"""
+Inventory of the asset files of a dataset, listed rather than requested one by one, so that
+missing files are found before any of them are downloaded.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+ASSET_INVENTORY_CONCURRENCY = 16
+
+# Yields the URL and size of each object directly within a directory URL
+ObjectLister = Callable[[str], Iterator[Tuple[str, int]]]
+
+
+def get_directory_url(url: str) -> str:
+    return url[: url.rindex("/") + 1]
+
+
+def get_object_sizes(object_lister: ObjectLister, urls: Iterable[str]) -> Dict[str, int]:
+    """
+    Sizes of the objects at `urls` which exist. Each directory containing any of them is listed
+    once, on up to `ASSET_INVENTORY_CONCURRENCY` threads, and other objects in those directories
+    are ignored.
+    """
+    wanted_urls = set(urls)
+    directory_urls = list(dict.fromkeys(map(get_directory_url, wanted_urls)))
+    if not directory_urls:
+        return {}
+
+    def list_wanted_objects(directory_url: str) -> List[Tuple[str, int]]:
+        return [(url, size) for url, size in object_lister(directory_url) if url in wanted_urls]
+
+    sizes: Dict[str, int] = {}
+    with ThreadPoolExecutor(
+        max_workers=min(ASSET_INVENTORY_CONCURRENCY, len(directory_urls))
+    ) as executor:
+        for objects in executor.map(list_wanted_objects, directory_urls):
+            sizes.update(objects)
+    return sizes
@@ -0,0 +1,125 @@
+"""
+Compact storage for the very many metadata files and assets found while validating a dataset.
+"""
+from os import pread
+from re import compile as compile_pattern
+from tempfile import TemporaryFile
+from types import TracebackType
+from typing import IO, Callable, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple, Type
+
+FIELD_SEPARATOR = "\0"
+RECORD_SEPARATOR = "\n"
+ESCAPED_CHARACTER_PATTERN = compile_pattern(r"[\\\0\n]")
+ESCAPE_SEQUENCE_PATTERN = compile_pattern(r"\\[\\0n]")
+UNESCAPED_CHARACTERS = {"\\\\": "\\", "\\0": FIELD_SEPARATOR, "\\n": RECORD_SEPARATOR}
+
+READ_CHUNK_SIZE = 1024 * 1024
+RECORD_SPOOL_MEMORY_BUDGET = 16 * 1024 * 1024
+
+
+class RecordSpool:
+    """
+    An append-only list of records with the same string fields. Records are kept as lines of
+    UTF-8 in one byte buffer rather than as a dictionary each, with fields separated by NUL
+    characters, and backslashes, NUL and newline characters escaped. Whenever the buffer grows past
+    `memory_budget` bytes it is moved to a temporary file, calling `on_spill` with its size.
+
+    Iterating yields new dictionaries in the order the records were appended. Several threads can
+    iterate at the same time, as long as nothing is appended meanwhile. Closing the spool, or
+    leaving its `with` block, deletes the temporary file and leaves the spool empty.
+    """
+
+    def __init__(
+        self,
+        keys: Sequence[str],
+        memory_budget: int = RECORD_SPOOL_MEMORY_BUDGET,
+        on_spill: Optional[Callable[[int], None]] = None,
+    ):
+        self.keys = tuple(keys)
+        self.memory_budget = memory_budget
+        self.on_spill = on_spill
+        self.buffer = bytearray()
+        self.spill_file: Optional[IO[bytes]] = None
+        self.spilled_size = 0
+        self.length = 0
+
+    def append(self, record: Mapping[str, str]) -> None:
+        fields = [escape(record[key]) for key in self.keys]
+        self.buffer += f"{FIELD_SEPARATOR.join(fields)}{RECORD_SEPARATOR}".encode()
+        self.length += 1
+
+        if len(self.buffer) > self.memory_budget:
+            self.spill()
+
+    def extend(self, records: Iterable[Mapping[str, str]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def spill(self) -> None:
+        if self.spill_file is None:
+            self.spill_file = TemporaryFile()  # pylint:disable=consider-using-with
+        self.spill_file.write(self.buffer)
+        self.spill_file.flush()
+        self.spilled_size += len(self.buffer)
+        if self.on_spill is not None:
+            self.on_spill(len(self.buffer))
+        self.buffer = bytearray()
+
+    def close(self) -> None:
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+        self.buffer = bytearray()
+        self.spilled_size = 0
+        self.length = 0
+
+    def __enter__(self) -> "RecordSpool":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        remainder = b""
+        offset = 0
+        while offset < self.spilled_size:
+            assert self.spill_file is not None
+            # Positional reads, so that concurrent iterations don't move each other's position
+            data = remainder + pread(self.spill_file.fileno(), READ_CHUNK_SIZE, offset)
+            offset += len(data) - len(remainder)
+            lines, remainder = split_complete_lines(data)
+            yield from self.decode(lines)
+
+        yield from self.decode(bytes(self.buffer))
+
+    def decode(self, lines: bytes) -> Iterator[Dict[str, str]]:
+        text = lines.decode()
+        has_escape_sequences = "\\" in text
+        for record in text.split(RECORD_SEPARATOR)[:-1]:
+            fields = record.split(FIELD_SEPARATOR)
+            yield dict(zip(self.keys, map(unescape, fields) if has_escape_sequences else fields))
+
+    def __len__(self) -> int:
+        return self.length
+
+
+def split_complete_lines(data: bytes) -> Tuple[bytes, bytes]:
+    end = data.rfind(RECORD_SEPARATOR.encode()) + 1
+    return data[:end], data[end:]
+
+
+def escape(value: str) -> str:
+    if ESCAPED_CHARACTER_PATTERN.search(value) is None:
+        return value
+    return (
+        value.replace("\\", "\\\\").replace(FIELD_SEPARATOR, "\\0").replace(RECORD_SEPARATOR, "\\n")
+    )
+
+
+def unescape(value: str) -> str:
+    return ESCAPE_SEQUENCE_PATTERN.sub(lambda match: UNESCAPED_CHARACTERS[match.group()], value)
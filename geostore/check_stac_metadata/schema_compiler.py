@@ -0,0 +1,459 @@
+"""
+Compile JSON schemas into specialised Python validation functions.
+
+The generated code mirrors the Draft 7 keyword semantics of the `jsonschema` validator it is
+compiled from, including its resolver and format checker, but only answers whether a document is
+valid. `CompiledSchemaValidator` re-runs the original validator on failure, so errors are exactly
+the ones `jsonschema` reports.
+"""
+from fractions import Fraction
+from hashlib import sha256
+from importlib.util import module_from_spec, spec_from_file_location
+from json import dumps
+from math import isfinite
+from numbers import Number
+from os import makedirs, replace
+from os.path import basename, exists, join, splitext
+from tempfile import NamedTemporaryFile
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+from jsonschema import Draft7Validator
+from jsonschema._utils import equal, unbool, uniq
+
+COMPILER_VERSION = 1
+
+SchemaType = Union[bool, Dict[str, Any]]
+KeywordGenerator = Callable[[Any, Dict[str, Any], str], List[str]]
+
+TYPE_EXPRESSIONS = {
+    "array": "isinstance(data, list)",
+    "boolean": "isinstance(data, bool)",
+    "integer": "is_integer(data)",
+    "null": "data is None",
+    "number": "is_number(data)",
+    "object": "isinstance(data, dict)",
+    "string": "isinstance(data, str)",
+}
+
+# Conditions under which a document fails keywords which only compare it to the keyword value
+VALUE_CONDITIONS = {
+    "const": "not equal(data, {0})",
+    "exclusiveMaximum": "is_number(data) and data >= {0}",
+    "exclusiveMinimum": "is_number(data) and data <= {0}",
+    "maxItems": "isinstance(data, list) and len(data) > {0}",
+    "maxLength": "isinstance(data, str) and len(data) > {0}",
+    "maxProperties": "isinstance(data, dict) and len(data) > {0}",
+    "maximum": "is_number(data) and data > {0}",
+    "minItems": "isinstance(data, list) and len(data) < {0}",
+    "minLength": "isinstance(data, str) and len(data) < {0}",
+    "minProperties": "isinstance(data, dict) and len(data) < {0}",
+    "minimum": "is_number(data) and data < {0}",
+    "multipleOf": "is_number(data) and not is_multiple_of(data, {0})",
+    "required": "isinstance(data, dict) and any(each not in data for each in {0})",
+    "uniqueItems": "{0} and isinstance(data, list) and not uniq(data)",
+}
+
+
+class UnsupportedSchemaError(Exception):
+    pass
+
+
+class CompiledSchemaValidator:  # pylint:disable=too-few-public-methods
+    """Drop-in replacement for a `jsonschema` validator's `validate` method."""
+
+    def __init__(
+        self,
+        validator: Draft7Validator,
+        cache_directory: str,
+        packaged_module_path: Optional[str] = None,
+    ):
+        self.validator = validator
+        self.is_valid = load_compiled_validator(validator, cache_directory, packaged_module_path)
+
+    def validate(self, instance: Any) -> None:
+        if not self.is_valid(instance):
+            self.validator.validate(instance)
+
+
+def load_compiled_validator(
+    validator: Draft7Validator, cache_directory: str, packaged_module_path: Optional[str] = None
+) -> Callable[[Any], bool]:
+    """
+    Import the module at `packaged_module_path` if it exists, which has to be generated from the
+    validator's schemas. Otherwise compile the validator's schema unless a module generated from
+    the same schemas is already in the cache directory, then import it. Python caches the module's
+    bytecode next to it.
+    """
+    if packaged_module_path is not None and exists(packaged_module_path):
+        module_path = packaged_module_path
+    else:
+        module_path = compile_into_cache_directory(validator, cache_directory)
+
+    module_name = splitext(basename(module_path))[0]
+    spec = spec_from_file_location(f"geostore_compiled_{module_name}", module_path)
+    assert spec is not None and spec.loader is not None
+    module = module_from_spec(spec)
+    module.__dict__.update(get_runtime_namespace(validator))
+    spec.loader.exec_module(module)
+    is_valid: Callable[[Any], bool] = module.validate
+    return is_valid
+
+
+def compile_into_cache_directory(validator: Draft7Validator, cache_directory: str) -> str:
+    module_path = join(cache_directory, f"schema_{get_cache_key(validator)}.py")
+    if not exists(module_path):
+        source = SchemaCompiler(validator).compile()
+        makedirs(cache_directory, exist_ok=True)
+        with NamedTemporaryFile("w", dir=cache_directory, suffix=".tmp", delete=False) as file_:
+            file_.write(source)
+        replace(file_.name, module_path)
+    return module_path
+
+
+def get_cache_key(validator: Draft7Validator) -> str:
+    cache_input = {
+        "compiler_version": COMPILER_VERSION,
+        "schema": validator.schema,
+        "scope": validator.resolver.resolution_scope,
+        "store": dict(validator.resolver.store),
+        "format_checker": validator.format_checker is not None,
+    }
+    return sha256(dumps(cache_input, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def get_runtime_namespace(validator: Draft7Validator) -> Dict[str, Any]:
+    return {
+        "FORMAT_CHECKER": validator.format_checker,
+        "equal": equal,
+        "is_integer": is_integer,
+        "is_multiple_of": is_multiple_of,
+        "is_number": is_number,
+        "unbool": unbool,
+        "uniq": uniq,
+    }
+
+
+def is_integer(instance: Any) -> bool:
+    if isinstance(instance, bool):
+        return False
+    return isinstance(instance, int) or isinstance(instance, float) and instance.is_integer()
+
+
+def is_number(instance: Any) -> bool:
+    return isinstance(instance, Number) and not isinstance(instance, bool)
+
+
+def is_multiple_of(instance: Any, divisor: Any) -> bool:
+    if isinstance(divisor, float):
+        quotient = instance / divisor
+        try:
+            return bool(int(quotient) == quotient)
+        except OverflowError:
+            return bool((Fraction(instance) / Fraction(divisor)).denominator == 1)
+    return not instance % divisor
+
+
+class SchemaCompiler:  # pylint:disable=too-many-public-methods
+    """
+    Generates one function per subschema, each returning whether `data` is valid. Functions are
+    shared between identical subschemas in the same resolution scope, which also makes recursive
+    references work.
+    """
+
+    def __init__(self, validator: Draft7Validator):
+        if (
+            validator.TYPE_CHECKER != Draft7Validator.TYPE_CHECKER
+            or validator.VALIDATORS != Draft7Validator.VALIDATORS
+        ):
+            raise UnsupportedSchemaError("Only Draft 7 validators are supported")
+
+        self.validator = validator
+        self.function_names: Dict[Tuple[int, str], str] = {}
+        self.pending_functions: List[Tuple[str, SchemaType, str]] = []
+        self.functions: List[str] = []
+        self.constants: Dict[str, str] = {}
+        self.keyword_generators: Dict[str, KeywordGenerator] = {
+            "additionalItems": self.generate_additional_items,
+            "additionalProperties": self.generate_additional_properties,
+            "allOf": self.generate_all_of,
+            "anyOf": self.generate_any_of,
+            "contains": self.generate_contains,
+            "dependencies": self.generate_dependencies,
+            "enum": self.generate_enum,
+            "format": self.generate_format,
+            "if": self.generate_if,
+            "items": self.generate_items,
+            "not": self.generate_not,
+            "oneOf": self.generate_one_of,
+            "pattern": self.generate_pattern,
+            "patternProperties": self.generate_pattern_properties,
+            "properties": self.generate_properties,
+            "propertyNames": self.generate_property_names,
+            "type": self.generate_type,
+        }
+
+    def compile(self) -> str:
+        entry_point = self.get_function(
+            self.validator.schema, self.validator.resolver.resolution_scope
+        )
+        while self.pending_functions:
+            self.functions.append(self.generate_function(*self.pending_functions.pop()))
+
+        constants = [f"{name} = {expression}" for expression, name in self.constants.items()]
+        return "\n".join(
+            [
+                f"# Generated by {__name__} version {COMPILER_VERSION}; do not edit",
+                "from re import compile as compile_pattern",
+                "",
+                *constants,
+                "",
+                *self.functions,
+                f"validate = {entry_point}",
+                "",
+            ]
+        )
+
+    def get_function(self, schema: SchemaType, scope: str) -> str:
+        key = (id(schema), scope)
+        if key not in self.function_names:
+            self.function_names[key] = name = f"check_{len(self.function_names)}"
+            self.pending_functions.append((name, schema, scope))
+        return self.function_names[key]
+
+    def get_constant(self, expression: str) -> str:
+        if expression not in self.constants:
+            self.constants[expression] = f"CONSTANT_{len(self.constants)}"
+        return self.constants[expression]
+
+    def get_pattern(self, pattern: str) -> str:
+        return self.get_constant(f"compile_pattern({pattern!r})")
+
+    def get_literal(self, value: Any) -> str:
+        """JSON values as Python literals, shared as module constants when they are containers."""
+        if any(isinstance(each, float) and not isfinite(each) for each in walk(value)):
+            raise UnsupportedSchemaError(f"Unsupported number in {value!r}")
+        if isinstance(value, (list, dict)):
+            return self.get_constant(repr(value))
+        return repr(value)
+
+    def generate_function(self, name: str, schema: SchemaType, scope: str) -> str:
+        if isinstance(schema, bool):
+            body = [f"return {schema}"]
+        elif isinstance(schema, dict):
+            if isinstance(schema_id := schema.get("$id"), str) and schema_id:
+                scope = urljoin(scope, schema_id)
+            body = self.generate_body(schema, scope)
+        else:
+            raise UnsupportedSchemaError(f"Schema is not an object or boolean: {schema!r}")
+
+        return "\n".join([f"def {name}(data):", *(f"    {line}" for line in body), ""])
+
+    def generate_body(self, schema: Dict[str, Any], scope: str) -> List[str]:
+        # Like `jsonschema`, ignore the siblings of a reference
+        if "$ref" in schema:
+            return [f"return {self.resolve_reference(schema['$ref'], scope)}(data)"]
+
+        lines = []
+        for keyword, value in schema.items():
+            if keyword in Draft7Validator.VALIDATORS:
+                lines.extend(self.generate_keyword(keyword, value, schema, scope))
+        return [*lines, "return True"]
+
+    def resolve_reference(self, reference: str, scope: str) -> str:
+        resolver = self.validator.resolver
+        resolver.push_scope(scope)
+        try:
+            url, resolved = resolver.resolve(reference)
+        finally:
+            resolver.pop_scope()
+        return self.get_function(resolved, url)
+
+    def generate_keyword(
+        self, keyword: str, value: Any, schema: Dict[str, Any], scope: str
+    ) -> List[str]:
+        if (condition := VALUE_CONDITIONS.get(keyword)) is not None:
+            return [f"if {condition.format(self.get_literal(value))}:", "    return False"]
+        if (generator := self.keyword_generators.get(keyword)) is not None:
+            return generator(value, schema, scope)
+        raise UnsupportedSchemaError(f"Unsupported keyword {keyword!r}")
+
+    @staticmethod
+    def generate_type(value: Any, _schema: Dict[str, Any], _scope: str) -> List[str]:
+        types = [value] if isinstance(value, str) else value
+        try:
+            expressions = [TYPE_EXPRESSIONS[type_name] for type_name in types]
+        except KeyError as error:
+            raise UnsupportedSchemaError(f"Unknown type {error}") from error
+        return [f"if not ({' or '.join(expressions)}):", "    return False"]
+
+    def generate_enum(self, value: Any, _schema: Dict[str, Any], _scope: str) -> List[str]:
+        literal = self.get_literal(value)
+        return [
+            "if data == 0 or data == 1:",
+            f"    if all(unbool(data) != unbool(each) for each in {literal}):",
+            "        return False",
+            f"elif data not in {literal}:",
+            "    return False",
+        ]
+
+    def generate_pattern(self, value: str, _schema: Dict[str, Any], _scope: str) -> List[str]:
+        return [
+            f"if isinstance(data, str) and not {self.get_pattern(value)}.search(data):",
+            "    return False",
+        ]
+
+    def generate_format(self, value: str, _schema: Dict[str, Any], _scope: str) -> List[str]:
+        if self.validator.format_checker is None:
+            return []
+        return [f"if not FORMAT_CHECKER.conforms(data, {value!r}):", "    return False"]
+
+    def generate_properties(
+        self, value: Dict[str, Any], _schema: Dict[str, Any], scope: str
+    ) -> List[str]:
+        lines = ["if isinstance(data, dict):"]
+        for name, subschema in value.items():
+            function = self.get_function(subschema, scope)
+            lines += [
+                f"    if {name!r} in data and not {function}(data[{name!r}]):",
+                "        return False",
+            ]
+        return lines
+
+    def generate_pattern_properties(
+        self, value: Dict[str, Any], _schema: Dict[str, Any], scope: str
+    ) -> List[str]:
+        lines = ["if isinstance(data, dict):"]
+        for pattern, subschema in value.items():
+            function = self.get_function(subschema, scope)
+            lines += [
+                "    for key, value in data.items():",
+                f"        if {self.get_pattern(pattern)}.search(key) and not {function}(value):",
+                "            return False",
+            ]
+        return lines
+
+    def generate_property_names(
+        self, value: SchemaType, _schema: Dict[str, Any], scope: str
+    ) -> List[str]:
+        return [
+            "if isinstance(data, dict):",
+            "    for key in data:",
+            f"        if not {self.get_function(value, scope)}(key):",
+            "            return False",
+        ]
+
+    def generate_additional_properties(
+        self, value: SchemaType, schema: Dict[str, Any], scope: str
+    ) -> List[str]:
+        if value is True:
+            return []
+
+        properties = self.get_constant(repr(frozenset(schema.get("properties", {}))))
+        condition = f"key not in {properties}"
+        if patterns := "|".join(schema.get("patternProperties", {})):
+            condition += f" and not {self.get_pattern(patterns)}.search(key)"
+        if isinstance(value, dict):
+            condition += f" and not {self.get_function(value, scope)}(data[key])"
+        elif value is not False:
+            raise UnsupportedSchemaError(f"Unsupported additionalProperties {value!r}")
+
+        return [
+            "if isinstance(data, dict):",
+            "    for key in data:",
+            f"        if {condition}:",
+            "            return False",
+        ]
+
+    def generate_dependencies(
+        self, value: Dict[str, Any], _schema: Dict[str, Any], scope: str
+    ) -> List[str]:
+        lines = ["if isinstance(data, dict):"]
+        for name, dependency in value.items():
+            if isinstance(dependency, list):
+                condition = f"any(each not in data for each in {self.get_literal(dependency)})"
+            else:
+                condition = f"not {self.get_function(dependency, scope)}(data)"
+            lines += [f"    if {name!r} in data and {condition}:", "        return False"]
+        return lines
+
+    def generate_items(self, value: Any, _schema: Dict[str, Any], scope: str) -> List[str]:
+        if isinstance(value, list):
+            functions = "".join(f"{self.get_function(each, scope)}, " for each in value)
+            return [
+                "if isinstance(data, list):",
+                f"    for item, function in zip(data, ({functions})):",
+                "        if not function(item):",
+                "            return False",
+            ]
+        return [
+            "if isinstance(data, list):",
+            "    for item in data:",
+            f"        if not {self.get_function(value, scope)}(item):",
+            "            return False",
+        ]
+
+    def generate_additional_items(
+        self, value: SchemaType, schema: Dict[str, Any], scope: str
+    ) -> List[str]:
+        items = schema.get("items", {})
+        if isinstance(items, dict) or value is True:
+            return []
+        if not isinstance(items, list):
+            raise UnsupportedSchemaError(f"Unsupported additionalItems with items {items!r}")
+
+        if isinstance(value, dict):
+            return [
+                "if isinstance(data, list):",
+                f"    for item in data[{len(items)}:]:",
+                f"        if not {self.get_function(value, scope)}(item):",
+                "            return False",
+            ]
+        return [f"if isinstance(data, list) and len(data) > {len(items)}:", "    return False"]
+
+    def generate_contains(
+        self, value: SchemaType, _schema: Dict[str, Any], scope: str
+    ) -> List[str]:
+        return [
+            "if isinstance(data, list):",
+            f"    if not any({self.get_function(value, scope)}(item) for item in data):",
+            "        return False",
+        ]
+
+    def generate_all_of(self, value: List[Any], _schema: Dict[str, Any], scope: str) -> List[str]:
+        return [
+            line
+            for subschema in value
+            for line in [f"if not {self.get_function(subschema, scope)}(data):", "    return False"]
+        ]
+
+    def generate_any_of(self, value: List[Any], _schema: Dict[str, Any], scope: str) -> List[str]:
+        calls = [f"{self.get_function(subschema, scope)}(data)" for subschema in value]
+        return [f"if not ({' or '.join(calls) or 'False'}):", "    return False"]
+
+    def generate_one_of(self, value: List[Any], _schema: Dict[str, Any], scope: str) -> List[str]:
+        calls = [f"{self.get_function(subschema, scope)}(data)" for subschema in value]
+        return [f"if [{', '.join(calls)}].count(True) != 1:", "    return False"]
+
+    def generate_not(self, value: SchemaType, _schema: Dict[str, Any], scope: str) -> List[str]:
+        return [f"if {self.get_function(value, scope)}(data):", "    return False"]
+
+    def generate_if(self, value: SchemaType, schema: Dict[str, Any], scope: str) -> List[str]:
+        lines = [f"if {self.get_function(value, scope)}(data):"]
+        if "then" in schema:
+            lines += [f"    if not {self.get_function(schema['then'], scope)}(data):"]
+            lines += ["        return False"]
+        else:
+            lines += ["    pass"]
+        if "else" in schema:
+            lines += [f"elif not {self.get_function(schema['else'], scope)}(data):"]
+            lines += ["    return False"]
+        return lines
+
+
+def walk(value: Any) -> List[Any]:
+    if isinstance(value, dict):
+        return [each for child in value.values() for each in walk(child)]
+    if isinstance(value, list):
+        return [each for child in value for each in walk(child)]
+    return [value]
@@ -0,0 +1,140 @@
+"""
+Validation of parsed metadata files against their STAC schemas in worker processes, so that
+validating many large files is not serialised by the GIL of the process reading them.
+"""
+from functools import lru_cache
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from queue import Queue
+from threading import Lock
+from time import perf_counter
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Callable, Dict, Mapping, NamedTuple, Optional, Type
+
+from jsonschema import ValidationError
+
+from ..stac_format import STAC_TYPE_KEY
+from ..types import JsonObject
+
+if TYPE_CHECKING:
+    from multiprocessing.context import SpawnProcess
+
+    ConnectionQueue = Queue[Connection]  # pylint:disable=unsubscriptable-object
+else:
+    SpawnProcess = object  # pragma: no mutate
+    ConnectionQueue = Queue  # pragma: no mutate
+
+# Has a `validate` method raising `jsonschema.ValidationError`, like `SchemaValidator`
+SchemaValidatorsGetter = Callable[[], Mapping[str, Any]]
+
+# Raised when the worker process at the other end of a connection has died
+WORKER_CONNECTION_ERRORS = (BrokenPipeError, ConnectionResetError, EOFError)
+
+
+class SchemaValidationResult(NamedTuple):
+    error_message: Optional[str]
+    seconds: float
+    # Set when the object couldn't be validated, rather than being invalid
+    worker_error: Optional[str] = None
+
+
+class SchemaValidationPool:
+    """
+    Any thread can call `validate`, which hands the object to an idle worker process, waiting for
+    one if necessary. Each worker gets its own schema validators by calling `get_schema_validators`,
+    which has to be picklable, and keeps them for its lifetime. Workers which die are replaced.
+
+    The workers are plain processes connected by pipes rather than a `ProcessPoolExecutor`, as its
+    queues need shared memory semaphores, which AWS Lambda doesn't provide.
+    """
+
+    def __init__(self, process_count: int, get_schema_validators: SchemaValidatorsGetter):
+        self.context = get_context("spawn")
+        self.get_schema_validators = get_schema_validators
+        self.processes: Dict[Connection, SpawnProcess] = {}
+        self.processes_lock = Lock()
+        self.idle_connections: ConnectionQueue = Queue()
+        for _ in range(process_count):
+            self.idle_connections.put(self.start_worker())
+
+    def start_worker(self) -> Connection:
+        connection: Connection
+        connection, worker_connection = self.context.Pipe()
+        process = self.context.Process(
+            target=run_worker, args=(worker_connection, self.get_schema_validators), daemon=True
+        )
+        process.start()
+        worker_connection.close()
+        with self.processes_lock:
+            self.processes[connection] = process
+        return connection
+
+    def replace_worker(self, connection: Connection) -> Connection:
+        with self.processes_lock:
+            process = self.processes.pop(connection)
+        connection.close()
+        process.kill()
+        process.join()
+        return self.start_worker()
+
+    def __enter__(self) -> "SchemaValidationPool":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def validate(self, stac_object: JsonObject) -> SchemaValidationResult:
+        """If the worker dies, it's replaced and the result has the `worker_error`."""
+        connection = self.idle_connections.get()
+        try:
+            connection.send(stac_object)
+            result: SchemaValidationResult = connection.recv()
+        except WORKER_CONNECTION_ERRORS as error:
+            connection = self.replace_worker(connection)
+            return SchemaValidationResult(None, 0.0, repr(error))
+        finally:
+            self.idle_connections.put(connection)
+        return result
+
+    def close(self) -> None:
+        for _ in self.processes:
+            self.idle_connections.get().close()
+        for process in self.processes.values():
+            process.join()
+
+
+def run_worker(connection: Connection, get_schema_validators: SchemaValidatorsGetter) -> None:
+    # Not cached when failing, so that each object gets the error
+    get_cached_schema_validators = lru_cache(maxsize=None)(get_schema_validators)
+    while True:
+        try:
+            stac_object = connection.recv()
+        except EOFError:
+            return
+        connection.send(validate_in_worker(get_cached_schema_validators, stac_object))
+
+
+def validate_in_worker(
+    get_schema_validators: SchemaValidatorsGetter, stac_object: JsonObject
+) -> SchemaValidationResult:
+    """Errors are sent back rather than ending the worker, leaving the caller to handle them."""
+    try:
+        return validate_stac_object(get_schema_validators(), stac_object)
+    except Exception as error:  # pylint:disable=broad-except
+        return SchemaValidationResult(None, 0.0, repr(error))
+
+
+def validate_stac_object(
+    schema_validators: Mapping[str, Any], stac_object: JsonObject
+) -> SchemaValidationResult:
+    start = perf_counter()
+    try:
+        schema_validators[stac_object[STAC_TYPE_KEY]].validate(stac_object)
+    except ValidationError as error:
+        return SchemaValidationResult(str(error), perf_counter() - start)
+    return SchemaValidationResult(None, perf_counter() - start)
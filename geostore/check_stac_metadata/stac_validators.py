@@ -1,13 +1,39 @@
-from functools import cached_property
-from json import load
+from functools import cached_property, lru_cache
+from hashlib import sha256
+from json import dump, dumps, load
+from os import makedirs
 from os.path import dirname, join
+from typing import Any, Dict, cast
 
 from jsonschema import Draft7Validator, FormatChecker, RefResolver
 from jsonschema._utils import URIDict
 from jsonschema.validators import extend
 
-from ..stac_format import LINZ_SCHEMA_PATH, QUALITY_SCHEMA_PATH
+from ..stac_format import (
+    LINZ_SCHEMA_PATH,
+    QUALITY_SCHEMA_PATH,
+    STAC_TYPE_CATALOG,
+    STAC_TYPE_COLLECTION,
+    STAC_TYPE_ITEM,
+)
 from ..types import JsonObject
+from .schema_compiler import COMPILER_VERSION, SchemaCompiler, UnsupportedSchemaError
+
+# Written when bundling the Lambda function, by running this module
+SERIALISED_SCHEMAS_PATH = join(dirname(__file__), "schemas.json")
+SCHEMAS_DIGEST_PATH = join(dirname(__file__), "schemas.sha256")
+COMPILED_SCHEMAS_DIRECTORY = join(dirname(__file__), "compiled_schemas")
+
+
+@lru_cache
+def get_serialised_schemas() -> Dict[str, JsonObject]:
+    """Schemas by path from the pre-serialised artefact, or nothing if it hasn't been built."""
+    try:
+        with open(SERIALISED_SCHEMAS_PATH, encoding="utf-8") as file_pointer:
+            result: Dict[str, JsonObject] = load(file_pointer)
+            return result
+    except FileNotFoundError:
+        return {}
 
 
 class Schema:
@@ -16,6 +42,12 @@ class Schema:
 
     @cached_property
     def as_dict(self) -> JsonObject:
+        serialised_schema = get_serialised_schemas().get(self.path)
+        if serialised_schema is not None:
+            return serialised_schema
+        return self.read_file()
+
+    def read_file(self) -> JsonObject:
         with open(join(dirname(__file__), self.path), encoding="utf-8") as file_pointer:
             result: JsonObject = load(file_pointer)
             return result
@@ -42,8 +74,7 @@ LINZ_SCHEMA = Schema(LINZ_SCHEMA_PATH)
 STAC_ITEM_SPEC_PATH = f"{STAC_SPEC_PATH}/item-spec/json-schema"
 ITEM_SCHEMA = Schema(f"{STAC_ITEM_SPEC_PATH}/item.json")
 
-schema_store = {}
-for schema in [
+STORED_SCHEMAS = [
     CATALOG_SCHEMA,
     Schema(f"{STAC_SPEC_PATH}/collection-spec/json-schema/collection.json"),
     FILE_SCHEMA,
@@ -59,24 +90,96 @@ for schema in [
     Schema(PROJECTION_STAC_SCHEMA_PATH),
     Schema(VERSION_STAC_SCHEMA_PATH),
     Schema(QUALITY_SCHEMA_PATH),
-]:
+]
+
+
+@lru_cache
+def get_schema_store() -> Dict[str, JsonObject]:
     # Normalize URLs the same way as jsonschema does
-    schema_store[schema.uri] = schema.as_dict
+    return {schema.uri: schema.as_dict for schema in STORED_SCHEMAS}
+
+
+@lru_cache
+def get_schemas_digest() -> str:
+    """
+    Hash of the stored schemas, read from the artefact written when bundling so that a cold start
+    doesn't have to load and hash every schema, or computed from the schema files otherwise.
+    """
+    try:
+        with open(SCHEMAS_DIGEST_PATH, encoding="utf-8") as file_pointer:
+            return file_pointer.read().strip()
+    except FileNotFoundError:
+        return get_digest({schema.path: schema.read_file() for schema in STORED_SCHEMAS})
+
+
+def get_digest(schemas: Dict[str, JsonObject]) -> str:
+    return sha256(dumps(schemas, sort_keys=True).encode()).hexdigest()
+
+
+def write_serialised_schemas() -> None:
+    schemas = {schema.path: schema.read_file() for schema in STORED_SCHEMAS}
+    with open(SERIALISED_SCHEMAS_PATH, "w", encoding="utf-8") as file_pointer:
+        dump(schemas, file_pointer)
+    with open(SCHEMAS_DIGEST_PATH, "w", encoding="utf-8") as file_pointer:
+        file_pointer.write(get_digest(schemas))
+
 
 BaseSTACValidator = extend(Draft7Validator)
 BaseSTACValidator.format_checker = FormatChecker()
 
-STACCatalogSchemaValidator = extend(BaseSTACValidator)(
-    resolver=RefResolver.from_schema(CATALOG_SCHEMA.as_dict, store=schema_store),
-    schema=CATALOG_SCHEMA.as_dict,
-)
 
-STACCollectionSchemaValidator = extend(BaseSTACValidator)(
-    resolver=RefResolver.from_schema(LINZ_SCHEMA.as_dict, store=schema_store),
-    schema=LINZ_SCHEMA.as_dict,
-)
+class LazySTACSchemaValidator:  # pylint:disable=too-few-public-methods
+    """
+    Stands in for the validator of a schema, which is only built, and its schemas only loaded, when
+    first used.
+    """
 
-STACItemSchemaValidator = extend(BaseSTACValidator)(
-    resolver=RefResolver.from_schema(LINZ_SCHEMA.as_dict, store=schema_store),
-    schema=LINZ_SCHEMA.as_dict,
-)
+    # Needed to run compiled schemas, which shouldn't have to build the validator
+    format_checker = BaseSTACValidator.format_checker
+
+    def __init__(self, schema: Schema):
+        self.schema_to_load = schema
+
+    @cached_property
+    def validator(self) -> Draft7Validator:
+        validator: Draft7Validator = extend(BaseSTACValidator)(
+            resolver=RefResolver.from_schema(self.schema_to_load.as_dict, store=get_schema_store()),
+            schema=self.schema_to_load.as_dict,
+        )
+        return validator
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.validator, name)
+
+
+STACCatalogSchemaValidator = cast(Draft7Validator, LazySTACSchemaValidator(CATALOG_SCHEMA))
+STACCollectionSchemaValidator = cast(Draft7Validator, LazySTACSchemaValidator(LINZ_SCHEMA))
+STACItemSchemaValidator = cast(Draft7Validator, LazySTACSchemaValidator(LINZ_SCHEMA))
+
+STAC_TYPE_VALIDATION_MAP: Dict[str, Draft7Validator] = {
+    STAC_TYPE_CATALOG: STACCatalogSchemaValidator,
+    STAC_TYPE_COLLECTION: STACCollectionSchemaValidator,
+    STAC_TYPE_ITEM: STACItemSchemaValidator,
+}
+
+
+def get_packaged_compiled_schema_path(stac_type: str) -> str:
+    """Where the bundle has the compiled schema of the STAC type, if it was compiled."""
+    version = sha256(f"{COMPILER_VERSION}:{get_schemas_digest()}".encode()).hexdigest()
+    return join(COMPILED_SCHEMAS_DIRECTORY, f"{stac_type.lower()}_{version}.py")
+
+
+def write_compiled_schemas() -> None:
+    makedirs(COMPILED_SCHEMAS_DIRECTORY, exist_ok=True)
+    for stac_type, validator in STAC_TYPE_VALIDATION_MAP.items():
+        try:
+            source = SchemaCompiler(validator).compile()
+        except UnsupportedSchemaError:
+            continue
+        with open(get_packaged_compiled_schema_path(stac_type), "w", encoding="utf-8") as file_:
+            file_.write(source)
+
+
+if __name__ == "__main__":
+    write_serialised_schemas()
+    write_compiled_schemas()
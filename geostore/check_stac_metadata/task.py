@@ -1,4 +1,9 @@
+from functools import lru_cache, partial
 from logging import Logger
+from os import sched_getaffinity
+from os.path import join
+from tempfile import gettempdir
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Tuple
 
 from botocore.exceptions import ClientError
 from botocore.response import StreamingBody
@@ -13,18 +18,54 @@ from ..logging_keys import (
     LOG_MESSAGE_VALIDATION_COMPLETE,
 )
 from ..parameter_store import ParameterName, get_param
-from ..s3 import get_s3_client_for_role
+from ..s3 import S3_URL_PREFIX, get_s3_client_for_role
 from ..s3_utils import get_bucket_and_key_from_url
 from ..step_function import Outcome, get_hash_key
-from ..step_function_keys import DATASET_ID_KEY, METADATA_URL_KEY, S3_ROLE_ARN_KEY, VERSION_ID_KEY
+from ..step_function_keys import (
+    DATASET_ID_KEY,
+    MAX_FAILURES_KEY,
+    MAX_FAILURES_PER_CHECK_KEY,
+    METADATA_SHARDS_KEY,
+    METADATA_SHARD_KEY,
+    METADATA_URL_KEY,
+    S3_ROLE_ARN_KEY,
+    VERSION_ID_KEY,
+)
 from ..types import JsonObject
-from ..validation_results_model import ValidationResultFactory
-from .utils import STACDatasetValidator
+from ..validation_policy import (
+    FAILURE_LIMIT_SCHEMA,
+    get_validation_policy,
+    save_suppressed_failures,
+)
+from ..validation_results_model import BufferedValidationResultFactory
+from .asset_inventory import ObjectLister
+from .schema_validation_pool import SchemaValidationPool
+from .utils import (
+    MetadataObject,
+    MetadataValidationCache,
+    STACDatasetValidator,
+    get_compiled_stac_type_validation_map,
+)
+from .validation_metrics import VALIDATION_RESULTS_WRITE_PHASE
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+else:
+    S3Client = object  # pragma: no mutate
 
 LOGGER: Logger = get_log()
 
+METADATA_READ_CONCURRENCY = 16
+COMPILED_SCHEMA_CACHE_DIRECTORY = join(gettempdir(), "compiled-stac-schemas")
+SLOW_METADATA_FILE_LOG_THRESHOLD_SECONDS = 5
+
 
 def lambda_handler(event: JsonObject, _context: bytes) -> JsonObject:
+    """
+    Without a shard number or shard numbers, this is the root pass of the validation, which returns
+    the numbers of any shards left to validate. A shard number validates that shard, and the shard
+    numbers merge the results of the root pass and those shards.
+    """
     LOGGER.debug(LOG_MESSAGE_LAMBDA_START, extra={"lambda_input": event})
 
     # validate input
@@ -38,6 +79,13 @@ def lambda_handler(event: JsonObject, _context: bytes) -> JsonObject:
                     VERSION_ID_KEY: {"type": "string"},
                     METADATA_URL_KEY: {"type": "string"},
                     S3_ROLE_ARN_KEY: {"type": "string"},
+                    METADATA_SHARD_KEY: {"type": "integer", "minimum": 1},
+                    METADATA_SHARDS_KEY: {
+                        "type": "array",
+                        "items": {"type": "integer", "minimum": 1},
+                    },
+                    MAX_FAILURES_KEY: FAILURE_LIMIT_SCHEMA,
+                    MAX_FAILURES_PER_CHECK_KEY: FAILURE_LIMIT_SCHEMA,
                 },
                 "required": [DATASET_ID_KEY, METADATA_URL_KEY, S3_ROLE_ARN_KEY, VERSION_ID_KEY],
                 "additionalProperties": True,
@@ -55,17 +103,84 @@ def lambda_handler(event: JsonObject, _context: bytes) -> JsonObject:
         LOGGER.warning(LOG_MESSAGE_LAMBDA_FAILURE, extra={"error": error})
         return {ERROR_MESSAGE_KEY: str(error)}
 
+    s3_object_reader = s3_object_reader_for(s3_client)
+
     def s3_url_reader(url: str) -> StreamingBody:
-        bucket_name, key = get_bucket_and_key_from_url(url)
-        response = s3_client.get_object(Bucket=bucket_name, Key=key)
-        return response["Body"]
+        return s3_object_reader(url).body
 
     hash_key = get_hash_key(event[DATASET_ID_KEY], event[VERSION_ID_KEY])
 
-    validation_result_factory = ValidationResultFactory(
+    with BufferedValidationResultFactory(
         hash_key, get_param(ParameterName.STORAGE_VALIDATION_RESULTS_TABLE_NAME)
+    ) as validation_result_factory:
+        validator = STACDatasetValidator(
+            hash_key,
+            s3_url_reader,
+            validation_result_factory,
+            concurrency=METADATA_READ_CONCURRENCY,
+            schema_validators=get_compiled_stac_type_validation_map(
+                COMPILED_SCHEMA_CACHE_DIRECTORY
+            ),
+            metadata_validation_cache=MetadataValidationCache(
+                get_param(ParameterName.PROCESSING_METADATA_VALIDATION_CACHE_TABLE_NAME),
+                s3_object_reader,
+            ),
+            slow_log_threshold=SLOW_METADATA_FILE_LOG_THRESHOLD_SECONDS,
+            object_lister=s3_object_lister_for(s3_client),
+            validation_policy=get_validation_policy(event),
+            schema_validation_pool=get_schema_validation_pool(len(sched_getaffinity(0))),
+        )
+
+        try:
+            return run_validation(validator, event)
+        finally:
+            # Written here rather than when leaving the `with` block, so that the writes are timed
+            with validator.metrics.timer(VALIDATION_RESULTS_WRITE_PHASE):
+                save_suppressed_failures(validator.validation_result_factory)
+                validation_result_factory.flush()
+            validator.metrics.log()
+
+
+@lru_cache
+def get_schema_validation_pool(process_count: int) -> Optional[SchemaValidationPool]:
+    """
+    Kept for the lifetime of the process, so warm Lambda containers reuse the worker processes.
+    With a single CPU available the files are validated on the calling thread instead.
+    """
+    if process_count < 2:
+        return None
+    return SchemaValidationPool(
+        process_count,
+        partial(get_compiled_stac_type_validation_map, COMPILED_SCHEMA_CACHE_DIRECTORY),
     )
-    validator = STACDatasetValidator(hash_key, s3_url_reader, validation_result_factory)
 
-    validator.run(event[METADATA_URL_KEY])
+
+def run_validation(validator: STACDatasetValidator, event: JsonObject) -> JsonObject:
+    if METADATA_SHARDS_KEY in event:
+        validator.run_merge(event[METADATA_URL_KEY], event[METADATA_SHARDS_KEY])
+    elif METADATA_SHARD_KEY in event:
+        validator.run_shard(event[METADATA_SHARD_KEY])
+    elif shards := validator.run_root_pass(event[METADATA_URL_KEY]):
+        return {SUCCESS_KEY: True, METADATA_SHARDS_KEY: shards}
     return {SUCCESS_KEY: True}
+
+
+def s3_object_reader_for(s3_client: S3Client) -> Callable[[str], MetadataObject]:
+    def s3_object_reader(url: str) -> MetadataObject:
+        bucket_name, key = get_bucket_and_key_from_url(url)
+        response = s3_client.get_object(Bucket=bucket_name, Key=key)
+        return MetadataObject(response["Body"], response["ETag"], response.get("VersionId"))
+
+    return s3_object_reader
+
+
+def s3_object_lister_for(s3_client: S3Client) -> ObjectLister:
+    def s3_object_lister(directory_url: str) -> Iterator[Tuple[str, int]]:
+        bucket_name, prefix = get_bucket_and_key_from_url(directory_url)
+        for page in s3_client.get_paginator("list_objects_v2").paginate(
+            Bucket=bucket_name, Prefix=prefix, Delimiter="/"
+        ):
+            for s3_object in page.get("Contents", []):
+                yield f"{S3_URL_PREFIX}{bucket_name}/{s3_object['Key']}", s3_object["Size"]
+
+    return s3_object_lister
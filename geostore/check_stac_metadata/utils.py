@@ -1,8 +1,31 @@
-from functools import lru_cache
-from json import JSONDecodeError, load
+# pylint:disable=too-many-lines
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, partial
+from hashlib import sha256
+from itertools import islice
+from json import JSONDecodeError, dumps, loads
 from logging import Logger
 from os.path import dirname
-from typing import Any, Callable, Dict, List, Tuple
+from queue import Queue
+from sys import intern
+from threading import Lock
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 from botocore.exceptions import ClientError
 from botocore.response import StreamingBody
@@ -11,9 +34,19 @@ from linz_logger import get_log
 
 from ..api_keys import MESSAGE_KEY
 from ..check import Check
+from ..json_streaming import JSONStreamReader
 from ..logging_keys import LOG_MESSAGE_VALIDATION_COMPLETE
+from ..metadata_validation_cache_model import (
+    get_metadata_validation_cache_range_key,
+    metadata_validation_cache_model_with_meta,
+)
 from ..models import DB_KEY_SEPARATOR
-from ..processing_assets_model import ProcessingAssetType, processing_assets_model_with_meta
+from ..processing_assets_model import (
+    PROCESSING_ASSETS_SUMMARY_RANGE_KEY,
+    ProcessingAssetType,
+    ProcessingAssetsModelBase,
+    processing_assets_model_with_meta,
+)
 from ..s3 import S3_URL_PREFIX
 from ..stac_format import (
     LINZ_STAC_SECURITY_CLASSIFICATION_KEY,
@@ -22,29 +55,48 @@ from ..stac_format import (
     STAC_FILE_CHECKSUM_KEY,
     STAC_HREF_KEY,
     STAC_LINKS_KEY,
-    STAC_TYPE_CATALOG,
-    STAC_TYPE_COLLECTION,
-    STAC_TYPE_ITEM,
     STAC_TYPE_KEY,
 )
 from ..step_function import Outcome
 from ..types import JsonObject
+from ..validation_policy import (
+    FailureLimitReachedError,
+    ValidationPolicy,
+    apply_validation_policy,
+    check_failure_limit,
+)
 from ..validation_results_model import ValidationResult, ValidationResultFactory
+from .asset_inventory import ObjectLister, get_object_sizes
+from .record_spool import RecordSpool
+from .schema_compiler import CompiledSchemaValidator, UnsupportedSchemaError
+from .schema_validation_pool import SchemaValidationPool, SchemaValidationResult
 from .stac_validators import (
-    STACCatalogSchemaValidator,
-    STACCollectionSchemaValidator,
-    STACItemSchemaValidator,
+    STAC_TYPE_VALIDATION_MAP,
+    get_packaged_compiled_schema_path,
+    get_schemas_digest,
+)
+from .validation_metrics import (
+    ASSET_INVENTORY_PHASE,
+    BYTES_READ_COUNTER,
+    FETCH_PHASE,
+    PARSE_PHASE,
+    PROCESSING_ASSETS_WRITE_PHASE,
+    SPILLED_BYTES_COUNTER,
+    VALIDATION_CACHE_HITS_COUNTER,
+    VALIDATION_CACHE_READ_PHASE,
+    VALIDATION_CACHE_WRITE_PHASE,
+    VALIDATION_RESULTS_WRITE_PHASE,
+    ValidationMetrics,
+    get_schema_validation_phase,
 )
+from .write_progress import WriteProgress
 
 NO_ASSETS_FOUND_ERROR_MESSAGE = "No assets found in dataset"
+MISSING_ASSETS_ERROR_MESSAGE = "Asset files not found in dataset"
 
 LOGGER: Logger = get_log()
 
-STAC_TYPE_VALIDATION_MAP: Dict[str, Draft7Validator] = {
-    STAC_TYPE_CATALOG: STACCatalogSchemaValidator,
-    STAC_TYPE_COLLECTION: STACCollectionSchemaValidator,
-    STAC_TYPE_ITEM: STACItemSchemaValidator,
-}
+SchemaValidator = Union[Draft7Validator, CompiledSchemaValidator]
 
 PROCESSING_ASSET_ASSET_KEY = "asset"
 PROCESSING_ASSET_MULTIHASH_KEY = "multihash"
@@ -53,6 +105,77 @@ PROCESSING_ASSET_URL_KEY = "url"
 EXPLICITLY_RELATIVE_PATH_PREFIX = "./"
 LOG_MESSAGE_STAC_ASSET_INFO = "STACAsset:Info"
 
+LOG_MESSAGE_SCHEMA_NOT_COMPILED = "SchemaValidator:NotCompiled"
+LOG_MESSAGE_SCHEMA_VALIDATION_WORKER_FAILED = "SchemaValidationWorker:Failed"
+LOG_MESSAGE_SLOW_METADATA_FILE = "MetadataFile:Slow"
+LOG_MESSAGE_ASSET_INVENTORY_UNAVAILABLE = "AssetInventory:Unavailable"
+LOG_MESSAGE_METADATA_SHARD_FAILED = "MetadataShard:Failed"
+
+READ_AHEAD_PER_THREAD = 4
+
+PROCESSING_ASSETS_WRITE_STREAM_COUNT = 8
+PROCESSING_ASSETS_WRITE_CHUNK_SIZE = 100
+PROCESSING_ASSETS_WRITE_QUEUE_SIZE = 4
+
+# Bump whenever the checks made on top of the schemas change, to ignore cached validation results
+METADATA_VALIDATION_RULES_VERSION = 1
+# Keeps cached validation results well below the DynamoDB item size limit of 400 KB
+MAX_CACHED_URL_CHARACTER_COUNT = 300_000
+# Bounds the memory used by validation results waiting to be cached
+METADATA_VALIDATION_CACHE_FLUSH_CHARACTER_COUNT = 5_000_000
+# Bounds the memory used by metadata files with huge numbers of links and assets
+MAX_MATERIALISED_LINK_AND_ASSET_COUNT = 10_000
+UNMATERIALISED_JSON_KEY = "json"
+UNMATERIALISED_NAME_KEY = "name"
+
+# Catalogs with fewer metadata files left than this after the root pass are validated in one go
+SHARDED_VALIDATION_MIN_URL_COUNT = 1_000
+# The maximum concurrency of a Step Functions Map state
+MAX_METADATA_SHARD_COUNT = 40
+ROOT_METADATA_SHARD = 0
+METADATA_SHARD_ID_PREFIX = f"METADATA_SHARD{DB_KEY_SEPARATOR}"
+METADATA_SHARD_SEED_TYPE = "SEED_INDEX"
+
+VALIDATION_STOPPING_ERRORS = (
+    ValidationError,
+    ClientError,
+    JSONDecodeError,
+    FailureLimitReachedError,
+)
+
+ValidationResultArguments = Tuple[str, Check, ValidationResult, Optional[JsonObject]]
+ProcessingAssetValues = Tuple[str, str, Optional[str]]
+
+
+class ValidatedMetadata(NamedTuple):
+    links: List[str]
+    assets: List[Dict[str, str]]
+
+
+class ParsedMetadata(NamedTuple):
+    stac_object: JsonObject
+    links: List[str]
+    assets: List[Dict[str, str]]
+    schema_validation: Optional[SchemaValidationResult] = None
+    unmaterialised: Optional["UnmaterialisedLinksAndAssets"] = None
+
+
+class MetadataReadResult(NamedTuple):
+    object_json_or_error: Union[ParsedMetadata, ValidatedMetadata, Exception]
+    validation_results: List[ValidationResultArguments]
+    cache_range_key: Optional[str] = None
+    read_seconds: float = 0.0
+
+
+if TYPE_CHECKING:
+    MetadataReadFuture = Future[MetadataReadResult]  # pylint:disable=unsubscriptable-object
+    ProcessingAssetValuesQueue = Queue[  # pylint:disable=unsubscriptable-object
+        Optional[List[ProcessingAssetValues]]
+    ]
+else:
+    MetadataReadFuture = Future  # pragma: no mutate
+    ProcessingAssetValuesQueue = Queue  # pragma: no mutate
+
 
 @lru_cache
 def maybe_convert_relative_url_to_absolute(url_or_path: str, parent_url: str) -> str:
@@ -65,109 +188,636 @@ def maybe_convert_relative_url_to_absolute(url_or_path: str, parent_url: str) ->
     return f"{dirname(parent_url)}/{url_or_path}"
 
 
-class STACDatasetValidator:
-    def __init__(
+@lru_cache
+def get_compiled_stac_type_validation_map(cache_directory: str) -> "CompiledSTACTypeValidationMap":
+    """
+    Compiled validators are kept for the lifetime of the process. Their generated code is imported
+    from the bundle, or else kept in `cache_directory`, so warm Lambda containers skip compilation
+    entirely.
+    """
+    return CompiledSTACTypeValidationMap(cache_directory)
+
+
+class CompiledSTACTypeValidationMap(Mapping[str, SchemaValidator]):
+    """
+    Compiles the validator of each STAC type, and so loads its schemas, only when first used.
+    Schemas the compiler does not support keep using the `jsonschema` validator.
+    """
+
+    def __init__(self, cache_directory: str):
+        self.cache_directory = cache_directory
+        self.validators: Dict[str, SchemaValidator] = {}
+        self.lock = Lock()
+
+    def __getitem__(self, stac_type: str) -> SchemaValidator:
+        with self.lock:
+            if stac_type not in self.validators:
+                self.validators[stac_type] = self.compile(stac_type)
+            return self.validators[stac_type]
+
+    def __contains__(self, stac_type: object) -> bool:
+        return stac_type in STAC_TYPE_VALIDATION_MAP
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(STAC_TYPE_VALIDATION_MAP)
+
+    def __len__(self) -> int:
+        return len(STAC_TYPE_VALIDATION_MAP)
+
+    def compile(self, stac_type: str) -> SchemaValidator:
+        validator = STAC_TYPE_VALIDATION_MAP[stac_type]
+        try:
+            return CompiledSchemaValidator(
+                validator, self.cache_directory, get_packaged_compiled_schema_path(stac_type)
+            )
+        except UnsupportedSchemaError as error:
+            LOGGER.warning(
+                LOG_MESSAGE_SCHEMA_NOT_COMPILED, extra={"stac_type": stac_type, "error": error}
+            )
+            return validator
+
+
+@lru_cache
+def get_schema_set_version() -> str:
+    """Changes whenever the STAC schemas or the checks made on top of them change."""
+    schema_set = {
+        "rules_version": METADATA_VALIDATION_RULES_VERSION,
+        "schemas_digest": get_schemas_digest(),
+    }
+    return sha256(dumps(schema_set, sort_keys=True).encode()).hexdigest()
+
+
+class MetadataObject(NamedTuple):
+    body: StreamingBody
+    etag: str
+    version_id: Optional[str]
+
+
+class MetadataValidationCache:
+    """
+    Metadata files which passed validation, shared between dataset versions. Files are identified
+    by their URL and the ETag and version ID returned with their contents by `object_reader`, so
+    that a cached result is always for the contents read, together with the schemas and checks they
+    were validated with.
+    """
+
+    def __init__(self, table_name: str, object_reader: Callable[[str], MetadataObject]):
+        self.model = metadata_validation_cache_model_with_meta(table_name)
+        self.object_reader = object_reader
+        self.schema_set_version = get_schema_set_version()
+
+    def get(
+        self, url: str, etag: str, version_id: Optional[str]
+    ) -> Tuple[str, Optional[ValidatedMetadata]]:
+        """Return the cache key of the metadata file and its cached result, if any."""
+        range_key = get_metadata_validation_cache_range_key(
+            etag, version_id, self.schema_set_version
+        )
+        try:
+            item = self.model.get(url, range_key=range_key)
+        except self.model.DoesNotExist:
+            return range_key, None
+
+        assets = [
+            {PROCESSING_ASSET_URL_KEY: asset_url, PROCESSING_ASSET_MULTIHASH_KEY: multihash}
+            for asset_url, multihash in zip(item.asset_urls, item.asset_multihashes)
+        ]
+        return range_key, ValidatedMetadata([intern(link) for link in item.links], assets)
+
+    def save(self, entries: List[Tuple[str, str, ValidatedMetadata]]) -> None:
+        with self.model.batch_write() as batch:
+            for url, range_key, validated_metadata in entries:
+                asset_urls = [
+                    asset[PROCESSING_ASSET_URL_KEY] for asset in validated_metadata.assets
+                ]
+                if (
+                    sum(map(len, validated_metadata.links)) + sum(map(len, asset_urls))
+                    > MAX_CACHED_URL_CHARACTER_COUNT
+                ):
+                    continue
+
+                batch.save(
+                    self.model(
+                        hash_key=url,
+                        range_key=range_key,
+                        links=validated_metadata.links,
+                        asset_urls=asset_urls,
+                        asset_multihashes=[
+                            asset[PROCESSING_ASSET_MULTIHASH_KEY]
+                            for asset in validated_metadata.assets
+                        ],
+                    )
+                )
+
+
+class STACDatasetValidator:  # pylint:disable=too-many-instance-attributes,too-many-public-methods
+    def __init__(  # pylint:disable=too-many-arguments
         self,
         hash_key: str,
         url_reader: Callable[[str], StreamingBody],
         validation_result_factory: ValidationResultFactory,
+        concurrency: int = 1,
+        schema_validators: Optional[Mapping[str, SchemaValidator]] = None,
+        metadata_validation_cache: Optional[MetadataValidationCache] = None,
+        slow_log_threshold: Optional[float] = None,
+        object_lister: Optional[ObjectLister] = None,
+        validation_policy: ValidationPolicy = ValidationPolicy(),
+        schema_validation_pool: Optional[SchemaValidationPool] = None,
     ):
+        """
+        With `concurrency` above one, linked metadata files are read and parsed ahead of the
+        traversal on that many threads. Validation and result reporting stay on the calling thread
+        in traversal order, so the outcome is the same as reading one file at a time.
+
+        `schema_validators` maps STAC types to their schema validators, defaulting to
+        `STAC_TYPE_VALIDATION_MAP`. With a `schema_validation_pool`, files are validated against
+        their schemas by its worker processes as soon as they are read, and the outcomes are then
+        reported in traversal order as usual. The workers should use the same schema validators.
+
+        With a `metadata_validation_cache`, metadata files are read with its `object_reader` rather
+        than `url_reader`, and files which are unchanged since an earlier validation are not parsed
+        again; the links and assets found then are used instead.
+
+        The time spent in each phase of the validation is accumulated in `metrics`. Metadata files
+        taking more than `slow_log_threshold` seconds to read and validate are logged.
+
+        With an `object_lister`, the directories of the assets are listed once the whole dataset is
+        validated, failing the validation if any asset files are missing, and recording the sizes
+        of the others.
+
+        Failures are saved as `validation_policy` allows, stopping once it allows no more.
+        """
         self.hash_key = hash_key
         self.url_reader = url_reader
-        self.validation_result_factory = validation_result_factory
+        self.validation_result_factory = apply_validation_policy(
+            validation_result_factory, validation_policy
+        )
+        self.schema_validators = schema_validators or STAC_TYPE_VALIDATION_MAP
+        self.schema_validation_pool = schema_validation_pool
+        self.metadata_validation_cache = metadata_validation_cache
+        self.metadata_to_cache: List[Tuple[str, str, ValidatedMetadata]] = []
+        self.metadata_to_cache_character_count = 0
+        self.metrics = ValidationMetrics()
+        self.slow_log_threshold = slow_log_threshold
+        self.object_lister = object_lister
+        self.asset_sizes: Dict[str, int] = {}
 
-        self.traversed_urls: List[str] = []
-        self.dataset_assets: List[Dict[str, str]] = []
-        self.dataset_metadata: List[Dict[str, str]] = []
+        self.executor = None if concurrency < 2 else ThreadPoolExecutor(max_workers=concurrency)
+        self.max_reads_ahead = concurrency * READ_AHEAD_PER_THREAD
+        self.pending_read_urls: Deque[str] = deque()
+        self.reads_ahead: Dict[str, MetadataReadFuture] = {}
+
+        self.traversed_urls: Set[str] = set()
+        self.dataset_assets = RecordSpool(
+            [PROCESSING_ASSET_URL_KEY, PROCESSING_ASSET_MULTIHASH_KEY],
+            on_spill=partial(self.metrics.increment, SPILLED_BYTES_COUNTER),
+        )
+        self.dataset_metadata = RecordSpool(
+            [PROCESSING_ASSET_URL_KEY],
+            on_spill=partial(self.metrics.increment, SPILLED_BYTES_COUNTER),
+        )
 
         self.processing_assets_model = processing_assets_model_with_meta()
+        self.range_key_prefix = ""
+        self.metadata_shard_seeds: List[List[str]] = []
 
     def run(self, metadata_url: str) -> None:
-        if metadata_url[:5] != S3_URL_PREFIX:
-            error_message = f"URL doesn't start with “{S3_URL_PREFIX}”: “{metadata_url}”"
-            self.validation_result_factory.save(
-                metadata_url,
-                Check.NON_S3_URL,
-                ValidationResult.FAILED,
-                details={MESSAGE_KEY: error_message},
-            )
-            LOGGER.error(
-                LOG_MESSAGE_VALIDATION_COMPLETE,
-                extra={"outcome": Outcome.FAILED, "error": error_message},
-            )
+        if self.report_non_s3_url(metadata_url) or not self.traverse([metadata_url]):
             return
 
+        self.save_validated_dataset(metadata_url)
+
+    def run_root_pass(self, metadata_url: str) -> List[int]:
+        """
+        Validate the metadata files closest to `metadata_url` breadth first, until either the whole
+        catalog is validated and saved like `run` does, or at least
+        `SHARDED_VALIDATION_MIN_URL_COUNT` linked files are left. Those are then split into
+        contiguous shards for `run_shard` to validate and `run_merge` to combine, and the shard
+        numbers are returned.
+        """
+        if self.report_non_s3_url(metadata_url):
+            return []
+
         try:
-            self.validate(metadata_url)
-        except (ValidationError, ClientError, JSONDecodeError) as error:
-            LOGGER.error(
-                LOG_MESSAGE_VALIDATION_COMPLETE,
-                extra={"outcome": Outcome.FAILED, "error": str(error)},
+            unvalidated_urls = self.validate_breadth_first(metadata_url)
+        except VALIDATION_STOPPING_ERRORS as error:
+            log_validation_failure(error)
+            return []
+        finally:
+            self.stop_reading_ahead()
+
+        if not unvalidated_urls:
+            self.save_validated_dataset(metadata_url)
+            return []
+
+        self.save_metadata_validation_cache()
+        self.metadata_shard_seeds = split_into_shards(unvalidated_urls)
+        self.range_key_prefix = get_metadata_shard_range_key_prefix(ROOT_METADATA_SHARD)
+        with self.dataset_metadata, self.dataset_assets:
+            self.save_processing_assets()
+        first_shard = ROOT_METADATA_SHARD + 1
+        return list(range(first_shard, first_shard + len(self.metadata_shard_seeds)))
+
+    def run_shard(self, shard: int) -> None:
+        """
+        Validate the subtrees of one shard of the root pass. Files validated by the root pass are
+        skipped, while files linked from several shards are validated by each of them. Nothing is
+        saved if the validation stops on a failure, which `run_merge` relies on.
+        """
+        self.traversed_urls.update(
+            item.url
+            for item in self.query_metadata_shard(
+                ROOT_METADATA_SHARD, ProcessingAssetType.METADATA.value
             )
+        )
+        seed_urls = [
+            intern(item.url) for item in self.query_metadata_shard(shard, METADATA_SHARD_SEED_TYPE)
+        ]
+        if not self.traverse(seed_urls):
             return
 
-        if not self.dataset_assets:
-            error_details = {MESSAGE_KEY: NO_ASSETS_FOUND_ERROR_MESSAGE}
+        self.save_metadata_validation_cache()
+        self.range_key_prefix = get_metadata_shard_range_key_prefix(shard)
+        with self.dataset_metadata, self.dataset_assets:
+            self.save_processing_assets()
+
+    def run_merge(self, metadata_url: str, shards: List[int]) -> None:
+        """
+        Combine the metadata files and assets of the root pass and `shards`, in order, into the
+        processing assets of the dataset version, as if they were all validated by `run`. Files
+        validated by several shards, and their assets, are only included once. Like `run`, nothing
+        is saved if the validation of any shard stopped on a failure.
+        """
+        merged_asset_urls: Set[str] = set()
+        for shard in [ROOT_METADATA_SHARD, *shards]:
+            if not self.merge_metadata_shard(shard, merged_asset_urls):
+                LOGGER.warning(LOG_MESSAGE_METADATA_SHARD_FAILED, extra={"shard": shard})
+                return
+
+        self.save_validated_dataset(metadata_url)
+
+    def merge_metadata_shard(self, shard: int, merged_asset_urls: Set[str]) -> bool:
+        """
+        Returns whether the shard was saved. A shard whose validation stopped on a failure saves
+        nothing, while any other shard saves at least the files it started from.
+        """
+        metadata_items = self.query_metadata_shard(shard, ProcessingAssetType.METADATA.value)
+        if not metadata_items:
+            return False
+
+        for item in metadata_items:
+            if item.url not in self.traversed_urls:
+                self.traversed_urls.add(item.url)
+                self.dataset_metadata.append({PROCESSING_ASSET_URL_KEY: item.url})
+        for item in self.query_metadata_shard(shard, ProcessingAssetType.DATA.value):
+            if item.url not in merged_asset_urls:
+                merged_asset_urls.add(item.url)
+                self.dataset_assets.append(
+                    {
+                        PROCESSING_ASSET_URL_KEY: item.url,
+                        PROCESSING_ASSET_MULTIHASH_KEY: item.multihash,
+                    }
+                )
+        return True
+
+    def save_failure(self, url: str, check: Check, details: JsonObject) -> None:
+        with self.metrics.timer(VALIDATION_RESULTS_WRITE_PHASE):
             self.validation_result_factory.save(
-                metadata_url,
-                Check.ASSETS_IN_DATASET,
-                ValidationResult.FAILED,
-                details=error_details,
+                url, check, ValidationResult.FAILED, details=details
             )
+
+    def report_non_s3_url(self, metadata_url: str) -> bool:
+        if metadata_url[:5] == S3_URL_PREFIX:
+            return False
+
+        error_message = f"URL doesn't start with “{S3_URL_PREFIX}”: “{metadata_url}”"
+        self.save_failure(
+            metadata_url,
+            Check.NON_S3_URL,
+            {MESSAGE_KEY: error_message},
+        )
+        LOGGER.error(
+            LOG_MESSAGE_VALIDATION_COMPLETE,
+            extra={"outcome": Outcome.FAILED, "error": error_message},
+        )
+        return True
+
+    def traverse(self, urls: List[str]) -> bool:
+        """Validate the metadata files linked from `urls`, returning whether that succeeded."""
+        try:
+            self.validate(*urls)
+        except VALIDATION_STOPPING_ERRORS as error:
+            log_validation_failure(error)
+            return False
+        finally:
+            self.stop_reading_ahead()
+        return True
+
+    def query_metadata_shard(self, shard: int, item_type: str) -> List[ProcessingAssetsModelBase]:
+        range_key_prefix = (
+            f"{get_metadata_shard_range_key_prefix(shard)}{item_type}{DB_KEY_SEPARATOR}"
+        )
+        items = self.processing_assets_model.query(
+            self.hash_key,
+            range_key_condition=self.processing_assets_model.sk.startswith(range_key_prefix),
+            consistent_read=True,
+        )
+        return sorted(items, key=lambda item: int(item.sk[len(range_key_prefix) :]))
+
+    def cache_validated_metadata(
+        self, url: str, cache_range_key: str, validated_metadata: ValidatedMetadata
+    ) -> None:
+        self.metadata_to_cache.append((url, cache_range_key, validated_metadata))
+        self.metadata_to_cache_character_count += sum(map(len, validated_metadata.links)) + sum(
+            len(asset[PROCESSING_ASSET_URL_KEY]) for asset in validated_metadata.assets
+        )
+        if self.metadata_to_cache_character_count > METADATA_VALIDATION_CACHE_FLUSH_CHARACTER_COUNT:
+            self.save_metadata_validation_cache()
+
+    def save_metadata_validation_cache(self) -> None:
+        if self.metadata_validation_cache is not None:
+            with self.metrics.timer(VALIDATION_CACHE_WRITE_PHASE, len(self.metadata_to_cache)):
+                self.metadata_validation_cache.save(self.metadata_to_cache)
+        self.metadata_to_cache = []
+        self.metadata_to_cache_character_count = 0
+
+    def save_validated_dataset(self, metadata_url: str) -> None:
+        """The metadata files and assets are released once saved, or once the dataset failed."""
+        with self.dataset_metadata, self.dataset_assets:
+            self.save_metadata_validation_cache()
+
+            if not self.dataset_assets:
+                error_details = {MESSAGE_KEY: NO_ASSETS_FOUND_ERROR_MESSAGE}
+                self.save_failure(
+                    metadata_url,
+                    Check.ASSETS_IN_DATASET,
+                    error_details,
+                )
+                LOGGER.error(
+                    LOG_MESSAGE_VALIDATION_COMPLETE,
+                    extra={"outcome": Outcome.FAILED, "error": NO_ASSETS_FOUND_ERROR_MESSAGE},
+                )
+                return
+
+            if self.report_missing_assets():
+                return
+
+            self.save_processing_assets()
+            self.save_processing_assets_summary(metadata_url)
+
+    def report_missing_assets(self) -> bool:
+        """
+        Report the asset files which don't exist, recording the sizes of the others. Missing files
+        are left to the checksum check if the asset directories can't be listed.
+        """
+        if self.object_lister is None:
+            return False
+
+        asset_urls = [
+            asset[PROCESSING_ASSET_URL_KEY]
+            for asset in self.dataset_assets
+            if asset[PROCESSING_ASSET_URL_KEY].startswith(S3_URL_PREFIX)
+        ]
+        try:
+            with self.metrics.timer(ASSET_INVENTORY_PHASE, len(asset_urls)):
+                self.asset_sizes = get_object_sizes(self.object_lister, asset_urls)
+        except ClientError as error:
+            LOGGER.warning(LOG_MESSAGE_ASSET_INVENTORY_UNAVAILABLE, extra={"error": error})
+            return False
+
+        missing_urls = [url for url in dict.fromkeys(asset_urls) if url not in self.asset_sizes]
+        for url in missing_urls:
+            self.save_failure(
+                url,
+                Check.STAGING_ACCESS,
+                {MESSAGE_KEY: f"Asset file not found: “{url}”"},
+            )
+        if missing_urls:
             LOGGER.error(
                 LOG_MESSAGE_VALIDATION_COMPLETE,
-                extra={"outcome": Outcome.FAILED, "error": NO_ASSETS_FOUND_ERROR_MESSAGE},
+                extra={"outcome": Outcome.FAILED, "error": MISSING_ASSETS_ERROR_MESSAGE},
             )
-            return
+            return True
+        return False
 
-        self.process_metadata()
-        self.process_assets()
+    def save_processing_assets(self) -> None:
+        """
+        Write the metadata files and assets with BatchWriteItem on several threads. The items are
+        read once, and handed out to the threads in turn in chunks, through bounded queues.
+        PynamoDB retries unprocessed items with backoff, and raises `PutError` when they still
+        can't be written.
+        """
+        item_count = (
+            len(self.dataset_metadata)
+            + len(self.dataset_assets)
+            + sum(map(len, self.metadata_shard_seeds))
+        )
+        progress = WriteProgress(item_count)
+        stream_count = min(PROCESSING_ASSETS_WRITE_STREAM_COUNT, item_count)
+        queues: List[ProcessingAssetValuesQueue] = [
+            Queue(PROCESSING_ASSETS_WRITE_QUEUE_SIZE) for _ in range(stream_count)
+        ]
+        timer = self.metrics.timer(PROCESSING_ASSETS_WRITE_PHASE, item_count)
+        with timer, ThreadPoolExecutor(max_workers=stream_count) as executor:
+            streams = [
+                executor.submit(self.write_processing_assets, queue, progress) for queue in queues
+            ]
+            values = self.get_processing_asset_values()
+            try:
+                chunks = iter(lambda: list(islice(values, PROCESSING_ASSETS_WRITE_CHUNK_SIZE)), [])
+                for index, chunk in enumerate(chunks):
+                    queues[index % stream_count].put(chunk)
+            finally:
+                for queue in queues:
+                    queue.put(None)
+            for stream in streams:
+                stream.result()
 
-    def process_metadata(self) -> None:
-        for index, metadata_file in enumerate(self.dataset_metadata):
-            self.processing_assets_model(
-                hash_key=self.hash_key,
-                range_key=f"{ProcessingAssetType.METADATA.value}{DB_KEY_SEPARATOR}{index}",
-                url=metadata_file[PROCESSING_ASSET_URL_KEY],
-            ).save()
+    def save_processing_assets_summary(self, metadata_url: str) -> None:
+        """
+        Saved last, so that the summary only exists once all the processing assets do. The total
+        size is only known when the sizes of all the assets were recorded.
+        """
+        known_asset_sizes = [
+            size
+            for asset in self.dataset_assets
+            if (size := self.asset_sizes.get(asset[PROCESSING_ASSET_URL_KEY])) is not None
+        ]
+        asset_count = len(self.dataset_assets)
+        self.processing_assets_model(
+            hash_key=self.hash_key,
+            range_key=PROCESSING_ASSETS_SUMMARY_RANGE_KEY,
+            url=metadata_url,
+            size=sum(known_asset_sizes) if len(known_asset_sizes) == asset_count else None,
+            asset_count=asset_count,
+            metadata_count=len(self.dataset_metadata),
+        ).save()
+
+    def write_processing_assets(
+        self, chunks: ProcessingAssetValuesQueue, progress: WriteProgress
+    ) -> None:
+        """Takes chunks until the last one even after failing, so that queueing never blocks."""
+        chunk: Optional[List[ProcessingAssetValues]] = []
+        try:
+            with self.processing_assets_model.batch_write() as batch:
+                while (chunk := chunks.get()) is not None:
+                    for range_key, url, multihash in chunk:
+                        batch.save(
+                            self.processing_assets_model(
+                                hash_key=self.hash_key,
+                                range_key=range_key,
+                                url=url,
+                                multihash=multihash,
+                                size=None if multihash is None else self.asset_sizes.get(url),
+                            )
+                        )
+                        progress.increment()
+        finally:
+            while chunk is not None:
+                chunk = chunks.get()
 
-    def process_assets(self) -> None:
+    def get_processing_asset_values(self) -> Iterator[ProcessingAssetValues]:
+        """
+        Range keys start with `range_key_prefix`, which is empty unless the values are for a shard
+        of a sharded validation. The URLs each shard starts from go under that shard's prefix.
+        """
+        for index, metadata_file in enumerate(self.dataset_metadata):
+            yield (
+                f"{self.range_key_prefix}{ProcessingAssetType.METADATA.value}"
+                f"{DB_KEY_SEPARATOR}{index}",
+                metadata_file[PROCESSING_ASSET_URL_KEY],
+                None,
+            )
         for index, asset in enumerate(self.dataset_assets):
-            self.processing_assets_model(
-                hash_key=self.hash_key,
-                range_key=f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}",
-                url=asset[PROCESSING_ASSET_URL_KEY],
-                multihash=asset[PROCESSING_ASSET_MULTIHASH_KEY],
-            ).save()
+            yield (
+                f"{self.range_key_prefix}{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}",
+                asset[PROCESSING_ASSET_URL_KEY],
+                asset[PROCESSING_ASSET_MULTIHASH_KEY],
+            )
+        for shard, seed_urls in enumerate(self.metadata_shard_seeds, start=ROOT_METADATA_SHARD + 1):
+            for index, url in enumerate(seed_urls):
+                yield (
+                    f"{get_metadata_shard_range_key_prefix(shard)}{METADATA_SHARD_SEED_TYPE}"
+                    f"{DB_KEY_SEPARATOR}{index}",
+                    url,
+                    None,
+                )
+
+    def validate(self, *urls: str) -> None:
+        """
+        Depth-first walk of the metadata files linked from `urls`, in link order. The walk uses an
+        explicit stack rather than recursion, so the depth of the catalog is not limited by the
+        interpreter's recursion limit.
+        """
+        urls_to_validate = [intern(url) for url in reversed(urls)]
+        self.read_ahead(list(urls[1:]))
+        while urls_to_validate:
+            url = urls_to_validate.pop()
+            if url in self.traversed_urls:
+                continue
+
+            next_urls = self.validate_object(url)
+            self.read_ahead(next_urls)
+            urls_to_validate.extend(
+                next_url for next_url in reversed(next_urls) if next_url not in self.traversed_urls
+            )
+
+    def validate_breadth_first(self, url: str) -> List[str]:
+        """
+        Breadth-first walk of the metadata files linked from `url`, stopping once at least
+        `SHARDED_VALIDATION_MIN_URL_COUNT` URLs are waiting to be validated. Returns those URLs.
+        """
+        urls_to_validate = deque([intern(url)])
+        while urls_to_validate and len(urls_to_validate) < SHARDED_VALIDATION_MIN_URL_COUNT:
+            url = urls_to_validate.popleft()
+            if url in self.traversed_urls:
+                continue
+
+            next_urls = [
+                next_url
+                for next_url in self.validate_object(url)
+                if next_url not in self.traversed_urls
+            ]
+            self.read_ahead(next_urls, first=False)
+            urls_to_validate.extend(next_urls)
+
+        return [url for url in dict.fromkeys(urls_to_validate) if url not in self.traversed_urls]
 
-    def validate(self, url: str) -> None:  # pylint: disable=too-complex
-        self.traversed_urls.append(url)
-        object_json = self.get_object(url)
+    def validate_object(self, url: str) -> List[str]:
+        """Validate a single metadata file and return the URLs it links to."""
+        self.traversed_urls.add(url)
+        parsed_metadata, cache_range_key, read_seconds = self.get_object(url)
+        start = perf_counter()
 
+        if isinstance(parsed_metadata, ValidatedMetadata):
+            validated_metadata = parsed_metadata
+        else:
+            validated_metadata = self.validate_json(url, parsed_metadata)
+            if cache_range_key is not None:
+                self.cache_validated_metadata(url, cache_range_key, validated_metadata)
+
+        self.log_if_slow(url, read_seconds, perf_counter() - start)
+        with self.metrics.timer(VALIDATION_RESULTS_WRITE_PHASE):
+            self.validation_result_factory.save(url, Check.JSON_SCHEMA, ValidationResult.PASSED)
+        self.dataset_metadata.append({PROCESSING_ASSET_URL_KEY: url})
+        for asset_dict in validated_metadata.assets:
+            LOGGER.debug(LOG_MESSAGE_STAC_ASSET_INFO, extra={"asset": asset_dict})
+        self.dataset_assets.extend(validated_metadata.assets)
+
+        return validated_metadata.links
+
+    def validate_json(self, url: str, parsed_metadata: ParsedMetadata) -> ValidatedMetadata:
+        object_json = parsed_metadata.stac_object
         stac_type = object_json[STAC_TYPE_KEY]
-        validator = STAC_TYPE_VALIDATION_MAP[stac_type]
+        validator = self.schema_validators[stac_type]
 
         try:
-            validator.validate(object_json)
+            if parsed_metadata.schema_validation is None:
+                with self.metrics.timer(get_schema_validation_phase(stac_type)):
+                    validator.validate(object_json)
+            else:
+                self.report_schema_validation(stac_type, parsed_metadata.schema_validation)
+            self.validate_unmaterialised(validator, stac_type, parsed_metadata)
         except ValidationError as error:
-            self.validation_result_factory.save(
+            self.save_failure(
                 url,
                 Check.JSON_SCHEMA,
-                ValidationResult.FAILED,
-                details={MESSAGE_KEY: str(error)},
+                {MESSAGE_KEY: str(error)},
             )
             raise
 
+        self.validate_security_classification(url, object_json)
+
+        return ValidatedMetadata(parsed_metadata.links, parsed_metadata.assets)
+
+    def validate_unmaterialised(
+        self, validator: SchemaValidator, stac_type: str, parsed_metadata: ParsedMetadata
+    ) -> None:
+        if not parsed_metadata.unmaterialised:
+            return
+        with self.metrics.timer(get_schema_validation_phase(stac_type)):
+            for stac_object in parsed_metadata.unmaterialised.get_stac_objects(
+                parsed_metadata.stac_object
+            ):
+                validator.validate(stac_object)
+
+    def report_schema_validation(
+        self, stac_type: str, schema_validation: SchemaValidationResult
+    ) -> None:
+        self.metrics.add_phase(get_schema_validation_phase(stac_type), schema_validation.seconds)
+        if schema_validation.error_message is not None:
+            raise ValidationError(schema_validation.error_message)
+
+    def validate_security_classification(self, url: str, object_json: JsonObject) -> None:
         security_classification = object_json.get(LINZ_STAC_SECURITY_CLASSIFICATION_KEY)
         if (
             security_classification is not None
             and security_classification != LINZ_STAC_SECURITY_CLASSIFICATION_UNCLASSIFIED
         ):
-            self.validation_result_factory.save(
+            self.save_failure(
                 url,
                 Check.SECURITY_CLASSIFICATION,
-                ValidationResult.FAILED,
-                details={
+                {
                     MESSAGE_KEY: "Expected security classification of "
                     f"'{LINZ_STAC_SECURITY_CLASSIFICATION_UNCLASSIFIED}'. "
                     f"Got '{security_classification}'."
@@ -175,65 +825,376 @@ class STACDatasetValidator:
             )
             raise InvalidSecurityClassificationError(security_classification)
 
-        self.validation_result_factory.save(url, Check.JSON_SCHEMA, ValidationResult.PASSED)
-        self.dataset_metadata.append({PROCESSING_ASSET_URL_KEY: url})
+    def log_if_slow(self, url: str, read_seconds: float, validation_seconds: float) -> None:
+        if (
+            self.slow_log_threshold is not None
+            and read_seconds + validation_seconds > self.slow_log_threshold
+        ):
+            LOGGER.warning(
+                LOG_MESSAGE_SLOW_METADATA_FILE,
+                extra={
+                    "url": url,
+                    "read_seconds": read_seconds,
+                    "validation_seconds": validation_seconds,
+                },
+            )
 
-        for asset in object_json.get(STAC_ASSETS_KEY, {}).values():
-            asset_url = maybe_convert_relative_url_to_absolute(asset[STAC_HREF_KEY], url)
+    def get_object(
+        self, url: str
+    ) -> Tuple[Union[ParsedMetadata, ValidatedMetadata], Optional[str], float]:
+        """
+        Return the parsed metadata file or its cached validation result, the key to cache the
+        result under, and how long reading it took. Files with any failed checks while reading are
+        not cached.
+        """
+        read_ahead = self.reads_ahead.pop(url, None)
+        if read_ahead is None:
+            read_result = self.read_object(url)
+        else:
+            read_result = read_ahead.result()
+            self.start_reads_ahead()
 
-            asset_dict = {
-                PROCESSING_ASSET_URL_KEY: asset_url,
-                PROCESSING_ASSET_MULTIHASH_KEY: asset[STAC_FILE_CHECKSUM_KEY],
-            }
-            LOGGER.debug(LOG_MESSAGE_STAC_ASSET_INFO, extra={"asset": asset_dict})
-            self.dataset_assets.append(asset_dict)
+        with self.metrics.timer(
+            VALIDATION_RESULTS_WRITE_PHASE, len(read_result.validation_results)
+        ):
+            for result_url, check, result, details in read_result.validation_results:
+                self.validation_result_factory.save(result_url, check, result, details=details)
+        check_failure_limit(self.validation_result_factory)
 
-        for link_object in object_json[STAC_LINKS_KEY]:
-            next_url = maybe_convert_relative_url_to_absolute(link_object[STAC_HREF_KEY], url)
+        if isinstance(read_result.object_json_or_error, Exception):
+            raise read_result.object_json_or_error
+        cache_range_key = None if read_result.validation_results else read_result.cache_range_key
+        return read_result.object_json_or_error, cache_range_key, read_result.read_seconds
 
-            if next_url not in self.traversed_urls:
-                self.validate(next_url)
+    def read_object(self, url: str) -> MetadataReadResult:
+        """
+        Safe to run on any thread: validation results are collected rather than saved, for
+        `get_object` to report.
+        """
+        start = perf_counter()
+        read_result = self.fetch_object(url)
+        return self.validate_schema_in_pool(
+            url, read_result._replace(read_seconds=perf_counter() - start)
+        )
 
-    def get_object(self, url: str) -> JsonObject:
+    def validate_schema_in_pool(
+        self, url: str, read_result: MetadataReadResult
+    ) -> MetadataReadResult:
+        """
+        Objects without a known STAC type are left for `validate_json` to fail, and objects which
+        the pool fails to validate for `validate_json` to validate.
+        """
+        parsed_metadata = read_result.object_json_or_error
+        if (
+            self.schema_validation_pool is None
+            or not isinstance(parsed_metadata, ParsedMetadata)
+            or not isinstance(parsed_metadata.stac_object, dict)
+            or str(parsed_metadata.stac_object.get(STAC_TYPE_KEY)) not in self.schema_validators
+        ):
+            return read_result
+
+        schema_validation = self.schema_validation_pool.validate(parsed_metadata.stac_object)
+        if schema_validation.worker_error is not None:
+            LOGGER.warning(
+                LOG_MESSAGE_SCHEMA_VALIDATION_WORKER_FAILED,
+                extra={"url": url, "error": schema_validation.worker_error},
+            )
+            return read_result
+        return read_result._replace(
+            object_json_or_error=parsed_metadata._replace(schema_validation=schema_validation)
+        )
+
+    def fetch_object(self, url: str) -> MetadataReadResult:
+        validation_results: List[ValidationResultArguments] = []
         try:
-            url_stream = self.url_reader(url)
+            cache_range_key, url_stream_or_validated_metadata = self.read_metadata(url)
         except ClientError as error:
-            self.validation_result_factory.save(
-                url,
-                Check.STAGING_ACCESS,
-                ValidationResult.FAILED,
-                details={MESSAGE_KEY: str(error)},
+            validation_results.append(
+                (url, Check.STAGING_ACCESS, ValidationResult.FAILED, {MESSAGE_KEY: str(error)})
             )
-            raise
-        try:
-            json_object: JsonObject = load(
-                url_stream, object_pairs_hook=self.duplicate_object_names_report_builder(url)
+            return MetadataReadResult(error, validation_results)
+        if isinstance(url_stream_or_validated_metadata, ValidatedMetadata):
+            return MetadataReadResult(url_stream_or_validated_metadata, validation_results)
+        return parse_object(
+            url, url_stream_or_validated_metadata, validation_results, cache_range_key, self.metrics
+        )
+
+    def read_metadata(
+        self, url: str
+    ) -> Tuple[Optional[str], Union[StreamingBody, ValidatedMetadata]]:
+        """
+        Return the key to cache the result of the metadata file under, and either its contents or
+        its cached result. The file is read either way, to know which contents a cached result is
+        for, but not parsed on a hit.
+        """
+        if self.metadata_validation_cache is None:
+            with self.metrics.timer(FETCH_PHASE):
+                return None, self.url_reader(url)
+
+        with self.metrics.timer(FETCH_PHASE):
+            metadata_object = self.metadata_validation_cache.object_reader(url)
+        with self.metrics.timer(VALIDATION_CACHE_READ_PHASE):
+            cache_range_key, validated_metadata = self.metadata_validation_cache.get(
+                url, metadata_object.etag, metadata_object.version_id
             )
-        except JSONDecodeError as error:
-            self.validation_result_factory.save(
-                url, Check.JSON_PARSE, ValidationResult.FAILED, details={MESSAGE_KEY: str(error)}
+        if validated_metadata is None:
+            return cache_range_key, metadata_object.body
+
+        metadata_object.body.close()
+        self.metrics.increment(VALIDATION_CACHE_HITS_COUNTER)
+        return cache_range_key, validated_metadata
+
+    def read_ahead(self, urls: List[str], first: bool = True) -> None:
+        """
+        Queue URLs to be read before any already queued, matching the depth-first order, or after
+        them for a breadth-first walk.
+        """
+        if self.executor is None:
+            return
+
+        if first:
+            self.pending_read_urls.extendleft(reversed(urls))
+        else:
+            self.pending_read_urls.extend(urls)
+        self.start_reads_ahead()
+
+    def start_reads_ahead(self) -> None:
+        assert self.executor is not None
+        while self.pending_read_urls and len(self.reads_ahead) < self.max_reads_ahead:
+            url = self.pending_read_urls.popleft()
+            if url not in self.reads_ahead and url not in self.traversed_urls:
+                self.reads_ahead[url] = self.executor.submit(self.read_object, url)
+
+    def stop_reading_ahead(self) -> None:
+        if self.executor is None:
+            return
+
+        self.pending_read_urls.clear()
+        for read_ahead in self.reads_ahead.values():
+            read_ahead.cancel()
+        self.reads_ahead.clear()
+        self.executor.shutdown()
+
+
+def split_into_shards(urls: List[str]) -> List[List[str]]:
+    """Split `urls` into at most `MAX_METADATA_SHARD_COUNT` contiguous parts of similar length."""
+    shard_count = min(MAX_METADATA_SHARD_COUNT, len(urls))
+    bounds = [len(urls) * index // shard_count for index in range(shard_count + 1)]
+    return [urls[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def get_metadata_shard_range_key_prefix(shard: int) -> str:
+    return f"{METADATA_SHARD_ID_PREFIX}{shard}{DB_KEY_SEPARATOR}"
+
+
+def log_validation_failure(error: Exception) -> None:
+    LOGGER.error(
+        LOG_MESSAGE_VALIDATION_COMPLETE, extra={"outcome": Outcome.FAILED, "error": str(error)}
+    )
+
+
+def parse_object(
+    url: str,
+    url_stream: StreamingBody,
+    validation_results: List[ValidationResultArguments],
+    cache_range_key: Optional[str],
+    metrics: ValidationMetrics,
+) -> MetadataReadResult:
+    """
+    Parsing includes reading the body of the metadata file, which is streamed from S3 rather than
+    downloaded when fetching the file.
+    """
+    parser = MetadataParser(
+        url, validation_results, on_spill=partial(metrics.increment, SPILLED_BYTES_COUNTER)
+    )
+    try:
+        with metrics.timer(PARSE_PHASE):
+            parsed_metadata = parser.parse(url_stream)
+    except JSONDecodeError as error:
+        validation_results.append(
+            (url, Check.JSON_PARSE, ValidationResult.FAILED, {MESSAGE_KEY: str(error)})
+        )
+        return MetadataReadResult(error, validation_results)
+    except ClientError as error:
+        return MetadataReadResult(error, validation_results)
+    finally:
+        metrics.increment(BYTES_READ_COUNTER, parser.read_size)
+    return MetadataReadResult(parsed_metadata, validation_results, cache_range_key)
+
+
+class MetadataParser:
+    """
+    Streams a metadata file, collecting the absolute URLs of its links and assets as they are read.
+    Only the first `MAX_MATERIALISED_LINK_AND_ASSET_COUNT` links and assets are kept in the parsed
+    object for schema validation, along with any missing the properties collected here, so that
+    schema validation still reports those. The others are kept as JSON, to be schema validated in
+    batches.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        validation_results: List[ValidationResultArguments],
+        on_spill: Optional[Callable[[int], None]] = None,
+    ):
+        self.url = url
+        self.validation_results = validation_results
+        self.links: List[str] = []
+        self.assets: List[Dict[str, str]] = []
+        self.unmaterialised = UnmaterialisedLinksAndAssets(on_spill)
+        self.materialised_count = 0
+        self.read_size = 0
+
+    def parse(self, url_stream: StreamingBody) -> ParsedMetadata:
+        reader = JSONStreamReader(
+            url_stream,
+            object_pairs_hook=duplicate_object_names_report_builder(
+                self.url, self.validation_results
+            ),
+        )
+        try:
+            if reader.peek() == "{":
+                stac_object = self.read_stac_object(reader)
+            else:
+                stac_object = reader.read_value()
+            reader.read_end()
+        finally:
+            self.read_size = reader.read_size
+        return ParsedMetadata(
+            stac_object, self.links, self.assets, unmaterialised=self.unmaterialised
+        )
+
+    def read_stac_object(self, reader: JSONStreamReader) -> JsonObject:
+        stac_object: JsonObject = {}
+        for key in reader.read_object_members():
+            if key in stac_object:
+                self.validation_results.append(get_duplicate_object_name_result(self.url, key))
+                reader.read_value()
+            elif key == STAC_LINKS_KEY and reader.peek() == "[":
+                stac_object[key] = self.read_links(reader)
+            elif key == STAC_ASSETS_KEY and reader.peek() == "{":
+                stac_object[key] = self.read_assets(reader)
+            else:
+                stac_object[key] = reader.read_value()
+        return stac_object
+
+    def read_links(self, reader: JSONStreamReader) -> List[Any]:
+        materialised_links = []
+        for _ in reader.read_array_elements():
+            link = reader.read_value()
+            href = link.get(STAC_HREF_KEY) if isinstance(link, dict) else None
+            if isinstance(href, str):
+                self.links.append(intern(maybe_convert_relative_url_to_absolute(href, self.url)))
+            if self.should_materialise(isinstance(href, str)):
+                materialised_links.append(link)
+            else:
+                self.unmaterialised.links.append({UNMATERIALISED_JSON_KEY: dumps(link)})
+        return materialised_links
+
+    def read_assets(self, reader: JSONStreamReader) -> JsonObject:
+        materialised_assets = {}
+        asset_names = set()
+        for name in reader.read_object_members():
+            asset = reader.read_value()
+            if name in asset_names:
+                self.validation_results.append(get_duplicate_object_name_result(self.url, name))
+                continue
+            asset_names.add(name)
+
+            is_complete = isinstance(asset, dict) and all(
+                isinstance(asset.get(key), str) for key in [STAC_HREF_KEY, STAC_FILE_CHECKSUM_KEY]
             )
-            raise
-        return json_object
+            if is_complete:
+                self.assets.append(
+                    {
+                        PROCESSING_ASSET_URL_KEY: maybe_convert_relative_url_to_absolute(
+                            asset[STAC_HREF_KEY], self.url
+                        ),
+                        PROCESSING_ASSET_MULTIHASH_KEY: asset[STAC_FILE_CHECKSUM_KEY],
+                    }
+                )
+            if self.should_materialise(is_complete):
+                materialised_assets[name] = asset
+            else:
+                self.unmaterialised.assets.append(
+                    {UNMATERIALISED_NAME_KEY: name, UNMATERIALISED_JSON_KEY: dumps(asset)}
+                )
+        return materialised_assets
+
+    def should_materialise(self, is_complete: bool) -> bool:
+        if is_complete and self.materialised_count >= MAX_MATERIALISED_LINK_AND_ASSET_COUNT:
+            return False
+        self.materialised_count += 1
+        return True
+
+
+class UnmaterialisedLinksAndAssets:  # pylint:disable=too-few-public-methods
+    """The links and assets `MetadataParser` leaves out of the parsed object."""
+
+    def __init__(self, on_spill: Optional[Callable[[int], None]] = None):
+        self.links = RecordSpool([UNMATERIALISED_JSON_KEY], on_spill=on_spill)
+        self.assets = RecordSpool(
+            [UNMATERIALISED_NAME_KEY, UNMATERIALISED_JSON_KEY], on_spill=on_spill
+        )
+
+    def __len__(self) -> int:
+        return len(self.links) + len(self.assets)
+
+    def get_stac_objects(self, stac_object: JsonObject) -> Iterator[JsonObject]:
+        """
+        Copies of the parsed object with a batch of the links or assets left out of it in place of
+        its own, so that validating them validates those. The copies keep only the first of the
+        other links or assets, which were validated with the parsed object.
+        """
+        batch_base = dict(stac_object)
+        if isinstance(links := stac_object.get(STAC_LINKS_KEY), list):
+            batch_base[STAC_LINKS_KEY] = links[:1]
+        if isinstance(assets := stac_object.get(STAC_ASSETS_KEY), dict):
+            batch_base[STAC_ASSETS_KEY] = dict(islice(assets.items(), 1))
+
+        for links_batch in get_batches(self.links):
+            yield {
+                **batch_base,
+                STAC_LINKS_KEY: [loads(link[UNMATERIALISED_JSON_KEY]) for link in links_batch],
+            }
+        for assets_batch in get_batches(self.assets):
+            yield {
+                **batch_base,
+                STAC_ASSETS_KEY: {
+                    asset[UNMATERIALISED_NAME_KEY]: loads(asset[UNMATERIALISED_JSON_KEY])
+                    for asset in assets_batch
+                },
+            }
+
+
+def get_batches(records: RecordSpool) -> Iterator[List[Dict[str, str]]]:
+    record_iterator = iter(records)
+    while batch := list(islice(record_iterator, MAX_MATERIALISED_LINK_AND_ASSET_COUNT)):
+        yield batch
+
+
+def duplicate_object_names_report_builder(
+    url: str, validation_results: List[ValidationResultArguments]
+) -> Callable[[List[Tuple[str, Any]]], JsonObject]:
+    def report_duplicate_object_names(object_pairs: List[Tuple[str, Any]]) -> JsonObject:
+        result = {}
+        for key, value in object_pairs:
+            if key in result:
+                validation_results.append(get_duplicate_object_name_result(url, key))
+            else:
+                result[key] = value
+        return result
+
+    return report_duplicate_object_names
 
-    def duplicate_object_names_report_builder(
-        self, url: str
-    ) -> Callable[[List[Tuple[str, Any]]], JsonObject]:
-        def report_duplicate_object_names(object_pairs: List[Tuple[str, Any]]) -> JsonObject:
-            result = {}
-            for key, value in object_pairs:
-                if key in result:
-                    self.validation_result_factory.save(
-                        url,
-                        Check.DUPLICATE_OBJECT_KEY,
-                        ValidationResult.FAILED,
-                        details={MESSAGE_KEY: f"Found duplicate object name “{key}” in “{url}”"},
-                    )
-                else:
-                    result[key] = value
-            return result
 
-        return report_duplicate_object_names
+def get_duplicate_object_name_result(url: str, key: str) -> ValidationResultArguments:
+    return (
+        url,
+        Check.DUPLICATE_OBJECT_KEY,
+        ValidationResult.FAILED,
+        {MESSAGE_KEY: f"Found duplicate object name “{key}” in “{url}”"},
+    )
 
 
 class InvalidSecurityClassificationError(Exception):
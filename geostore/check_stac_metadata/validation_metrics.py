@@ -0,0 +1,103 @@
+"""
+Timers and counters of one metadata validation run, logged once per run in the CloudWatch Embedded
+Metric Format, so that CloudWatch turns them into metrics without any extra API calls.
+"""
+from contextlib import contextmanager
+from logging import Logger
+from resource import RUSAGE_SELF, getrusage
+from threading import Lock
+from time import perf_counter, time
+from typing import Dict, Iterator
+
+from linz_logger import get_log
+
+from ..types import JsonObject
+
+LOGGER: Logger = get_log()
+
+LOG_MESSAGE_VALIDATION_METRICS = "MetadataValidation:Metrics"
+
+METRICS_NAMESPACE = "Geostore/MetadataValidation"
+
+ASSET_INVENTORY_PHASE = "AssetInventory"
+FETCH_PHASE = "Fetch"
+PARSE_PHASE = "Parse"
+PROCESSING_ASSETS_WRITE_PHASE = "ProcessingAssetsWrite"
+VALIDATION_CACHE_READ_PHASE = "ValidationCacheRead"
+VALIDATION_CACHE_WRITE_PHASE = "ValidationCacheWrite"
+VALIDATION_RESULTS_WRITE_PHASE = "ValidationResultsWrite"
+
+BYTES_READ_COUNTER = "BytesRead"
+SPILLED_BYTES_COUNTER = "SpilledBytes"
+VALIDATION_CACHE_HITS_COUNTER = "ValidationCacheHits"
+COUNTER_UNITS = {BYTES_READ_COUNTER: "Bytes", SPILLED_BYTES_COUNTER: "Bytes"}
+
+PEAK_MEMORY_METRIC = "PeakMemory"
+
+
+def get_schema_validation_phase(stac_type: str) -> str:
+    return f"{stac_type}Validation"
+
+
+class ValidationMetrics:
+    """
+    Each phase accumulates the time spent in it and how many times it was entered, or how many
+    items it handled. Safe to update from any thread.
+    """
+
+    def __init__(self) -> None:
+        self.phase_seconds: Dict[str, float] = {}
+        self.phase_counts: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.lock = Lock()
+
+    @contextmanager
+    def timer(self, phase: str, count: int = 1) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(phase, perf_counter() - start, count)
+
+    def add_phase(self, phase: str, seconds: float, count: int = 1) -> None:
+        with self.lock:
+            self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+            self.phase_counts[phase] = self.phase_counts.get(phase, 0) + count
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def as_embedded_metric_format(self) -> JsonObject:
+        with self.lock:
+            values: Dict[str, float] = {}
+            units: Dict[str, str] = {}
+            for phase, seconds in self.phase_seconds.items():
+                values[f"{phase}Time"] = round(seconds * 1000, 3)
+                units[f"{phase}Time"] = "Milliseconds"
+                values[f"{phase}Count"] = self.phase_counts[phase]
+                units[f"{phase}Count"] = "Count"
+            for counter, amount in self.counters.items():
+                values[counter] = amount
+                units[counter] = COUNTER_UNITS.get(counter, "Count")
+        # Of the whole process, including earlier invocations of a warm Lambda function
+        values[PEAK_MEMORY_METRIC] = getrusage(RUSAGE_SELF).ru_maxrss
+        units[PEAK_MEMORY_METRIC] = "Kilobytes"
+
+        return {
+            "_aws": {
+                "Timestamp": int(time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": METRICS_NAMESPACE,
+                        "Dimensions": [[]],
+                        "Metrics": [{"Name": name, "Unit": unit} for name, unit in units.items()],
+                    }
+                ],
+            },
+            **values,
+        }
+
+    def log(self) -> None:
+        # The metrics have to be top level members of the log entry for CloudWatch to find them
+        LOGGER.info(LOG_MESSAGE_VALIDATION_METRICS, **self.as_embedded_metric_format())
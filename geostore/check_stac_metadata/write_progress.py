@@ -0,0 +1,31 @@
+from logging import Logger
+from threading import Lock
+
+from linz_logger import get_log
+
+LOGGER: Logger = get_log()
+
+LOG_MESSAGE_PROCESSING_ASSETS_PROGRESS = "ProcessingAssets:Progress"
+
+PROCESSING_ASSETS_PROGRESS_LOG_INTERVAL = 10_000
+
+
+class WriteProgress:  # pylint:disable=too-few-public-methods
+    def __init__(self, item_count: int):
+        self.item_count = item_count
+        self.saved_count = 0
+        self.lock = Lock()
+
+    def increment(self) -> None:
+        with self.lock:
+            self.saved_count += 1
+            saved_count = self.saved_count
+
+        if (
+            saved_count % PROCESSING_ASSETS_PROGRESS_LOG_INTERVAL == 0
+            or saved_count == self.item_count
+        ):
+            LOGGER.info(
+                LOG_MESSAGE_PROCESSING_ASSETS_PROGRESS,
+                extra={"saved": saved_count, "total": self.item_count},
+            )
@@ -0,0 +1,50 @@
+"""Verified checksum cache DynamoDB model."""
+from os import environ
+from typing import Optional, Type
+
+from pynamodb.attributes import UTCDateTimeAttribute, UnicodeAttribute
+from pynamodb.models import Model
+
+from .aws_keys import AWS_DEFAULT_REGION_KEY
+from .clock import now
+from .models import DB_KEY_SEPARATOR
+from .parameter_store import ParameterName, get_param
+
+ETAG_ID_PREFIX = f"ETAG{DB_KEY_SEPARATOR}"
+MULTIHASH_ID_PREFIX = f"MULTIHASH{DB_KEY_SEPARATOR}"
+SIZE_ID_PREFIX = f"SIZE{DB_KEY_SEPARATOR}"
+VERSION_ID_PREFIX = f"VERSION{DB_KEY_SEPARATOR}"
+
+
+class ChecksumCacheModelBase(Model):
+    pk = UnicodeAttribute(hash_key=True)
+    sk = UnicodeAttribute(range_key=True)
+    verified_at = UTCDateTimeAttribute(default_for_new=now)
+
+
+def checksum_cache_model_with_meta(
+    checksum_cache_table_name: Optional[str] = None,
+) -> Type[ChecksumCacheModelBase]:
+    if checksum_cache_table_name is None:
+        checksum_cache_table_name = get_param(ParameterName.PROCESSING_CHECKSUM_CACHE_TABLE_NAME)
+
+    class ChecksumCacheModel(ChecksumCacheModelBase):
+        class Meta:  # pylint:disable=too-few-public-methods
+            table_name = checksum_cache_table_name
+            region = environ[AWS_DEFAULT_REGION_KEY]
+
+    return ChecksumCacheModel
+
+
+def get_checksum_cache_range_key(
+    etag: str, version_id: Optional[str], size: int, hex_multihash: str
+) -> str:
+    """
+    Identifies a single immutable source object and the checksum it was verified against. Version
+    IDs are only unique within a versioned bucket, so the ETag is always part of the key.
+    """
+    return (
+        f"{ETAG_ID_PREFIX}{etag}{DB_KEY_SEPARATOR}{VERSION_ID_PREFIX}{version_id or ''}"
+        f"{DB_KEY_SEPARATOR}{SIZE_ID_PREFIX}{size}{DB_KEY_SEPARATOR}{MULTIHASH_ID_PREFIX}"
+        f"{hex_multihash}"
+    )
@@ -22,6 +22,8 @@ from .step_function_keys import (
     DATASET_ID_SHORT_KEY,
     DESCRIPTION_KEY,
     EXECUTION_ARN_KEY,
+    MAX_FAILURES_KEY,
+    MAX_FAILURES_PER_CHECK_KEY,
     METADATA_URL_KEY,
     S3_ROLE_ARN_KEY,
     TITLE_KEY,
@@ -153,20 +155,31 @@ def dataset_version_create(
         help="ARN of the role which the Geostore should assume to read your dataset,"
         " for example 'arn:aws:iam::1234567890:role/s3-reader'.",
     ),
+    max_failures: Optional[int] = Option(
+        None, min=1, help="Stop validating the dataset after this many failures."
+    ),
+    max_failures_per_check: Optional[int] = Option(
+        None,
+        min=1,
+        help="Record at most this many failures of each check, and only count the others.",
+    ),
 ) -> None:
     def get_output(response_body: JsonObject) -> str:
         return f"{response_body[VERSION_ID_KEY]}\t{response_body[EXECUTION_ARN_KEY]}"
 
+    body: JsonObject = {
+        DATASET_ID_SHORT_KEY: dataset_id,
+        METADATA_URL_KEY: metadata_url,
+        S3_ROLE_ARN_KEY: s3_role_arn,
+    }
+    if max_failures is not None:
+        body[MAX_FAILURES_KEY] = max_failures
+    if max_failures_per_check is not None:
+        body[MAX_FAILURES_PER_CHECK_KEY] = max_failures_per_check
+
     handle_api_request(
         Resource.DATASET_VERSIONS_ENDPOINT_FUNCTION_NAME.resource_name,
-        {
-            HTTP_METHOD_KEY: HTTP_METHOD_CREATE,
-            BODY_KEY: {
-                DATASET_ID_SHORT_KEY: dataset_id,
-                METADATA_URL_KEY: metadata_url,
-                S3_ROLE_ARN_KEY: s3_role_arn,
-            },
-        },
+        {HTTP_METHOD_KEY: HTTP_METHOD_CREATE, BODY_KEY: body},
         get_output,
     )
 
@@ -0,0 +1,106 @@
+"""
+Planning of the Batch jobs checksumming a page of assets, so that each job checksums about as many
+bytes as the others rather than one asset each, and a single large asset doesn't hold up a job
+which also has to checksum many others.
+"""
+from heapq import heappop, heappush
+from math import ceil
+from typing import List, NamedTuple, Optional, Tuple, Type
+
+from ..models import DB_KEY_SEPARATOR
+from ..processing_assets_model import (
+    ChecksumShardModelBase,
+    ProcessingAssetType,
+    ProcessingAssetsModelBase,
+    get_checksum_shard_range_key,
+    get_processing_assets,
+)
+
+CHECKSUM_SHARD_TARGET_SIZE = 4 * 1024 ** 3
+CHECKSUM_SHARD_MAX_ASSET_COUNT = 100
+
+DATA_ITEM_RANGE_KEY_PREFIX = f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}"
+
+
+class ChecksumShard(NamedTuple):
+    indexes: List[int]
+    size: int
+
+
+def plan_checksum_shards(
+    processing_assets_model: Type[ProcessingAssetsModelBase],
+    hash_key: str,
+    first_item_index: int,
+    iteration_size: int,
+) -> Optional[List[ChecksumShard]]:
+    """
+    Return `None` when the page can't be planned, because some of the asset sizes aren't recorded,
+    or doesn't need to be, because each shard would have a single asset anyway.
+    """
+    range_keys = [
+        f"{DATA_ITEM_RANGE_KEY_PREFIX}{index}"
+        for index in range(first_item_index, first_item_index + iteration_size)
+    ]
+    indexed_sizes = [
+        (int(asset.range_key[len(DATA_ITEM_RANGE_KEY_PREFIX) :]), asset.size)
+        for asset in get_processing_assets(processing_assets_model, hash_key, range_keys)
+        if asset.size is not None
+    ]
+    if len(indexed_sizes) != iteration_size:
+        return None
+
+    shard_count = get_checksum_shard_count([size for _, size in indexed_sizes])
+    if shard_count == iteration_size:
+        return None
+    return pack_checksum_shards(indexed_sizes, shard_count)
+
+
+def get_checksum_shard_count(asset_sizes: List[int]) -> int:
+    """Enough shards for each to have at most the target size and asset count, if possible."""
+    return min(
+        len(asset_sizes),
+        max(
+            ceil(sum(asset_sizes) / CHECKSUM_SHARD_TARGET_SIZE),
+            ceil(len(asset_sizes) / CHECKSUM_SHARD_MAX_ASSET_COUNT),
+        ),
+    )
+
+
+def pack_checksum_shards(
+    indexed_sizes: List[Tuple[int, int]], shard_count: int
+) -> List[ChecksumShard]:
+    """
+    Add the assets from largest to smallest, each to the shard with the fewest bytes so far, or the
+    fewest assets among equally large shards. The largest shard is then at most a third larger than
+    in the best possible split.
+    """
+    shard_heap: List[Tuple[int, int, int]] = [(0, 0, shard) for shard in range(shard_count)]
+    shard_indexes: List[List[int]] = [[] for _ in range(shard_count)]
+    for index, size in sorted(indexed_sizes, key=lambda indexed_size: -indexed_size[1]):
+        shard_size, shard_asset_count, shard = heappop(shard_heap)
+        shard_indexes[shard].append(index)
+        heappush(shard_heap, (shard_size + size, shard_asset_count + 1, shard))
+
+    shard_sizes = {shard: shard_size for shard_size, _, shard in shard_heap}
+    return [
+        ChecksumShard(sorted(indexes), shard_sizes[shard])
+        for shard, indexes in enumerate(shard_indexes)
+    ]
+
+
+def save_checksum_shards(
+    checksum_shard_model: Type[ChecksumShardModelBase],
+    hash_key: str,
+    first_item_index: int,
+    shards: List[ChecksumShard],
+) -> None:
+    with checksum_shard_model.batch_write() as batch:
+        for shard, checksum_shard in enumerate(shards):
+            batch.save(
+                checksum_shard_model(
+                    hash_key=hash_key,
+                    range_key=get_checksum_shard_range_key(first_item_index, shard),
+                    indexes=checksum_shard.indexes,
+                    size=checksum_shard.size,
+                )
+            )
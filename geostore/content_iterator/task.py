@@ -1,19 +1,59 @@
+from math import ceil
+from typing import Dict, Optional, Type
+
 from jsonschema import validate
 
+from ..content_iterator_keys import (
+    ARRAY_SIZE_KEY,
+    ASSETS_PER_JOB_KEY,
+    ASSETS_TABLE_NAME_KEY,
+    CHECKSUM_CACHE_TABLE_NAME_KEY,
+    CHECKSUM_TIER_BATCH,
+    CHECKSUM_TIER_KEY,
+    CHECKSUM_TIER_LAMBDA,
+    CONTENT_KEY,
+    FIRST_ITEM_KEY,
+    ITERATION_SIZE_KEY,
+    NEXT_ITEM_KEY,
+    NO_CHECKSUM_SHARDS,
+    RESULTS_TABLE_NAME_KEY,
+    SHARD_COUNT_KEY,
+)
 from ..models import DATASET_ID_PREFIX, DB_KEY_SEPARATOR, VERSION_ID_PREFIX
 from ..parameter_store import ParameterName, get_param
-from ..processing_assets_model import ProcessingAssetType, processing_assets_model_with_meta
-from ..step_function_keys import DATASET_ID_KEY, METADATA_URL_KEY, VERSION_ID_KEY
+from ..processing_assets_model import (
+    ProcessingAssetType,
+    ProcessingAssetsModelBase,
+    ProcessingAssetsSummary,
+    checksum_shard_model_with_meta,
+    get_processing_assets,
+    get_processing_assets_summary,
+    processing_assets_model_with_meta,
+)
+from ..step_function_keys import (
+    DATASET_ID_KEY,
+    MAX_FAILURES_KEY,
+    MAX_FAILURES_PER_CHECK_KEY,
+    METADATA_URL_KEY,
+    S3_ROLE_ARN_KEY,
+    VERSION_ID_KEY,
+)
 from ..types import JsonObject
+from ..validation_policy import (
+    FAILURE_LIMIT_SCHEMA,
+    get_validation_policy,
+    is_version_failure_limit_reached,
+)
+from ..validation_results_model import validation_results_model_with_meta
+from .checksum_shards import plan_checksum_shards, save_checksum_shards
 
 MAX_ITERATION_SIZE = 10_000
 
-ASSETS_TABLE_NAME_KEY = "assets_table_name"
-CONTENT_KEY = "content"
-FIRST_ITEM_KEY = "first_item"
-ITERATION_SIZE_KEY = "iteration_size"
-NEXT_ITEM_KEY = "next_item"
-RESULTS_TABLE_NAME_KEY = "results_table_name"
+# Batch jobs without checksum shards each checksum a contiguous range of this many assets
+CHECKSUM_ASSETS_PER_JOB = 10
+
+LAMBDA_CHECKSUM_MAX_ASSET_COUNT = 100
+LAMBDA_CHECKSUM_MAX_TOTAL_SIZE = 256 * 1024 * 1024
 
 EVENT_SCHEMA = {
     "type": "object",
@@ -32,11 +72,22 @@ EVENT_SCHEMA = {
                     "minimum": MAX_ITERATION_SIZE,
                     "multipleOf": MAX_ITERATION_SIZE,
                 },
+                MAX_FAILURES_KEY: {"type": "string", "pattern": r"^\d+$"},
+                MAX_FAILURES_PER_CHECK_KEY: {"type": "string", "pattern": r"^\d+$"},
+                ARRAY_SIZE_KEY: {"type": "integer", "minimum": 0},
+                ASSETS_PER_JOB_KEY: {"type": "string", "pattern": r"^\d+$"},
+                SHARD_COUNT_KEY: {"type": "string", "pattern": r"^\d+$"},
+                CHECKSUM_TIER_KEY: {"enum": [CHECKSUM_TIER_BATCH, CHECKSUM_TIER_LAMBDA]},
+                ASSETS_TABLE_NAME_KEY: {"type": "string"},
+                RESULTS_TABLE_NAME_KEY: {"type": "string"},
+                CHECKSUM_CACHE_TABLE_NAME_KEY: {"type": "string"},
             },
             "required": [FIRST_ITEM_KEY, ITERATION_SIZE_KEY, NEXT_ITEM_KEY],
             "additionalProperties": False,
         },
         DATASET_ID_KEY: {"type": "string"},
+        MAX_FAILURES_KEY: FAILURE_LIMIT_SCHEMA,
+        MAX_FAILURES_PER_CHECK_KEY: FAILURE_LIMIT_SCHEMA,
         METADATA_URL_KEY: {"type": "string"},
         VERSION_ID_KEY: {"type": "string"},
     },
@@ -56,17 +107,22 @@ def lambda_handler(event: JsonObject, _context: bytes) -> JsonObject:
 
     dataset_id = event[DATASET_ID_KEY]
     version_id = event[VERSION_ID_KEY]
+    hash_key = f"{DATASET_ID_PREFIX}{dataset_id}{DB_KEY_SEPARATOR}{VERSION_ID_PREFIX}{version_id}"
 
     processing_assets_model = processing_assets_model_with_meta()
 
-    asset_count = processing_assets_model.count(
-        hash_key=(
-            f"{DATASET_ID_PREFIX}{dataset_id}{DB_KEY_SEPARATOR}{VERSION_ID_PREFIX}{version_id}"
-        ),
-        range_key_condition=processing_assets_model.sk.startswith(
-            f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}"
-        ),
-    )
+    summary = get_processing_assets_summary(processing_assets_model, hash_key)
+    asset_count = get_asset_count(processing_assets_model, hash_key, summary)
+
+    validation_policy = get_validation_policy(event)
+    if validation_policy.max_failures is not None and is_version_failure_limit_reached(
+        validation_results_model_with_meta(), hash_key, validation_policy
+    ):
+        # An empty page for the Lambda function ends the iteration without checking anything more
+        return {
+            **get_iteration(first_item_index, 0, -1, validation_policy.as_parameters()),
+            CHECKSUM_TIER_KEY: CHECKSUM_TIER_LAMBDA,
+        }
 
     remaining_assets = asset_count - first_item_index
     if remaining_assets > MAX_ITERATION_SIZE:
@@ -76,10 +132,143 @@ def lambda_handler(event: JsonObject, _context: bytes) -> JsonObject:
         next_item_index = -1
         iteration_size = remaining_assets
 
+    checksum_tier = get_checksum_tier(
+        processing_assets_model,
+        hash_key,
+        first_item_index,
+        iteration_size,
+        event.get(S3_ROLE_ARN_KEY),
+        summary,
+    )
+    return {
+        **get_iteration(
+            first_item_index, iteration_size, next_item_index, validation_policy.as_parameters()
+        ),
+        CHECKSUM_TIER_KEY: checksum_tier,
+        **get_checksum_shard_parameters(
+            processing_assets_model,
+            hash_key,
+            first_item_index,
+            iteration_size,
+            checksum_tier == CHECKSUM_TIER_BATCH and summary is not None and summary.is_sized,
+        ),
+    }
+
+
+def get_asset_count(
+    processing_assets_model: Type[ProcessingAssetsModelBase],
+    hash_key: str,
+    summary: Optional[ProcessingAssetsSummary],
+) -> int:
+    """
+    Read the asset count from the summary of the processing assets, rather than counting the
+    assets on every iteration. Without a summary the assets are counted, as before.
+    """
+    if summary is not None:
+        return summary.asset_count
+
+    return processing_assets_model.count(
+        hash_key=hash_key,
+        range_key_condition=processing_assets_model.sk.startswith(
+            f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}"
+        ),
+    )
+
+
+def get_iteration(
+    first_item_index: int,
+    iteration_size: int,
+    next_item_index: int,
+    validation_policy_parameters: Dict[str, str],
+) -> JsonObject:
     return {
         FIRST_ITEM_KEY: str(first_item_index),
         ITERATION_SIZE_KEY: iteration_size,
         NEXT_ITEM_KEY: next_item_index,
+        ARRAY_SIZE_KEY: ceil(iteration_size / CHECKSUM_ASSETS_PER_JOB),
+        ASSETS_PER_JOB_KEY: str(CHECKSUM_ASSETS_PER_JOB),
+        SHARD_COUNT_KEY: NO_CHECKSUM_SHARDS,
         ASSETS_TABLE_NAME_KEY: get_param(ParameterName.PROCESSING_ASSETS_TABLE_NAME),
         RESULTS_TABLE_NAME_KEY: get_param(ParameterName.STORAGE_VALIDATION_RESULTS_TABLE_NAME),
+        CHECKSUM_CACHE_TABLE_NAME_KEY: get_param(
+            ParameterName.PROCESSING_CHECKSUM_CACHE_TABLE_NAME
+        ),
+        **validation_policy_parameters,
     }
+
+
+def get_checksum_shard_parameters(
+    processing_assets_model: Type[ProcessingAssetsModelBase],
+    hash_key: str,
+    first_item_index: int,
+    iteration_size: int,
+    is_sized: bool,
+) -> JsonObject:
+    """
+    Pages for Batch jobs whose asset sizes are all recorded are split into shards of about the same
+    size, with one job per shard, overriding the contiguous ranges of `get_iteration`.
+    """
+    if not is_sized:
+        return {}
+
+    shards = plan_checksum_shards(
+        processing_assets_model, hash_key, first_item_index, iteration_size
+    )
+    if shards is None:
+        return {}
+
+    save_checksum_shards(checksum_shard_model_with_meta(), hash_key, first_item_index, shards)
+    return {ARRAY_SIZE_KEY: len(shards), SHARD_COUNT_KEY: str(len(shards))}
+
+
+def get_checksum_tier(  # pylint:disable=too-many-arguments
+    processing_assets_model: Type[ProcessingAssetsModelBase],
+    hash_key: str,
+    first_item_index: int,
+    iteration_size: int,
+    s3_role_arn: Optional[str],
+    summary: Optional[ProcessingAssetsSummary],
+) -> str:
+    """
+    Pages with only a few small assets are checksummed by a Lambda function, avoiding the
+    scheduling latency of a Batch job. Only the recorded asset sizes are used, so pages with
+    assets of unknown size, or anything unexpected like a missing asset, are left to Batch jobs.
+    """
+    if iteration_size > LAMBDA_CHECKSUM_MAX_ASSET_COUNT or s3_role_arn is None:
+        return CHECKSUM_TIER_BATCH
+
+    # Every page of a small enough version is small enough
+    if (
+        summary is not None
+        and summary.total_size is not None
+        and summary.total_size <= LAMBDA_CHECKSUM_MAX_TOTAL_SIZE
+    ):
+        return CHECKSUM_TIER_LAMBDA
+
+    page_size = get_recorded_page_size(
+        processing_assets_model, hash_key, first_item_index, iteration_size
+    )
+    if page_size is None or page_size > LAMBDA_CHECKSUM_MAX_TOTAL_SIZE:
+        return CHECKSUM_TIER_BATCH
+    return CHECKSUM_TIER_LAMBDA
+
+
+def get_recorded_page_size(
+    processing_assets_model: Type[ProcessingAssetsModelBase],
+    hash_key: str,
+    first_item_index: int,
+    iteration_size: int,
+) -> Optional[int]:
+    """Return `None` unless all the assets of the page exist and have recorded sizes."""
+    range_keys = [
+        f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}"
+        for index in range(first_item_index, first_item_index + iteration_size)
+    ]
+    sizes = [
+        asset.size
+        for asset in get_processing_assets(processing_assets_model, hash_key, range_keys)
+        if asset.size is not None
+    ]
+    if len(sizes) != len(range_keys):
+        return None
+    return sum(sizes)
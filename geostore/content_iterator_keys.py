@@ -0,0 +1,19 @@
+from typing import Final
+
+ARRAY_SIZE_KEY = "array_size"
+ASSETS_PER_JOB_KEY = "assets_per_job"
+ASSETS_TABLE_NAME_KEY = "assets_table_name"
+CHECKSUM_CACHE_TABLE_NAME_KEY = "checksum_cache_table_name"
+CHECKSUM_TIER_KEY = "checksum_tier"
+CONTENT_KEY = "content"
+FIRST_ITEM_KEY = "first_item"
+ITERATION_SIZE_KEY = "iteration_size"
+NEXT_ITEM_KEY = "next_item"
+RESULTS_TABLE_NAME_KEY = "results_table_name"
+SHARD_COUNT_KEY = "shard_count"
+
+CHECKSUM_TIER_BATCH: Final = "batch"
+CHECKSUM_TIER_LAMBDA: Final = "lambda"
+
+# Batch job parameters have to be strings; without shards each job checksums a range of assets
+NO_CHECKSUM_SHARDS: Final = "0"
@@ -26,12 +26,15 @@ from ..step_function_keys import (
     DATASET_ID_SHORT_KEY,
     DATASET_PREFIX_KEY,
     EXECUTION_ARN_KEY,
+    MAX_FAILURES_KEY,
+    MAX_FAILURES_PER_CHECK_KEY,
     METADATA_URL_KEY,
     NOW_KEY,
     S3_ROLE_ARN_KEY,
     VERSION_ID_KEY,
 )
 from ..types import JsonObject
+from ..validation_policy import FAILURE_LIMIT_SCHEMA
 
 if TYPE_CHECKING:
     # When type checking we want to use the third party package's stub
@@ -52,6 +55,8 @@ def create_dataset_version(body: JsonObject) -> JsonObject:
         "type": "object",
         "properties": {
             DATASET_ID_SHORT_KEY: {"type": "string"},
+            MAX_FAILURES_KEY: FAILURE_LIMIT_SCHEMA,
+            MAX_FAILURES_PER_CHECK_KEY: FAILURE_LIMIT_SCHEMA,
             METADATA_URL_KEY: {"type": "string"},
             NOW_KEY: {"type": "string", "format": "date-time"},
             S3_ROLE_ARN_KEY: {"type": "string"},
@@ -89,6 +94,9 @@ def create_dataset_version(body: JsonObject) -> JsonObject:
         VERSION_ID_KEY: dataset_version_id,
         METADATA_URL_KEY: body[METADATA_URL_KEY],
         S3_ROLE_ARN_KEY: body[S3_ROLE_ARN_KEY],
+        # Always present, as the state machine passes them on to its tasks
+        MAX_FAILURES_KEY: body.get(MAX_FAILURES_KEY),
+        MAX_FAILURES_PER_CHECK_KEY: body.get(MAX_FAILURES_PER_CHECK_KEY),
     }
     state_machine_arn = get_param(
         ParameterName.PROCESSING_DATASET_VERSION_CREATION_STEP_FUNCTION_ARN
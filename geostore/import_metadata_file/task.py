@@ -1,16 +1,21 @@
-from json import dumps, load
+from json import dumps
 from os.path import basename
-from typing import TYPE_CHECKING, Dict, Iterable
+from tempfile import SpooledTemporaryFile
+from typing import IO, TYPE_CHECKING, Any, Dict
 
 import boto3
 
 from ..boto3_config import CONFIG
 from ..import_dataset_file import get_import_result
+from ..json_streaming import JSONStreamReader
 from ..stac_format import STAC_ASSETS_KEY, STAC_HREF_KEY, STAC_LINKS_KEY
 from ..types import JsonObject
 
 S3_BODY_KEY = "Body"
 
+# Larger metadata files are written to disk while they are rewritten
+SPOOLED_METADATA_MAX_SIZE = 16 * 1024 * 1024
+
 if TYPE_CHECKING:
     from mypy_boto3_s3 import S3Client
     from mypy_boto3_s3.type_defs import PutObjectOutputTypeDef
@@ -35,21 +40,59 @@ def importer(
     get_object_response = source_s3_client.get_object(Bucket=source_bucket_name, Key=original_key)
     assert S3_BODY_KEY in get_object_response, get_object_response
 
-    metadata = load(get_object_response["Body"])
+    with SpooledTemporaryFile(max_size=SPOOLED_METADATA_MAX_SIZE) as metadata_file:
+        write_metadata_with_basename_hrefs(
+            JSONStreamReader(get_object_response["Body"]), metadata_file
+        )
+        metadata_file.seek(0)
+
+        return TARGET_S3_CLIENT.put_object(
+            Bucket=target_bucket_name, Key=new_key, Body=metadata_file
+        )
+
+
+def write_metadata_with_basename_hrefs(reader: JSONStreamReader, metadata_file: IO[bytes]) -> None:
+    """
+    Stream the metadata with the asset and link hrefs replaced by their basenames, formatted the
+    same way as `json.dumps`. Only one asset or link is in memory at a time.
+    """
+    separator = ""
+    metadata_file.write(b"{")
+    for key in reader.read_object_members():
+        metadata_file.write(f"{separator}{dumps(key)}: ".encode())
+        separator = ", "
+
+        if key == STAC_ASSETS_KEY and reader.peek() == "{":
+            write_assets_with_basename_hrefs(reader, metadata_file)
+        elif key == STAC_LINKS_KEY and reader.peek() == "[":
+            write_links_with_basename_hrefs(reader, metadata_file)
+        else:
+            metadata_file.write(dumps(reader.read_value()).encode())
+    metadata_file.write(b"}")
+    reader.read_end()
+
 
-    assets = metadata.get(STAC_ASSETS_KEY, {}).values()
-    change_href_to_basename(assets)
+def write_assets_with_basename_hrefs(reader: JSONStreamReader, metadata_file: IO[bytes]) -> None:
+    separator = ""
+    metadata_file.write(b"{")
+    for name in reader.read_object_members():
+        asset = reader.read_value()
+        change_href_to_basename(asset)
+        metadata_file.write(f"{separator}{dumps(name)}: {dumps(asset)}".encode())
+        separator = ", "
+    metadata_file.write(b"}")
 
-    links = metadata.get(STAC_LINKS_KEY, [])
-    change_href_to_basename(links)
 
-    return TARGET_S3_CLIENT.put_object(
-        Bucket=target_bucket_name,
-        Key=new_key,
-        Body=dumps(metadata).encode(),
-    )
+def write_links_with_basename_hrefs(reader: JSONStreamReader, metadata_file: IO[bytes]) -> None:
+    separator = ""
+    metadata_file.write(b"[")
+    for _ in reader.read_array_elements():
+        link = reader.read_value()
+        change_href_to_basename(link)
+        metadata_file.write(f"{separator}{dumps(link)}".encode())
+        separator = ", "
+    metadata_file.write(b"]")
 
 
-def change_href_to_basename(items: Iterable[Dict[str, str]]) -> None:
-    for item in items:
-        item[STAC_HREF_KEY] = basename(item[STAC_HREF_KEY])
+def change_href_to_basename(item: Dict[str, Any]) -> None:
+    item[STAC_HREF_KEY] = basename(item[STAC_HREF_KEY])
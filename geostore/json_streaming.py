@@ -0,0 +1,207 @@
+"""
+Incremental reading of large JSON documents. Object members and array elements are read one at a
+time, so only the value being read has to fit in memory. Values are decoded by the standard
+library decoder; this module only scans the structure around them.
+"""
+from codecs import IncrementalDecoder, getincrementaldecoder
+from json import JSONDecodeError, JSONDecoder, detect_encoding
+from re import compile as compile_pattern
+from typing import IO, Any, Callable, Iterator, List, Optional, Tuple, Union
+
+from botocore.response import StreamingBody
+
+CHUNK_SIZE = 64 * 1024
+# Enough to tell UTF-8, UTF-16 and UTF-32 apart, with or without a byte order mark
+ENCODING_DETECTION_SIZE = 4
+NUMBER_CHARACTERS = "0123456789+-.eE"
+WHITESPACE = " \t\n\r"
+WHITESPACE_PATTERN = compile_pattern(r"[ \t\n\r]*")
+# A delimiter and any whitespace around it
+DELIMITER_PATTERN = compile_pattern(r"[ \t\n\r]*([^ \t\n\r])[ \t\n\r]*")
+
+ObjectPairsHook = Callable[[List[Tuple[str, Any]]], Any]
+
+
+class JSONStreamReader:  # pylint:disable=too-many-instance-attributes
+    """
+    Reads a JSON document from a text or binary stream, detecting the encoding of a binary stream
+    from its first bytes like `json.loads`.
+
+    `read_object_members` and `read_array_elements` yield once per member or element, and the
+    caller has to read each member or element value, with `read_value` or by iterating over it,
+    before continuing the iteration.
+    """
+
+    def __init__(
+        self,
+        stream: Union[IO[Any], StreamingBody],
+        object_pairs_hook: Optional[ObjectPairsHook] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        self.stream = stream
+        self.decoder = JSONDecoder(object_pairs_hook=object_pairs_hook)
+        self.text_decoder: Optional[IncrementalDecoder] = None
+        self.encoding_detection_bytes = b""
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.is_exhausted = False
+        # Where the buffer starts in the document, to report errors relative to the document
+        self.buffer_offset = 0
+        self.buffer_line_offset = 0
+        self.buffer_column_offset = 0
+        self.delimiter_position = 0
+        # Bytes, or characters for a text stream, read from the stream so far
+        self.read_size = 0
+
+    def read_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except JSONDecodeError as error:
+                if self.is_exhausted:
+                    raise self.error(error.msg, error.pos) from error
+                # Double the buffer, so that retrying long values takes linear time overall
+                self.fill(max(self.chunk_size, len(self.buffer) - self.position))
+                continue
+
+            if self.may_continue(value, end) and not self.is_exhausted:
+                self.fill(self.chunk_size)
+                continue
+
+            self.position = end
+            return value
+
+    def may_continue(self, value: Any, end: int) -> bool:
+        """Whether the value may continue in the next chunk, like a number with more digits."""
+        if end == len(self.buffer):
+            return True
+        return (
+            isinstance(value, (int, float))
+            and not isinstance(value, bool)
+            and self.buffer[end] in NUMBER_CHARACTERS
+        )
+
+    def read_object_members(self) -> Iterator[str]:
+        self.consume("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+
+        while True:
+            if self.peek() != '"':
+                raise self.error("Expecting property name enclosed in double quotes")
+            key: str = self.read_value()
+            self.consume(":")
+            yield key
+
+            if (delimiter := self.read_delimiter()) == "}":
+                return
+            if delimiter != ",":
+                raise self.delimiter_error("Expecting ',' delimiter")
+
+    def read_array_elements(self) -> Iterator[int]:
+        self.consume("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+
+        index = 0
+        while True:
+            yield index
+            index += 1
+
+            if (delimiter := self.read_delimiter()) == "]":
+                return
+            if delimiter != ",":
+                raise self.delimiter_error("Expecting ',' delimiter")
+
+    def read_end(self) -> None:
+        if self.peek() != "":
+            raise self.error("Extra data")
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or an empty string at the end."""
+        if self.position < len(self.buffer) and self.buffer[self.position] not in WHITESPACE:
+            return self.buffer[self.position]
+
+        while True:
+            whitespace = WHITESPACE_PATTERN.match(self.buffer, self.position)
+            assert whitespace is not None  # The pattern matches the empty string
+            self.position = whitespace.end()
+            if self.position < len(self.buffer) or self.is_exhausted:
+                return self.buffer[self.position : self.position + 1]
+            self.fill(self.chunk_size)
+
+    def read_delimiter(self) -> str:
+        """
+        Read the next character and skip the whitespace around it, keeping its position in the
+        buffer for `delimiter_error`.
+        """
+        match = DELIMITER_PATTERN.match(self.buffer, self.position)
+        if match is None:
+            delimiter = self.peek()
+            self.delimiter_position = self.position
+            self.position += len(delimiter)
+            return delimiter
+
+        self.delimiter_position = match.start(1)
+        self.position = match.end()
+        return match.group(1)
+
+    def consume(self, character: str) -> None:
+        if self.read_delimiter() != character:
+            raise self.delimiter_error(f"Expecting '{character}' delimiter")
+
+    def fill(self, minimum_size: int) -> None:
+        """Drop the characters read so far and read at least `minimum_size` more, if available."""
+        self.drop_read_characters()
+        chunks = [self.buffer]
+        read_size = 0
+        while read_size < minimum_size and not self.is_exhausted:
+            chunk = self.stream.read(max(self.chunk_size, minimum_size - read_size))
+            self.read_size += len(chunk)
+            text = self.decode(chunk) if isinstance(chunk, bytes) else chunk
+            self.is_exhausted = not chunk
+            chunks.append(text)
+            read_size += len(text)
+
+        self.buffer = "".join(chunks)
+
+    def decode(self, chunk: bytes) -> str:
+        is_final = not chunk
+        if self.text_decoder is None:
+            self.encoding_detection_bytes += chunk
+            if len(self.encoding_detection_bytes) < ENCODING_DETECTION_SIZE and not is_final:
+                return ""
+            encoding = detect_encoding(self.encoding_detection_bytes)
+            self.text_decoder = getincrementaldecoder(encoding)()
+            chunk = self.encoding_detection_bytes
+        return self.text_decoder.decode(chunk, final=is_final)
+
+    def drop_read_characters(self) -> None:
+        read_characters = self.buffer[: self.position]
+        if (last_newline := read_characters.rfind("\n")) == -1:
+            self.buffer_column_offset += len(read_characters)
+        else:
+            self.buffer_line_offset += read_characters.count("\n")
+            self.buffer_column_offset = len(read_characters) - last_newline - 1
+        self.buffer_offset += len(read_characters)
+        self.buffer = self.buffer[self.position :]
+        self.position = 0
+
+    def delimiter_error(self, message: str) -> JSONDecodeError:
+        return self.error(message, self.delimiter_position)
+
+    def error(self, message: str, position: Optional[int] = None) -> JSONDecodeError:
+        """An error at the position in the buffer, defaulting to the current one."""
+        if position is None:
+            position = self.position
+        error = JSONDecodeError(message, self.buffer, position)
+        if "\n" not in self.buffer[:position]:
+            error.colno += self.buffer_column_offset
+        error.lineno += self.buffer_line_offset
+        error.pos += self.buffer_offset
+        error.args = (f"{message}: line {error.lineno} column {error.colno} (char {error.pos})",)
+        return error
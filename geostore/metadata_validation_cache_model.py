@@ -0,0 +1,58 @@
+"""Validated metadata cache DynamoDB model."""
+from os import environ
+from typing import Optional, Type
+
+from pynamodb.attributes import ListAttribute, UTCDateTimeAttribute, UnicodeAttribute
+from pynamodb.models import Model
+
+from .aws_keys import AWS_DEFAULT_REGION_KEY
+from .clock import now
+from .models import DB_KEY_SEPARATOR
+from .parameter_store import ParameterName, get_param
+
+ETAG_ID_PREFIX = f"ETAG{DB_KEY_SEPARATOR}"
+SCHEMAS_ID_PREFIX = f"SCHEMAS{DB_KEY_SEPARATOR}"
+VERSION_ID_PREFIX = f"VERSION{DB_KEY_SEPARATOR}"
+
+
+class MetadataValidationCacheModelBase(Model):
+    """
+    A metadata file which passed validation, with the absolute URLs of the files it links to and
+    the assets it declares, in document order.
+    """
+
+    pk = UnicodeAttribute(hash_key=True)
+    sk = UnicodeAttribute(range_key=True)
+    links: ListAttribute[str] = ListAttribute()
+    asset_urls: ListAttribute[str] = ListAttribute()
+    asset_multihashes: ListAttribute[str] = ListAttribute()
+    validated_at = UTCDateTimeAttribute(default_for_new=now)
+
+
+def metadata_validation_cache_model_with_meta(
+    metadata_validation_cache_table_name: Optional[str] = None,
+) -> Type[MetadataValidationCacheModelBase]:
+    if metadata_validation_cache_table_name is None:
+        metadata_validation_cache_table_name = get_param(
+            ParameterName.PROCESSING_METADATA_VALIDATION_CACHE_TABLE_NAME
+        )
+
+    class MetadataValidationCacheModel(MetadataValidationCacheModelBase):
+        class Meta:  # pylint:disable=too-few-public-methods
+            table_name = metadata_validation_cache_table_name
+            region = environ[AWS_DEFAULT_REGION_KEY]
+
+    return MetadataValidationCacheModel
+
+
+def get_metadata_validation_cache_range_key(
+    etag: str, version_id: Optional[str], schema_set_version: str
+) -> str:
+    """
+    Identifies a single immutable metadata object and the schemas and rules it was validated with.
+    Version IDs are only unique within a versioned bucket, so the ETag is always part of the key.
+    """
+    return (
+        f"{ETAG_ID_PREFIX}{etag}{DB_KEY_SEPARATOR}{VERSION_ID_PREFIX}{version_id or ''}"
+        f"{DB_KEY_SEPARATOR}{SCHEMAS_ID_PREFIX}{schema_set_version}"
+    )
@@ -30,10 +30,12 @@ class ParameterName(Enum):
         return f"/{environment_name()}/{name.lower()}"
 
     PROCESSING_ASSETS_TABLE_NAME = auto()
+    PROCESSING_CHECKSUM_CACHE_TABLE_NAME = auto()
     PROCESSING_DATASET_VERSION_CREATION_STEP_FUNCTION_ARN = auto()
     PROCESSING_IMPORT_ASSET_FILE_FUNCTION_TASK_ARN = auto()
     PROCESSING_IMPORT_DATASET_ROLE_ARN = auto()
     PROCESSING_IMPORT_METADATA_FILE_FUNCTION_TASK_ARN = auto()
+    PROCESSING_METADATA_VALIDATION_CACHE_TABLE_NAME = auto()
     UPDATE_CATALOG_MESSAGE_QUEUE_NAME = auto()
     STATUS_SNS_TOPIC_ARN = auto()
     STORAGE_DATASETS_TABLE_NAME = auto()
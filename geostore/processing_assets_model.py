@@ -1,12 +1,14 @@
 """Dataset object DynamoDB model."""
 from enum import Enum
 from os import environ
-from typing import Optional, Type
+from typing import Iterable, Iterator, NamedTuple, Optional, Type
 
-from pynamodb.attributes import UnicodeAttribute
+from pynamodb.attributes import ListAttribute, NumberAttribute, UnicodeAttribute
+from pynamodb.exceptions import DoesNotExist
 from pynamodb.models import Model
 
 from .aws_keys import AWS_DEFAULT_REGION_KEY
+from .models import DB_KEY_SEPARATOR
 from .parameter_store import ParameterName, get_param
 
 
@@ -15,11 +17,20 @@ class ProcessingAssetType(Enum):
     METADATA = "METADATA_ITEM_INDEX"
 
 
+# Doesn't start with the range key prefix of any other item, so queries by prefix never include it
+PROCESSING_ASSETS_SUMMARY_RANGE_KEY = "SUMMARY"
+CHECKSUM_SHARD_RANGE_KEY_PREFIX = f"CHECKSUM_SHARD{DB_KEY_SEPARATOR}"
+
+
 class ProcessingAssetsModelBase(Model):
     pk = UnicodeAttribute(hash_key=True)
     sk = UnicodeAttribute(range_key=True)
     url = UnicodeAttribute()
     multihash = UnicodeAttribute(null=True)
+    size = NumberAttribute(null=True)
+    # Only set on the summary item, whose `size` is the total size of the assets
+    asset_count = NumberAttribute(null=True)
+    metadata_count = NumberAttribute(null=True)
 
 
 def processing_assets_model_with_meta(
@@ -34,3 +45,89 @@ def processing_assets_model_with_meta(
             region = environ[AWS_DEFAULT_REGION_KEY]
 
     return ProcessingAssetsModel
+
+
+class ProcessingAsset(NamedTuple):
+    range_key: str
+    url: str
+    multihash: str
+    size: Optional[int]
+
+
+def get_processing_assets(
+    processing_assets_model: Type[ProcessingAssetsModelBase],
+    hash_key: str,
+    range_keys: Iterable[str],
+) -> Iterator[ProcessingAsset]:
+    """
+    Fetch processing assets using BatchGetItem, 100 keys per request, yielding each page as soon as
+    it arrives. Unprocessed keys are requested again until every page is complete, and throttled
+    requests are retried with backoff by the connection. Items are yielded in no particular order,
+    and keys which don't exist are skipped.
+    """
+    for item in processing_assets_model.batch_get(
+        [(hash_key, range_key) for range_key in range_keys],
+        attributes_to_get=["sk", "url", "multihash", "size"],
+    ):
+        yield ProcessingAsset(
+            item.sk, item.url, item.multihash, None if item.size is None else int(item.size)
+        )
+
+
+class ProcessingAssetsSummary(NamedTuple):
+    asset_count: int
+    metadata_count: int
+    total_size: Optional[int]
+
+    @property
+    def is_sized(self) -> bool:
+        """Whether the sizes of all the assets are recorded."""
+        return self.total_size is not None
+
+
+def get_processing_assets_summary(
+    processing_assets_model: Type[ProcessingAssetsModelBase], hash_key: str
+) -> Optional[ProcessingAssetsSummary]:
+    """
+    The summary is saved with the processing assets once the metadata is validated. It's missing
+    for versions whose validation failed, and for versions validated before summaries were saved.
+    """
+    try:
+        item = processing_assets_model.get(
+            hash_key, PROCESSING_ASSETS_SUMMARY_RANGE_KEY, consistent_read=True
+        )
+    except DoesNotExist:
+        return None
+    return ProcessingAssetsSummary(
+        int(item.asset_count),
+        int(item.metadata_count),
+        None if item.size is None else int(item.size),
+    )
+
+
+class ChecksumShardModelBase(Model):
+    """The indexes of the assets checksummed by one job of a page, and their total size."""
+
+    pk = UnicodeAttribute(hash_key=True)
+    sk = UnicodeAttribute(range_key=True)
+    indexes: ListAttribute[int] = ListAttribute()
+    size = NumberAttribute()
+
+
+def checksum_shard_model_with_meta(
+    assets_table_name: Optional[str] = None,
+) -> Type[ChecksumShardModelBase]:
+    if assets_table_name is None:
+        assets_table_name = get_param(ParameterName.PROCESSING_ASSETS_TABLE_NAME)
+
+    class ChecksumShardModel(ChecksumShardModelBase):
+        class Meta:  # pylint:disable=too-few-public-methods
+            table_name = assets_table_name
+            region = environ[AWS_DEFAULT_REGION_KEY]
+
+    return ChecksumShardModel
+
+
+def get_checksum_shard_range_key(first_item_index: int, shard: int) -> str:
+    """Shards are numbered from zero within the page starting at `first_item_index`."""
+    return f"{CHECKSUM_SHARD_RANGE_KEY_PREFIX}{first_item_index}{DB_KEY_SEPARATOR}{shard}"
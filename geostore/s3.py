@@ -1,7 +1,10 @@
-from typing import TYPE_CHECKING
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict
 from uuid import uuid4
 
 import boto3
+from botocore.credentials import CredentialProvider, CredentialResolver, RefreshableCredentials
+from botocore.session import get_session
 
 from .boto3_config import CONFIG
 from .environment import environment_name
@@ -18,19 +21,50 @@ S3_URL_PREFIX = f"{S3_SCHEMA}://"
 
 CHUNK_SIZE = 1024
 
+ASSUME_ROLE_CREDENTIALS_METHOD = "sts-assume-role"
+
 STS_CLIENT: STSClient = boto3.client("sts", config=CONFIG)
 
 
+@lru_cache
 def get_s3_client_for_role(role_arn: str) -> S3Client:
+    """
+    Clients are shared per role for the lifetime of the process, so warm Lambda containers and
+    multi-asset workers reuse both the assumed role and the client's connection pool. The role is
+    assumed again shortly before its credentials expire.
+    """
+    botocore_session = get_session()
+    botocore_session.register_component(
+        "credential_provider", CredentialResolver([AssumeRoleCredentialProvider(role_arn)])
+    )
+    client: S3Client = boto3.Session(botocore_session=botocore_session).client("s3", config=CONFIG)
+    return client
+
+
+class AssumeRoleCredentialProvider(CredentialProvider):  # pylint:disable=too-few-public-methods
+    METHOD = ASSUME_ROLE_CREDENTIALS_METHOD
+
+    def __init__(self, role_arn: str):
+        super().__init__()
+
+        self.role_arn = role_arn
+
+    def load(self) -> RefreshableCredentials:
+        return RefreshableCredentials.create_from_metadata(
+            metadata=assume_role(self.role_arn),
+            refresh_using=lambda: assume_role(self.role_arn),
+            method=self.METHOD,
+        )
+
+
+def assume_role(role_arn: str) -> Dict[str, str]:
     assume_role_response = STS_CLIENT.assume_role(
         RoleArn=role_arn, RoleSessionName=f"{environment_name()}_Geostore_{uuid4()}"
     )
     credentials = assume_role_response["Credentials"]
-    client: S3Client = boto3.client(
-        "s3",
-        config=CONFIG,
-        aws_access_key_id=credentials["AccessKeyId"],
-        aws_secret_access_key=credentials["SecretAccessKey"],
-        aws_session_token=credentials["SessionToken"],
-    )
-    return client
+    return {
+        "access_key": credentials["AccessKeyId"],
+        "secret_key": credentials["SecretAccessKey"],
+        "token": credentials["SessionToken"],
+        "expiry_time": credentials["Expiration"].isoformat(),
+    }
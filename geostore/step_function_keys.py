@@ -23,8 +23,13 @@ FAILED_TASKS_KEY = "failed_tasks"
 FAILURE_REASONS_KEY = "failure_reasons"
 IMPORT_DATASET_KEY = "import_dataset"
 INPUT_KEY = "input"
+MAX_FAILURES_KEY = "max_failures"
+MAX_FAILURES_PER_CHECK_KEY = "max_failures_per_check"
+METADATA_SHARDS_KEY = "metadata_shards"
+METADATA_SHARD_KEY = "metadata_shard"
 METADATA_UPLOAD_KEY = "metadata_upload"
 METADATA_URL_KEY = "metadata_url"
+METADATA_VALIDATION_KEY = "metadata_validation"
 NEW_VERSION_S3_LOCATION = "new_version_s3_location"
 NOW_KEY = "now"
 OUTPUT_KEY = "output"
@@ -0,0 +1,206 @@
+"""
+Per dataset version limits on the failures recorded while validating, so that a broken dataset is
+rejected after a few failures rather than after validating all of it. Failures are counted with
+counters in the validation results table, so the limits are shared by all the jobs and shards
+validating a dataset version.
+"""
+from threading import Lock
+from typing import Dict, NamedTuple, Optional, Tuple, Type, Union
+
+from .check import Check
+from .models import DB_KEY_SEPARATOR
+from .step_function_keys import MAX_FAILURES_KEY, MAX_FAILURES_PER_CHECK_KEY
+from .types import JsonObject
+from .validation_results_model import (
+    ValidationResult,
+    ValidationResultFactory,
+    ValidationResultsModelBase,
+)
+
+SUPPRESSED_FAILURE_COUNT_KEY = "suppressed_failure_count"
+
+# Batch job parameters have to be strings, so limits are passed on as such, with zero for no limit
+NO_FAILURE_LIMIT = "0"
+
+FAILURE_LIMIT_SCHEMA = {"type": ["integer", "null"], "minimum": 1}
+
+FAILURE_COUNT_ID_PREFIX = f"FAILURE_COUNT{DB_KEY_SEPARATOR}"
+TOTAL_FAILURE_COUNTER = "total"
+
+
+class ValidationPolicy(NamedTuple):
+    """
+    Validation stops once `max_failures` failures have been recorded for the dataset version, and
+    only the first `max_failures_per_check` failures of each check are recorded in full. `None`
+    means no limit.
+    """
+
+    max_failures: Optional[int] = None
+    max_failures_per_check: Optional[int] = None
+
+    @property
+    def is_limited(self) -> bool:
+        return self.max_failures is not None or self.max_failures_per_check is not None
+
+    def as_parameters(self) -> Dict[str, str]:
+        return {
+            MAX_FAILURES_KEY: format_failure_limit(self.max_failures),
+            MAX_FAILURES_PER_CHECK_KEY: format_failure_limit(self.max_failures_per_check),
+        }
+
+
+def get_validation_policy(event: JsonObject) -> ValidationPolicy:
+    return ValidationPolicy(
+        parse_failure_limit(event.get(MAX_FAILURES_KEY)),
+        parse_failure_limit(event.get(MAX_FAILURES_PER_CHECK_KEY)),
+    )
+
+
+def parse_failure_limit(value: Union[None, int, str]) -> Optional[int]:
+    if value is None or int(value) == 0:
+        return None
+    return int(value)
+
+
+def format_failure_limit(limit: Optional[int]) -> str:
+    if limit is None:
+        return NO_FAILURE_LIMIT
+    return str(limit)
+
+
+class FailureLimitReachedError(Exception):
+    def __init__(self, max_failures: Optional[int]):
+        super().__init__(f"Stopped validating after {max_failures} failures")
+
+
+def increment_failure_count(
+    validation_result_factory: ValidationResultFactory, counter: str
+) -> int:
+    """Count a failure with a counter of the dataset version, returning the new count."""
+    validation_results_model = validation_result_factory.validation_results_model
+    failure_counter = validation_results_model(
+        pk=validation_result_factory.hash_key, sk=f"{FAILURE_COUNT_ID_PREFIX}{counter}"
+    )
+    failure_counter.update(actions=[validation_results_model.failure_count.add(1)])
+    return int(failure_counter.failure_count)
+
+
+class LimitedValidationResultFactory(ValidationResultFactory):
+    """
+    Applies a validation policy to the results saved with another factory. Failures past the limit
+    of their check, or saved after `max_failures` failures of the dataset version, are counted
+    rather than saved, until `save_suppressed_failures` saves one result per check for them. Safe
+    to use from any thread.
+    """
+
+    def __init__(  # pylint:disable=super-init-not-called
+        self, validation_result_factory: ValidationResultFactory, policy: ValidationPolicy
+    ):
+        self.validation_result_factory = validation_result_factory
+        self.policy = policy
+        self.failure_limit_reached = False
+        # The first suppressed failure of each check, and how many there are
+        self.suppressed_failures: Dict[Check, Tuple[str, Optional[JsonObject], int]] = {}
+        self.lock = Lock()
+
+    def save(
+        self, url: str, check: Check, result: ValidationResult, details: Optional[JsonObject] = None
+    ) -> None:
+        if result is ValidationResult.FAILED and not self.count_failure(url, check, details):
+            return
+        self.validation_result_factory.save(url, check, result, details=details)
+
+    def count_failure(self, url: str, check: Check, details: Optional[JsonObject]) -> bool:
+        """Return whether the failure should be saved."""
+        if not self.failure_limit_reached and self.is_within_failure_limits(check):
+            return True
+
+        with self.lock:
+            first_url, first_details, count = self.suppressed_failures.get(check, (url, details, 0))
+            self.suppressed_failures[check] = (first_url, first_details, count + 1)
+        return False
+
+    def is_within_failure_limits(self, check: Check) -> bool:
+        """
+        Count the failure with the counters of the dataset version, so that failures found by other
+        jobs count towards the limits too.
+        """
+        if self.policy.max_failures is not None:
+            failure_count = increment_failure_count(
+                self.validation_result_factory, TOTAL_FAILURE_COUNTER
+            )
+            if failure_count >= self.policy.max_failures:
+                self.failure_limit_reached = True
+            if failure_count > self.policy.max_failures:
+                return False
+
+        if self.policy.max_failures_per_check is not None:
+            check_failure_count = increment_failure_count(
+                self.validation_result_factory, check.value
+            )
+            return check_failure_count <= self.policy.max_failures_per_check
+
+        return True
+
+    def save_suppressed_failures(self) -> None:
+        """
+        The failures of each check which were not saved are summarised by saving the first of them
+        with their count, so that summaries from separate runs don't overwrite each other.
+        """
+        with self.lock:
+            suppressed_failures, self.suppressed_failures = self.suppressed_failures, {}
+
+        for check, (url, details, count) in suppressed_failures.items():
+            self.validation_result_factory.save(
+                url,
+                check,
+                ValidationResult.FAILED,
+                details={**(details or {}), SUPPRESSED_FAILURE_COUNT_KEY: count},
+            )
+
+
+def apply_validation_policy(
+    validation_result_factory: ValidationResultFactory, policy: ValidationPolicy
+) -> ValidationResultFactory:
+    if not policy.is_limited:
+        return validation_result_factory
+    return LimitedValidationResultFactory(validation_result_factory, policy)
+
+
+def is_failure_limit_reached(validation_result_factory: ValidationResultFactory) -> bool:
+    return (
+        isinstance(validation_result_factory, LimitedValidationResultFactory)
+        and validation_result_factory.failure_limit_reached
+    )
+
+
+def check_failure_limit(validation_result_factory: ValidationResultFactory) -> None:
+    if is_failure_limit_reached(validation_result_factory):
+        assert isinstance(validation_result_factory, LimitedValidationResultFactory)
+        raise FailureLimitReachedError(validation_result_factory.policy.max_failures)
+
+
+def save_suppressed_failures(validation_result_factory: ValidationResultFactory) -> None:
+    if isinstance(validation_result_factory, LimitedValidationResultFactory):
+        validation_result_factory.save_suppressed_failures()
+
+
+def is_version_failure_limit_reached(
+    validation_results_model: Type[ValidationResultsModelBase],
+    hash_key: str,
+    policy: ValidationPolicy,
+) -> bool:
+    """
+    Whether all the validation runs of a dataset version together reached `max_failures`, including
+    the failures which were only saved as part of a summary.
+    """
+    if policy.max_failures is None:
+        return False
+
+    try:
+        failure_counter = validation_results_model.get(
+            hash_key, f"{FAILURE_COUNT_ID_PREFIX}{TOTAL_FAILURE_COUNTER}", consistent_read=True
+        )
+    except validation_results_model.DoesNotExist:
+        return False
+    return int(failure_counter.failure_count) >= policy.max_failures
@@ -1,8 +1,11 @@
 from enum import Enum
 from os import environ
+from threading import Event, Lock, Thread
+from time import monotonic
+from types import TracebackType
 from typing import Any, Dict, Optional, Tuple, Type
 
-from pynamodb.attributes import MapAttribute, UnicodeAttribute
+from pynamodb.attributes import MapAttribute, NumberAttribute, UnicodeAttribute
 from pynamodb.indexes import AllProjection, GlobalSecondaryIndex
 from pynamodb.models import MetaModel, Model
 
@@ -12,8 +15,12 @@ from .models import CHECK_ID_PREFIX, DB_KEY_SEPARATOR, URL_ID_PREFIX
 from .parameter_store import ParameterName, get_param
 from .types import JsonObject
 
+VALIDATION_RESULTS_FLUSH_SIZE = 100
+VALIDATION_RESULTS_FLUSH_INTERVAL_SECONDS = 10.0
+
 
 class ValidationResult(Enum):
+    CACHED = "Cached"
     FAILED = "Failed"
     PASSED = "Passed"
 
@@ -39,6 +46,8 @@ class ValidationResultsModelBase(Model):
     result = UnicodeAttribute()
     # TODO: Remove type-arg when PynamoDB issue #920 is fixed pylint:disable=fixme
     details: MapAttribute[str, Any] = MapAttribute(null=True)  # type: ignore[no-untyped-call]
+    # Only set on the failure counters of a dataset version, which have no result
+    failure_count = NumberAttribute(null=True)
 
     validation_outcome_index: ValidationOutcomeIdx
 
@@ -90,9 +99,127 @@ class ValidationResultFactory:  # pylint:disable=too-few-public-methods
     def save(
         self, url: str, check: Check, result: ValidationResult, details: Optional[JsonObject] = None
     ) -> None:
-        self.validation_results_model(
+        self.get_item(url, check, result, details).save()
+
+    def get_item(
+        self, url: str, check: Check, result: ValidationResult, details: Optional[JsonObject]
+    ) -> ValidationResultsModelBase:
+        return self.validation_results_model(
             pk=self.hash_key,
             sk=f"{CHECK_ID_PREFIX}{check.value}{DB_KEY_SEPARATOR}{URL_ID_PREFIX}{url}",
             result=result.value,
             details=details,
-        ).save()
+        )
+
+
+class BufferedValidationResultFactory(  # pylint:disable=too-many-instance-attributes
+    ValidationResultFactory
+):
+    """
+    Buffers validation results in memory and writes them using BatchWriteItem, 25 items per request.
+    Unprocessed items are retried with backoff by pynamodb.
+
+    Nothing is written unless the factory is used as a context manager: entering the `with` block
+    starts a thread which writes the buffer every `flush_interval` seconds, so that a process which
+    is killed loses at most the results of the last interval, and leaving it writes the last
+    results. The buffer is also written once it holds `flush_size` results. Saving the same URL and
+    check again before the buffer is written replaces the earlier result, so the last result saved
+    wins as with `ValidationResultFactory`.
+
+    Batches are written without holding the buffer lock, so other threads keep saving results
+    meanwhile. Only one batch is written at a time, in the order they were taken from the buffer,
+    and a full buffer keeps filling up while another batch is being written.
+    """
+
+    def __init__(
+        self,
+        hash_key: str,
+        results_table_name: str,
+        flush_size: int = VALIDATION_RESULTS_FLUSH_SIZE,
+        flush_interval: float = VALIDATION_RESULTS_FLUSH_INTERVAL_SECONDS,
+    ):
+        super().__init__(hash_key, results_table_name)
+
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self.buffer: Dict[str, ValidationResultsModelBase] = {}
+        self.lock = Lock()
+        self.write_lock = Lock()
+        self.last_flush = monotonic()
+        self.stopped = Event()
+        self.writer = Thread(target=self.write_periodically, daemon=True)
+
+    def __enter__(self) -> "BufferedValidationResultFactory":
+        self.writer.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.stopped.set()
+        self.writer.join()
+        self.flush()
+
+    def save(
+        self, url: str, check: Check, result: ValidationResult, details: Optional[JsonObject] = None
+    ) -> None:
+        item = self.get_item(url, check, result, details)
+        with self.lock:
+            self.buffer[item.sk] = item
+        self.write_if_due()
+
+    def flush(self) -> None:
+        self.write_lock.acquire()  # pylint:disable=consider-using-with
+        with self.lock:
+            items = self.take_buffer()
+        self.write_items(items)
+
+    def write_periodically(self) -> None:
+        """Runs until the factory is stopped, waking up whenever the next interval is due."""
+        while not self.stopped.wait(self.get_time_until_write()):
+            self.write_if_due()
+
+    def get_time_until_write(self) -> float:
+        time_until_write = self.last_flush + self.flush_interval - monotonic()
+        if time_until_write <= 0:
+            # Another batch is still being written, which will restart the interval
+            return self.flush_interval
+        return time_until_write
+
+    def write_if_due(self) -> None:
+        with self.lock:
+            if not self.is_write_due():
+                return
+            # Leave the buffer to fill up if another batch is being written
+            if not self.write_lock.acquire(blocking=False):  # pylint:disable=consider-using-with
+                return
+            items = self.take_buffer()
+
+        self.write_items(items)
+
+    def is_write_due(self) -> bool:
+        return (
+            len(self.buffer) >= self.flush_size
+            or monotonic() - self.last_flush >= self.flush_interval
+        )
+
+    def take_buffer(self) -> Dict[str, ValidationResultsModelBase]:
+        """Must be called with both locks held, so that batches are written in the order taken."""
+        items, self.buffer = self.buffer, {}
+        self.last_flush = monotonic()
+        return items
+
+    def write_items(self, items: Dict[str, ValidationResultsModelBase]) -> None:
+        """Releases the write lock once the items are written."""
+        try:
+            if not items:
+                return
+            with self.validation_results_model.batch_write() as batch:
+                for item in items.values():
+                    batch.save(item)
+        finally:
+            self.write_lock.release()
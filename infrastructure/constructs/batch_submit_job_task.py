@@ -20,6 +20,7 @@ class BatchSubmitJobTask(Construct):
         payload_object: Mapping[str, str],
         container_overrides_command: List[str],
         array_size: Optional[int] = None,
+        vcpus: int = 1,
     ):
         super().__init__(scope, construct_id)
 
@@ -38,6 +39,7 @@ class BatchSubmitJobTask(Construct):
             env_name=env_name,
             directory=directory,
             job_role=self.job_role,
+            vcpus=vcpus,
         )
 
         container_overrides = aws_stepfunctions_tasks.BatchContainerOverrides(
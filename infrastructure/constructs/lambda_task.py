@@ -1,7 +1,7 @@
 from typing import Mapping, Optional
 
 from aws_cdk import aws_lambda_python, aws_stepfunctions_tasks
-from aws_cdk.aws_stepfunctions import JsonPath
+from aws_cdk.aws_stepfunctions import JsonPath, TaskInput
 from aws_cdk.core import Construct
 
 from .bundled_lambda_function import BundledLambdaFunction
@@ -17,6 +17,8 @@ class LambdaTask(aws_stepfunctions_tasks.LambdaInvoke):
         botocore_lambda_layer: aws_lambda_python.PythonLayerVersion,
         result_path: Optional[str] = JsonPath.DISCARD,
         extra_environment: Optional[Mapping[str, str]] = None,
+        payload: Optional[TaskInput] = None,
+        memory_size: Optional[int] = None,
     ):
         self.lambda_function = BundledLambdaFunction(
             scope,
@@ -24,6 +26,7 @@ class LambdaTask(aws_stepfunctions_tasks.LambdaInvoke):
             directory=directory,
             extra_environment=extra_environment,
             botocore_lambda_layer=botocore_lambda_layer,
+            memory_size=memory_size,
         )
 
         super().__init__(
@@ -31,5 +34,6 @@ class LambdaTask(aws_stepfunctions_tasks.LambdaInvoke):
             f"{construct_id}-lambda-invoke",
             lambda_function=self.lambda_function,
             result_path=result_path,
+            payload=payload,
             payload_response_only=True,
         )
@@ -6,19 +6,26 @@ from aws_cdk import (
     aws_sqs,
     aws_ssm,
     aws_stepfunctions,
+    aws_stepfunctions_tasks,
 )
 from aws_cdk.aws_lambda_event_sources import SqsEventSource
 from aws_cdk.aws_stepfunctions import Wait, WaitTime
 from aws_cdk.core import Construct, Duration, Tags
 
 from geostore.api_keys import SUCCESS_KEY
-from geostore.content_iterator.task import (
+from geostore.content_iterator_keys import (
+    ARRAY_SIZE_KEY,
+    ASSETS_PER_JOB_KEY,
     ASSETS_TABLE_NAME_KEY,
+    CHECKSUM_CACHE_TABLE_NAME_KEY,
+    CHECKSUM_TIER_KEY,
+    CHECKSUM_TIER_LAMBDA,
     CONTENT_KEY,
     FIRST_ITEM_KEY,
     ITERATION_SIZE_KEY,
     NEXT_ITEM_KEY,
     RESULTS_TABLE_NAME_KEY,
+    SHARD_COUNT_KEY,
 )
 from geostore.environment import ENV_NAME_VARIABLE_NAME
 from geostore.parameter_store import ParameterName
@@ -27,8 +34,13 @@ from geostore.step_function_keys import (
     ASSET_UPLOAD_KEY,
     DATASET_ID_KEY,
     IMPORT_DATASET_KEY,
+    MAX_FAILURES_KEY,
+    MAX_FAILURES_PER_CHECK_KEY,
+    METADATA_SHARDS_KEY,
+    METADATA_SHARD_KEY,
     METADATA_UPLOAD_KEY,
     METADATA_URL_KEY,
+    METADATA_VALIDATION_KEY,
     S3_BATCH_STATUS_CANCELLED,
     S3_BATCH_STATUS_COMPLETE,
     S3_BATCH_STATUS_FAILED,
@@ -51,6 +63,11 @@ from .s3_policy import ALLOW_DESCRIBE_ANY_S3_JOB
 from .sts_policy import ALLOW_ASSUME_ANY_ROLE
 from .table import Table
 
+# Each checksum job hashes on one process per vCPU, fed by enough threads to keep them busy while
+# downloading
+CHECK_FILES_CHECKSUMS_VCPUS = 2
+CHECK_FILES_CHECKSUMS_CONCURRENCY = 8
+
 
 class Processing(Construct):
     def __init__(
@@ -78,6 +95,26 @@ class Processing(Construct):
             sort_key=aws_dynamodb.Attribute(name="sk", type=aws_dynamodb.AttributeType.STRING),
         )
 
+        ############################################################################################
+        # CHECKSUM CACHE TABLE
+        checksum_cache_table = Table(
+            self,
+            f"{env_name}-checksum-cache",
+            env_name=env_name,
+            parameter_name=ParameterName.PROCESSING_CHECKSUM_CACHE_TABLE_NAME,
+            sort_key=aws_dynamodb.Attribute(name="sk", type=aws_dynamodb.AttributeType.STRING),
+        )
+
+        ############################################################################################
+        # METADATA VALIDATION CACHE TABLE
+        metadata_validation_cache_table = Table(
+            self,
+            f"{env_name}-metadata-validation-cache",
+            env_name=env_name,
+            parameter_name=ParameterName.PROCESSING_METADATA_VALIDATION_CACHE_TABLE_NAME,
+            sort_key=aws_dynamodb.Attribute(name="sk", type=aws_dynamodb.AttributeType.STRING),
+        )
+
         ############################################################################################
         # BATCH JOB DEPENDENCIES
         batch_job_queue = BatchJobQueue(
@@ -135,7 +172,10 @@ class Processing(Construct):
             "check-stac-metadata-task",
             directory="check_stac_metadata",
             botocore_lambda_layer=botocore_lambda_layer,
+            result_path=f"$.{METADATA_VALIDATION_KEY}",
             extra_environment={ENV_NAME_VARIABLE_NAME: env_name},
+            # Two vCPUs, so that schema validation runs in worker processes beside the traversal
+            memory_size=3584,
         )
         assert check_stac_metadata_task.lambda_function.role
         check_stac_metadata_task.lambda_function.role.add_managed_policy(
@@ -143,13 +183,60 @@ class Processing(Construct):
         )
         check_stac_metadata_task.lambda_function.add_to_role_policy(ALLOW_ASSUME_ANY_ROLE)
 
-        for table in [processing_assets_table, validation_results_table]:
+        for table in [
+            processing_assets_table,
+            validation_results_table,
+            metadata_validation_cache_table,
+        ]:
             table.grant_read_write_data(check_stac_metadata_task.lambda_function)
             table.grant(
                 check_stac_metadata_task.lambda_function,
                 "dynamodb:DescribeTable",
             )
 
+        # Large catalogs are validated in shards by the same function, and then merged
+        check_stac_metadata_payload_object = {
+            f"{DATASET_ID_KEY}.$": f"$.{DATASET_ID_KEY}",
+            f"{VERSION_ID_KEY}.$": f"$.{VERSION_ID_KEY}",
+            f"{METADATA_URL_KEY}.$": f"$.{METADATA_URL_KEY}",
+            f"{S3_ROLE_ARN_KEY}.$": f"$.{S3_ROLE_ARN_KEY}",
+            f"{MAX_FAILURES_KEY}.$": f"$.{MAX_FAILURES_KEY}",
+            f"{MAX_FAILURES_PER_CHECK_KEY}.$": f"$.{MAX_FAILURES_PER_CHECK_KEY}",
+        }
+        check_stac_metadata_shards_map = aws_stepfunctions.Map(
+            self,
+            "check-stac-metadata-shards",
+            items_path=f"$.{METADATA_VALIDATION_KEY}.{METADATA_SHARDS_KEY}",
+            parameters={
+                **check_stac_metadata_payload_object,
+                f"{METADATA_SHARD_KEY}.$": "$$.Map.Item.Value",
+            },
+            result_path=aws_stepfunctions.JsonPath.DISCARD,
+        ).iterator(
+            aws_stepfunctions_tasks.LambdaInvoke(
+                self,
+                "check-stac-metadata-shard-task",
+                lambda_function=check_stac_metadata_task.lambda_function,
+                payload_response_only=True,
+                result_path=aws_stepfunctions.JsonPath.DISCARD,
+            )
+        )
+        merge_stac_metadata_shards_task = aws_stepfunctions_tasks.LambdaInvoke(
+            self,
+            "merge-stac-metadata-shards-task",
+            lambda_function=check_stac_metadata_task.lambda_function,
+            payload=aws_stepfunctions.TaskInput.from_object(
+                {
+                    **check_stac_metadata_payload_object,
+                    f"{METADATA_SHARDS_KEY}.$": (
+                        f"$.{METADATA_VALIDATION_KEY}.{METADATA_SHARDS_KEY}"
+                    ),
+                }
+            ),
+            payload_response_only=True,
+            result_path=aws_stepfunctions.JsonPath.DISCARD,
+        )
+
         content_iterator_task = LambdaTask(
             self,
             "content-iterator-task",
@@ -168,6 +255,20 @@ class Processing(Construct):
             f"{FIRST_ITEM_KEY}.$": f"$.{CONTENT_KEY}.{FIRST_ITEM_KEY}",
             f"{ASSETS_TABLE_NAME_KEY}.$": f"$.{CONTENT_KEY}.{ASSETS_TABLE_NAME_KEY}",
             f"{RESULTS_TABLE_NAME_KEY}.$": f"$.{CONTENT_KEY}.{RESULTS_TABLE_NAME_KEY}",
+            f"{CHECKSUM_CACHE_TABLE_NAME_KEY}.$": (
+                f"$.{CONTENT_KEY}.{CHECKSUM_CACHE_TABLE_NAME_KEY}"
+            ),
+            f"{MAX_FAILURES_KEY}.$": f"$.{CONTENT_KEY}.{MAX_FAILURES_KEY}",
+            f"{MAX_FAILURES_PER_CHECK_KEY}.$": f"$.{CONTENT_KEY}.{MAX_FAILURES_PER_CHECK_KEY}",
+            f"{SHARD_COUNT_KEY}.$": f"$.{CONTENT_KEY}.{SHARD_COUNT_KEY}",
+        }
+        # Batch job parameters have to be strings, unlike the iteration size of the Lambda task
+        check_files_checksums_batch_payload_object = {
+            **check_files_checksums_default_payload_object,
+            f"{ASSETS_PER_JOB_KEY}.$": f"$.{CONTENT_KEY}.{ASSETS_PER_JOB_KEY}",
+            f"{ITERATION_SIZE_KEY}.$": (
+                f"States.Format('{{}}', $.{CONTENT_KEY}.{ITERATION_SIZE_KEY})"
+            ),
         }
         check_files_checksums_single_task = BatchSubmitJobTask(
             self,
@@ -176,7 +277,7 @@ class Processing(Construct):
             directory=check_files_checksums_directory,
             s3_policy=s3_read_only_access_policy,
             job_queue=batch_job_queue,
-            payload_object=check_files_checksums_default_payload_object,
+            payload_object=check_files_checksums_batch_payload_object,
             container_overrides_command=[
                 "--dataset-id",
                 f"Ref::{DATASET_ID_KEY}",
@@ -190,11 +291,26 @@ class Processing(Construct):
                 f"Ref::{RESULTS_TABLE_NAME_KEY}",
                 "--s3-role-arn",
                 f"Ref::{S3_ROLE_ARN_KEY}",
+                "--checksum-cache-table-name",
+                f"Ref::{CHECKSUM_CACHE_TABLE_NAME_KEY}",
+                "--max-failures",
+                f"Ref::{MAX_FAILURES_KEY}",
+                "--max-failures-per-check",
+                f"Ref::{MAX_FAILURES_PER_CHECK_KEY}",
+                "--shard-count",
+                f"Ref::{SHARD_COUNT_KEY}",
+                "--assets-per-job",
+                f"Ref::{ASSETS_PER_JOB_KEY}",
+                "--iteration-size",
+                f"Ref::{ITERATION_SIZE_KEY}",
+                "--concurrency",
+                str(CHECK_FILES_CHECKSUMS_CONCURRENCY),
+                "--processes",
+                str(CHECK_FILES_CHECKSUMS_VCPUS),
             ],
+            vcpus=CHECK_FILES_CHECKSUMS_VCPUS,
         )
-        array_size = int(
-            aws_stepfunctions.JsonPath.number_at(f"$.{CONTENT_KEY}.{ITERATION_SIZE_KEY}")
-        )
+        array_size = int(aws_stepfunctions.JsonPath.number_at(f"$.{CONTENT_KEY}.{ARRAY_SIZE_KEY}"))
         check_files_checksums_array_task = BatchSubmitJobTask(
             self,
             "check-files-checksums-array-task",
@@ -202,7 +318,7 @@ class Processing(Construct):
             directory=check_files_checksums_directory,
             s3_policy=s3_read_only_access_policy,
             job_queue=batch_job_queue,
-            payload_object=check_files_checksums_default_payload_object,
+            payload_object=check_files_checksums_batch_payload_object,
             container_overrides_command=[
                 "--dataset-id",
                 f"Ref::{DATASET_ID_KEY}",
@@ -216,14 +332,72 @@ class Processing(Construct):
                 f"Ref::{RESULTS_TABLE_NAME_KEY}",
                 "--s3-role-arn",
                 f"Ref::{S3_ROLE_ARN_KEY}",
+                "--checksum-cache-table-name",
+                f"Ref::{CHECKSUM_CACHE_TABLE_NAME_KEY}",
+                "--max-failures",
+                f"Ref::{MAX_FAILURES_KEY}",
+                "--max-failures-per-check",
+                f"Ref::{MAX_FAILURES_PER_CHECK_KEY}",
+                "--shard-count",
+                f"Ref::{SHARD_COUNT_KEY}",
+                "--assets-per-job",
+                f"Ref::{ASSETS_PER_JOB_KEY}",
+                "--iteration-size",
+                f"Ref::{ITERATION_SIZE_KEY}",
+                "--concurrency",
+                str(CHECK_FILES_CHECKSUMS_CONCURRENCY),
+                "--processes",
+                str(CHECK_FILES_CHECKSUMS_VCPUS),
             ],
+            vcpus=CHECK_FILES_CHECKSUMS_VCPUS,
             array_size=array_size,
         )
 
+        check_files_checksums_lambda_task = LambdaTask(
+            self,
+            "check-files-checksums-lambda-task",
+            directory=check_files_checksums_directory,
+            botocore_lambda_layer=botocore_lambda_layer,
+            extra_environment={ENV_NAME_VARIABLE_NAME: env_name},
+            payload=aws_stepfunctions.TaskInput.from_object(
+                {
+                    **check_files_checksums_default_payload_object,
+                    f"{ITERATION_SIZE_KEY}.$": f"$.{CONTENT_KEY}.{ITERATION_SIZE_KEY}",
+                }
+            ),
+            memory_size=1024,
+        )
+        assert check_files_checksums_lambda_task.lambda_function.role
+        check_files_checksums_lambda_task.lambda_function.role.add_managed_policy(
+            policy=s3_read_only_access_policy
+        )
+
+        check_files_checksums_lambda_task.lambda_function.add_to_role_policy(ALLOW_ASSUME_ANY_ROLE)
+        validation_results_table.grant_read_write_data(
+            check_files_checksums_lambda_task.lambda_function
+        )
+        validation_results_table.grant(
+            check_files_checksums_lambda_task.lambda_function, "dynamodb:DescribeTable"
+        )
+        checksum_cache_table.grant_read_write_data(
+            check_files_checksums_lambda_task.lambda_function
+        )
+        checksum_cache_table.grant(
+            check_files_checksums_lambda_task.lambda_function, "dynamodb:DescribeTable"
+        )
+
+        processing_assets_table.grant_write_data(content_iterator_task.lambda_function)
+        # To stop iterating once a dataset version has reached its failure limit
+        validation_results_table.grant_read_data(content_iterator_task.lambda_function)
+        validation_results_table.grant(
+            content_iterator_task.lambda_function, "dynamodb:DescribeTable"
+        )
+
         for processing_assets_reader in [
             content_iterator_task.lambda_function,
             check_files_checksums_single_task.job_role,
             check_files_checksums_array_task.job_role,
+            check_files_checksums_lambda_task.lambda_function,
         ]:
             processing_assets_table.grant_read_data(
                 processing_assets_reader  # type: ignore[arg-type]
@@ -242,6 +416,12 @@ class Processing(Construct):
             validation_results_table.grant(
                 check_files_checksums_task, "dynamodb:DescribeTable"  # type: ignore[arg-type]
             )
+            checksum_cache_table.grant_read_write_data(
+                check_files_checksums_task  # type: ignore[arg-type]
+            )
+            checksum_cache_table.grant(
+                check_files_checksums_task, "dynamodb:DescribeTable"  # type: ignore[arg-type]
+            )
             check_files_checksums_task.add_to_policy(ALLOW_ASSUME_ANY_ROLE)
 
         validation_summary_task = LambdaTask(
@@ -376,6 +556,10 @@ class Processing(Construct):
                     content_iterator_task.lambda_function,
                     import_dataset_task.lambda_function,
                 ],
+                checksum_cache_table.name_parameter: [content_iterator_task.lambda_function],
+                metadata_validation_cache_table.name_parameter: [
+                    check_stac_metadata_task.lambda_function
+                ],
                 validation_results_table.name_parameter: [
                     check_stac_metadata_task.lambda_function,
                     content_iterator_task.lambda_function,
@@ -406,15 +590,21 @@ class Processing(Construct):
 
         ############################################################################################
         # STATE MACHINE
-        dataset_version_creation_definition = (
-            check_stac_metadata_task.next(content_iterator_task)
+        content_validation_definition = (
+            aws_stepfunctions.Chain.start(content_iterator_task)
             .next(
                 aws_stepfunctions.Choice(  # type: ignore[arg-type]
                     self, "check_files_checksums_maybe_array"
                 )
+                .when(
+                    aws_stepfunctions.Condition.string_equals(
+                        f"$.{CONTENT_KEY}.{CHECKSUM_TIER_KEY}", CHECKSUM_TIER_LAMBDA
+                    ),
+                    check_files_checksums_lambda_task,
+                )
                 .when(
                     aws_stepfunctions.Condition.number_equals(
-                        f"$.{CONTENT_KEY}.{ITERATION_SIZE_KEY}", 1
+                        f"$.{CONTENT_KEY}.{ARRAY_SIZE_KEY}", 1
                     ),
                     check_files_checksums_single_task.batch_submit_job,
                 )
@@ -490,6 +680,18 @@ class Processing(Construct):
                 .otherwise(content_iterator_task)
             )
         )
+        dataset_version_creation_definition = check_stac_metadata_task.next(
+            aws_stepfunctions.Choice(self, "check_stac_metadata_sharded")  # type: ignore[arg-type]
+            .when(
+                aws_stepfunctions.Condition.is_present(
+                    f"$.{METADATA_VALIDATION_KEY}.{METADATA_SHARDS_KEY}"
+                ),
+                check_stac_metadata_shards_map.next(
+                    merge_stac_metadata_shards_task  # type: ignore[arg-type]
+                ).next(content_validation_definition),
+            )
+            .otherwise(content_validation_definition)
+        )
 
         self.state_machine = aws_stepfunctions.StateMachine(
             self,
@@ -18,11 +18,14 @@ class TaskJobDefinition(aws_batch.JobDefinition):
         env_name: str,
         directory: str,
         job_role: aws_iam.Role,
+        vcpus: int = 1,
     ):
+        # Jobs with more than one vCPU run a process on each, and every process needs its own
+        # memory, for example for the parts of a large object downloaded while checksumming it
         if env_name == PRODUCTION_ENVIRONMENT_NAME:
-            batch_job_definition_memory_limit = 3900
+            batch_job_definition_memory_limit = 3900 * vcpus
         else:
-            batch_job_definition_memory_limit = 500
+            batch_job_definition_memory_limit = 500 * vcpus
 
         image = aws_ecs.ContainerImage.from_asset(
             directory=".",
@@ -34,7 +37,7 @@ class TaskJobDefinition(aws_batch.JobDefinition):
             image=image,
             job_role=job_role,  # type: ignore[arg-type]
             memory_limit_mib=batch_job_definition_memory_limit,
-            vcpus=1,
+            vcpus=vcpus,
             environment={
                 AWS_DEFAULT_REGION_KEY: job_role.stack.region,
                 ENV_NAME_VARIABLE_NAME: env_name,
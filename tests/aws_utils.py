@@ -6,7 +6,7 @@ from random import choice, randrange
 from string import ascii_letters, ascii_lowercase, digits
 from time import sleep
 from types import TracebackType
-from typing import Any, BinaryIO, Dict, List, Optional, TextIO, Tuple, Type, get_args
+from typing import Any, BinaryIO, Counter, Dict, List, Optional, TextIO, Tuple, Type, get_args
 from unittest.mock import Mock
 from uuid import uuid4
 
@@ -134,6 +134,10 @@ def any_s3_bucket_arn() -> str:
     return f"arn:aws:s3:::{any_s3_bucket_name()}"
 
 
+def any_s3_version_id() -> str:
+    return random_string(32)
+
+
 def any_job_id() -> str:
     return uuid4().hex
 
@@ -311,9 +315,34 @@ class MockValidationResultFactory(Mock):
     pass
 
 
+class MockFailureCounters(Mock):
+    """Stands in for `increment_failure_count`, keeping the counts of each counter in memory."""
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+
+        self.failure_counts: Counter[str] = Counter()
+        self.side_effect = self.increment
+
+    def increment(self, _validation_result_factory: Any, counter: str) -> int:
+        self.failure_counts[counter] += 1
+        return self.failure_counts[counter]
+
+
 # Utility functions
 
 
+def get_saved_processing_asset_values(
+    processing_assets_model_mock: Mock,
+) -> List[Tuple[str, str, Optional[str]]]:
+    """The range key, URL and multihash of each processing asset written, by range key."""
+    return sorted(
+        (model_call.kwargs["range_key"], model_call.kwargs["url"], model_call.kwargs["multihash"])
+        for model_call in processing_assets_model_mock.return_value.call_args_list
+        if "multihash" in model_call.kwargs
+    )
+
+
 def wait_for_s3_key(bucket_name: str, key: str, s3_client: S3Client) -> None:
 
     process_timeout = datetime.now() + timedelta(minutes=3)
@@ -1,39 +1,71 @@
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
 from io import BytesIO
 from os import environ
-from typing import TYPE_CHECKING
+from pickle import dumps, loads
+from threading import active_count
+from typing import TYPE_CHECKING, Iterator, List, Tuple
 from unittest.mock import MagicMock, call, patch
 
-from botocore.exceptions import ClientError
+from botocore.exceptions import ClientError, IncompleteReadError
 from botocore.response import StreamingBody
 from multihash import SHA2_256
 from pytest import raises
 from pytest_subtests import SubTests
 
-from geostore.api_keys import MESSAGE_KEY
+from geostore.api_keys import MESSAGE_KEY, SUCCESS_KEY
 from geostore.check import Check
-from geostore.check_files_checksums.task import main
+from geostore.check_files_checksums.streaming import update_digest_from_stream
+from geostore.check_files_checksums.task import LAMBDA_CONCURRENCY, LOGGER, lambda_handler, main
 from geostore.check_files_checksums.utils import (
     ARRAY_INDEX_VARIABLE_NAME,
     ChecksumMismatchError,
     ChecksumValidator,
     get_job_offset,
+    initialise_worker,
+    validate_asset_in_worker,
 )
+from geostore.content_iterator_keys import (
+    ASSETS_TABLE_NAME_KEY,
+    CHECKSUM_CACHE_TABLE_NAME_KEY,
+    FIRST_ITEM_KEY,
+    ITERATION_SIZE_KEY,
+    RESULTS_TABLE_NAME_KEY,
+)
+from geostore.error_response_keys import ERROR_KEY
 from geostore.logging_keys import LOG_MESSAGE_VALIDATION_COMPLETE
 from geostore.models import DB_KEY_SEPARATOR
-from geostore.processing_assets_model import ProcessingAssetType, ProcessingAssetsModelBase
-from geostore.s3 import CHUNK_SIZE
+from geostore.processing_assets_model import (
+    ProcessingAssetType,
+    ProcessingAssetsModelBase,
+    get_checksum_shard_range_key,
+)
+from geostore.s3 import CHUNK_SIZE, S3_URL_PREFIX
+from geostore.s3_utils import get_bucket_and_key_from_url
 from geostore.step_function import Outcome, get_hash_key
+from geostore.step_function_keys import (
+    DATASET_ID_KEY,
+    MAX_FAILURES_KEY,
+    MAX_FAILURES_PER_CHECK_KEY,
+    METADATA_URL_KEY,
+    S3_ROLE_ARN_KEY,
+    VERSION_ID_KEY,
+)
+from geostore.types import JsonObject
+from geostore.validation_policy import ValidationPolicy
 from geostore.validation_results_model import ValidationResult
 
 from .aws_utils import (
+    MockFailureCounters,
     MockValidationResultFactory,
     any_batch_job_array_index,
+    any_lambda_context,
     any_role_arn,
     any_s3_url,
     any_table_name,
 )
-from .general_generators import any_program_name
+from .general_generators import any_etag, any_file_contents, any_program_name
 from .stac_generators import (
     any_dataset_id,
     any_dataset_version_id,
@@ -129,6 +161,386 @@ def should_validate_given_index(
         assert validation_results_factory_mock.mock_calls == expected_calls
 
 
+@patch("geostore.check_files_checksums.utils.ChecksumValidator.validate_url_multihash")
+@patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta")
+@patch("geostore.check_files_checksums.task.BufferedValidationResultFactory")
+def should_validate_contiguous_range_of_assets_per_job(
+    validation_results_factory_mock: MagicMock,
+    processing_assets_model_mock: MagicMock,
+    validate_url_multihash_mock: MagicMock,
+    subtests: SubTests,
+) -> None:
+    # Given
+    dataset_id = any_dataset_id()
+    version_id = any_dataset_version_id()
+    hash_key = get_hash_key(dataset_id, version_id)
+    first_item = 10_000
+    assets_per_job = 4
+    iteration_size = 10
+    array_index = "2"
+    expected_indexes = [10_008, 10_009]
+
+    def batch_get_mock(
+        keys: List[Tuple[str, str]], attributes_to_get: List[str]
+    ) -> Iterator[ProcessingAssetsModelBase]:
+        assert attributes_to_get == ["sk", "url", "multihash", "size"]
+        for given_hash_key, range_key in keys:
+            yield ProcessingAssetsModelBase(
+                hash_key=given_hash_key,
+                range_key=range_key,
+                url=f"{S3_URL_PREFIX}bucket/{range_key}",
+                multihash=range_key,
+            )
+
+    processing_assets_model_mock.return_value.batch_get.side_effect = batch_get_mock
+
+    # When
+    sys.argv = [
+        any_program_name(),
+        f"--dataset-id={dataset_id}",
+        f"--version-id={version_id}",
+        f"--first-item={first_item}",
+        f"--assets-table-name={any_table_name()}",
+        f"--results-table-name={any_table_name()}",
+        f"--s3-role-arn={any_role_arn()}",
+        f"--assets-per-job={assets_per_job}",
+        f"--iteration-size={iteration_size}",
+        "--concurrency=2",
+    ]
+    with patch.dict(environ, {ARRAY_INDEX_VARIABLE_NAME: array_index}), patch(
+        "geostore.check_files_checksums.utils.get_s3_client_for_role"
+    ):
+        main()
+
+    # Then
+    expected_range_keys = [
+        f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}" for index in expected_indexes
+    ]
+    with subtests.test(msg="Fetch items in one batch"):
+        processing_assets_model_mock.return_value.get.assert_not_called()
+        processing_assets_model_mock.return_value.batch_get.assert_called_once_with(
+            [(hash_key, range_key) for range_key in expected_range_keys],
+            attributes_to_get=["sk", "url", "multihash", "size"],
+        )
+
+    with subtests.test(msg="Validate checksums"):
+        validate_url_multihash_mock.assert_has_calls(
+            [
+                call(f"{S3_URL_PREFIX}bucket/{range_key}", range_key)
+                for range_key in expected_range_keys
+            ],
+            any_order=True,
+        )
+        assert validate_url_multihash_mock.call_count == len(expected_range_keys)
+
+    with subtests.test(msg="Share validation result factory"):
+        assert validation_results_factory_mock.call_count == 1
+
+    with subtests.test(msg="Flush validation results"):
+        validation_results_factory_mock.return_value.__exit__.assert_called_once_with(
+            None, None, None
+        )
+
+
+@patch("geostore.check_files_checksums.task.checksum_shard_model_with_meta")
+@patch("geostore.check_files_checksums.task.ChecksumValidator")
+@patch("geostore.check_files_checksums.task.BufferedValidationResultFactory")
+def should_validate_assets_of_checksum_shard_of_job(
+    _validation_results_factory_mock: MagicMock,
+    checksum_validator_mock: MagicMock,
+    checksum_shard_model_mock: MagicMock,
+    subtests: SubTests,
+) -> None:
+    # Given
+    dataset_id = any_dataset_id()
+    version_id = any_dataset_version_id()
+    hash_key = get_hash_key(dataset_id, version_id)
+    assets_table_name = any_table_name()
+    first_item = 10_000
+    shard_indexes = [10_002, 10_007]
+    shard_get_mock = checksum_shard_model_mock.return_value.get
+    shard_get_mock.return_value.indexes = shard_indexes
+
+    # When
+    sys.argv = [
+        any_program_name(),
+        f"--dataset-id={dataset_id}",
+        f"--version-id={version_id}",
+        f"--first-item={first_item}",
+        f"--assets-table-name={assets_table_name}",
+        f"--results-table-name={any_table_name()}",
+        f"--s3-role-arn={any_role_arn()}",
+        "--shard-count=3",
+    ]
+    with patch.dict(environ, {ARRAY_INDEX_VARIABLE_NAME: "1"}):
+        main()
+
+    # Then
+    with subtests.test(msg="Shard"):
+        checksum_shard_model_mock.assert_called_once_with(assets_table_name)
+        shard_get_mock.assert_called_once_with(
+            hash_key, get_checksum_shard_range_key(first_item, 1), consistent_read=True
+        )
+    with subtests.test(msg="Validate shard assets"):
+        assert checksum_validator_mock.return_value.validate_all.call_args.args[:2] == (
+            hash_key,
+            [
+                f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}"
+                for index in shard_indexes
+            ],
+        )
+
+
+@patch("geostore.check_files_checksums.task.ChecksumValidator")
+@patch("geostore.check_files_checksums.task.BufferedValidationResultFactory")
+def should_validate_whole_page_in_lambda(
+    validation_results_factory_mock: MagicMock, checksum_validator_mock: MagicMock
+) -> None:
+    # Given
+    dataset_id = any_dataset_id()
+    version_id = any_dataset_version_id()
+    hash_key = get_hash_key(dataset_id, version_id)
+    assets_table_name = any_table_name()
+    results_table_name = any_table_name()
+    s3_role_arn = any_role_arn()
+    checksum_cache_table_name = any_table_name()
+
+    # When
+    response = lambda_handler(
+        {
+            DATASET_ID_KEY: dataset_id,
+            VERSION_ID_KEY: version_id,
+            METADATA_URL_KEY: any_s3_url(),
+            S3_ROLE_ARN_KEY: s3_role_arn,
+            FIRST_ITEM_KEY: "10000",
+            ITERATION_SIZE_KEY: 2,
+            ASSETS_TABLE_NAME_KEY: assets_table_name,
+            RESULTS_TABLE_NAME_KEY: results_table_name,
+            CHECKSUM_CACHE_TABLE_NAME_KEY: checksum_cache_table_name,
+            MAX_FAILURES_KEY: "3",
+            MAX_FAILURES_PER_CHECK_KEY: "0",
+        },
+        any_lambda_context(),
+    )
+
+    # Then
+    assert response == {SUCCESS_KEY: True}
+    validation_results_factory_mock.assert_called_once_with(hash_key, results_table_name)
+    assert checksum_validator_mock.mock_calls == [
+        call(
+            assets_table_name,
+            validation_results_factory_mock.return_value.__enter__.return_value,
+            s3_role_arn,
+            LOGGER,
+            checksum_cache_table_name=checksum_cache_table_name,
+            validation_policy=ValidationPolicy(max_failures=3),
+        ),
+        call().validate_all(
+            hash_key,
+            [
+                f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}10000",
+                f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}10001",
+            ],
+            LAMBDA_CONCURRENCY,
+        ),
+    ]
+
+
+@patch("geostore.check_files_checksums.utils.ChecksumValidator.validate_url_multihash")
+@patch("geostore.check_files_checksums.utils.get_s3_client_for_role")
+@patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta")
+def should_validate_remaining_assets_before_raising_first_error(
+    processing_assets_model_mock: MagicMock,
+    get_s3_client_for_role_mock: MagicMock,
+    validate_url_multihash_mock: MagicMock,
+) -> None:
+    # Given
+    hash_key = get_hash_key(any_dataset_id(), any_dataset_version_id())
+    range_keys = [
+        f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}" for index in range(3)
+    ]
+    processing_assets_model_mock.return_value.batch_get.return_value = [
+        ProcessingAssetsModelBase(
+            hash_key=hash_key, range_key=range_key, url=any_s3_url(), multihash=any_hex_multihash()
+        )
+        for range_key in range_keys
+    ]
+    expected_error = ClientError(
+        ClientErrorResponseTypeDef(Error=ClientErrorResponseError(Code="TEST", Message="TEST")),
+        operation_name="get_object",
+    )
+    validate_url_multihash_mock.side_effect = [expected_error, None, None]
+    checksum_validator = ChecksumValidator(
+        any_table_name(), MockValidationResultFactory(), any_role_arn(), MagicMock()
+    )
+
+    # When/Then
+    with raises(ClientError):
+        checksum_validator.validate_all(hash_key, range_keys, 1)
+
+    assert validate_url_multihash_mock.call_count == 3
+    get_s3_client_for_role_mock.assert_called_once()
+
+
+@patch("geostore.validation_policy.increment_failure_count", new_callable=MockFailureCounters)
+@patch("geostore.check_files_checksums.utils.ChecksumValidator.validate_url_multihash")
+@patch("geostore.check_files_checksums.utils.get_s3_client_for_role")
+@patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta")
+def should_skip_remaining_assets_once_failure_limit_is_reached(
+    processing_assets_model_mock: MagicMock,
+    _get_s3_client_for_role_mock: MagicMock,
+    validate_url_multihash_mock: MagicMock,
+    _increment_failure_count_mock: MockFailureCounters,
+    subtests: SubTests,
+) -> None:
+    # Given
+    hash_key = get_hash_key(any_dataset_id(), any_dataset_version_id())
+    range_keys = [
+        f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}" for index in range(4)
+    ]
+    processing_assets_model_mock.return_value.batch_get.return_value = [
+        ProcessingAssetsModelBase(
+            hash_key=hash_key, range_key=range_key, url=any_s3_url(), multihash=any_hex_multihash()
+        )
+        for range_key in range_keys
+    ]
+    validate_url_multihash_mock.side_effect = ChecksumMismatchError("0")
+    validation_result_factory = MockValidationResultFactory()
+    checksum_validator = ChecksumValidator(
+        any_table_name(),
+        validation_result_factory,
+        any_role_arn(),
+        MagicMock(),
+        validation_policy=ValidationPolicy(max_failures=2),
+    )
+
+    # When
+    checksum_validator.validate_all(hash_key, range_keys, 1)
+
+    # Then
+    with subtests.test(msg="Validated"):
+        assert validate_url_multihash_mock.call_count == 2
+    with subtests.test(msg="Saved"):
+        assert [mock_call.args[1:3] for mock_call in validation_result_factory.save.mock_calls] == [
+            (Check.CHECKSUM, ValidationResult.FAILED),
+            (Check.CHECKSUM, ValidationResult.FAILED),
+        ]
+
+
+@patch("geostore.check_files_checksums.utils.ChecksumValidator.validate_url_multihash")
+@patch("geostore.check_files_checksums.utils.get_s3_client_for_role")
+@patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta")
+def should_save_results_sent_back_from_worker_process(
+    _processing_assets_model_mock: MagicMock,
+    _get_s3_client_for_role_mock: MagicMock,
+    validate_url_multihash_mock: MagicMock,
+    subtests: SubTests,
+) -> None:
+    # Given
+    url = any_s3_url()
+    expected_error = ClientError(
+        ClientErrorResponseTypeDef(Error=ClientErrorResponseError(Code="TEST", Message="TEST")),
+        operation_name="get_object",
+    )
+    validate_url_multihash_mock.side_effect = [ChecksumMismatchError("0"), expected_error]
+    validation_result_factory = MockValidationResultFactory()
+    checksum_validator = ChecksumValidator(
+        any_table_name(), validation_result_factory, any_role_arn(), MagicMock()
+    )
+    initialise_worker(checksum_validator.worker_arguments)
+
+    # When
+    with ThreadPoolExecutor(max_workers=1) as process_pool_stand_in:
+        checksum_validator.validate_asset_in_process(
+            process_pool_stand_in, url, any_hex_multihash()
+        )
+        with raises(ClientError):
+            checksum_validator.validate_asset_in_process(
+                process_pool_stand_in, url, any_hex_multihash()
+            )
+
+    # Then
+    with subtests.test(msg="Saved in parent"):
+        assert [mock_call.args[:3] for mock_call in validation_result_factory.save.mock_calls] == [
+            (url, Check.CHECKSUM, ValidationResult.FAILED)
+        ]
+
+
+@patch("geostore.check_files_checksums.utils.ChecksumValidator.validate_url_multihash")
+@patch("geostore.check_files_checksums.utils.get_s3_client_for_role")
+@patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta")
+def should_raise_client_error_sent_back_from_worker_process_in_parent(
+    _processing_assets_model_mock: MagicMock,
+    _get_s3_client_for_role_mock: MagicMock,
+    validate_url_multihash_mock: MagicMock,
+) -> None:
+    # Given a worker whose download fails
+    validate_url_multihash_mock.side_effect = ClientError(
+        ClientErrorResponseTypeDef(Error=ClientErrorResponseError(Code="TEST", Message="TEST")),
+        operation_name="get_object",
+    )
+    checksum_validator = ChecksumValidator(
+        any_table_name(), MockValidationResultFactory(), any_role_arn(), MagicMock()
+    )
+    initialise_worker(checksum_validator.worker_arguments)
+    process_pool = MagicMock()
+    process_pool.submit.return_value.result.return_value = loads(
+        dumps(validate_asset_in_worker(any_s3_url(), any_hex_multihash()))
+    )
+
+    # When/Then the error survives being sent back to the parent process
+    with raises(ClientError, match=r"\(TEST\) when calling the get_object operation: TEST"):
+        checksum_validator.validate_asset_in_process(
+            process_pool, any_s3_url(), any_hex_multihash()
+        )
+
+
+@patch("geostore.check_files_checksums.utils.ChecksumValidator.validate_url_multihash")
+@patch("geostore.check_files_checksums.utils.get_s3_client_for_role")
+@patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta")
+def should_log_missing_items_after_validating_prefetched_assets(
+    processing_assets_model_mock: MagicMock,
+    _get_s3_client_for_role_mock: MagicMock,
+    validate_url_multihash_mock: MagicMock,
+    subtests: SubTests,
+) -> None:
+    # Given
+    hash_key = get_hash_key(any_dataset_id(), any_dataset_version_id())
+    existing_range_key = f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}0"
+    missing_range_key = f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}1"
+    url = any_s3_url()
+    hex_multihash = any_hex_multihash()
+    processing_assets_model_mock.return_value.batch_get.return_value = [
+        ProcessingAssetsModelBase(
+            hash_key=hash_key, range_key=existing_range_key, url=url, multihash=hex_multihash
+        )
+    ]
+    processing_assets_model_mock.return_value.DoesNotExist = ProcessingAssetsModelBase.DoesNotExist
+    logger_mock = MagicMock()
+    checksum_validator = ChecksumValidator(
+        any_table_name(), MockValidationResultFactory(), any_role_arn(), logger_mock
+    )
+
+    # When/Then
+    with raises(ProcessingAssetsModelBase.DoesNotExist):
+        checksum_validator.validate_all(hash_key, [existing_range_key, missing_range_key], 2)
+
+    with subtests.test(msg="Validate existing asset"):
+        assert validate_url_multihash_mock.mock_calls == [call(url, hex_multihash)]
+
+    with subtests.test(msg="Log missing asset"):
+        logger_mock.error.assert_called_once_with(
+            LOG_MESSAGE_VALIDATION_COMPLETE,
+            extra={
+                "outcome": Outcome.FAILED,
+                "error": {
+                    ERROR_KEY: {MESSAGE_KEY: "Item does not exist"},
+                    "parameters": {"hash_key": hash_key, "range_key": missing_range_key},
+                },
+            },
+        )
+
+
 @patch("geostore.check_files_checksums.utils.ChecksumValidator.validate_url_multihash")
 @patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta")
 @patch("geostore.check_files_checksums.task.ValidationResultFactory")
@@ -281,3 +693,227 @@ def should_raise_exception_when_checksum_does_not_match(
         ).validate_url_multihash(
             any_s3_url(), f"{SHA2_256:x}{SHA256_CHECKSUM_BYTE_COUNT:x}{checksum}"
         )
+
+
+@patch("geostore.check_files_checksums.utils.RANGED_GET_PART_SIZE", 4)
+@patch("geostore.check_files_checksums.utils.get_s3_client_for_role")
+def should_hash_large_object_from_ordered_byte_ranges(
+    get_s3_client_for_role_mock: MagicMock, subtests: SubTests
+) -> None:
+    # Given
+    file_contents = any_file_contents(byte_count=18)
+    s3_url = any_s3_url()
+    version_id = any_dataset_version_id()
+
+    def get_object_mock(**kwargs: str) -> JsonObject:
+        if "Range" not in kwargs:
+            return {
+                "Body": StreamingBody(BytesIO(file_contents), len(file_contents)),
+                "ContentLength": len(file_contents),
+                "VersionId": version_id,
+            }
+        first_byte, last_byte = (int(byte) for byte in kwargs["Range"][6:].split("-"))
+        part = file_contents[first_byte : last_byte + 1]
+        return {"Body": StreamingBody(BytesIO(part), len(part))}
+
+    get_s3_client_for_role_mock.return_value.get_object.side_effect = get_object_mock
+
+    # When
+    with patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta"):
+        ChecksumValidator(
+            any_table_name(),
+            MockValidationResultFactory(),
+            any_role_arn(),
+            MagicMock(),
+            ranged_get_threshold=len(file_contents) - 1,
+        ).validate_url_multihash(
+            s3_url, sha256_hex_digest_to_multihash(sha256(file_contents).hexdigest())
+        )
+
+    # Then
+    bucket, key = get_bucket_and_key_from_url(s3_url)
+    with subtests.test(msg="Ranged requests"):
+        get_object_mock_calls = get_s3_client_for_role_mock.return_value.get_object.mock_calls
+        assert get_object_mock_calls[0] == call(Bucket=bucket, Key=key)
+        assert sorted(mock_call.kwargs["Range"] for mock_call in get_object_mock_calls[1:]) == [
+            "bytes=12-15",
+            "bytes=16-17",
+            "bytes=4-7",
+            "bytes=8-11",
+        ]
+
+    with subtests.test(msg="Pinned version"):
+        for mock_call in get_object_mock_calls[1:]:
+            assert mock_call.kwargs["VersionId"] == version_id
+
+
+@patch("geostore.check_files_checksums.utils.RANGED_GET_PART_SIZE", 4)
+@patch("geostore.check_files_checksums.utils.get_s3_client_for_role")
+def should_raise_exception_when_ranged_checksum_does_not_match(
+    get_s3_client_for_role_mock: MagicMock,
+) -> None:
+    file_contents = any_file_contents(byte_count=10)
+    get_s3_client_for_role_mock.return_value.get_object.side_effect = lambda **kwargs: {
+        "Body": StreamingBody(BytesIO(file_contents), len(file_contents)),
+        "ContentLength": len(file_contents),
+        "ETag": any_etag(),
+    }
+
+    with raises(ChecksumMismatchError), patch(
+        "geostore.check_files_checksums.utils.processing_assets_model_with_meta"
+    ):
+        ChecksumValidator(
+            any_table_name(),
+            MockValidationResultFactory(),
+            any_role_arn(),
+            MagicMock(),
+            ranged_get_threshold=0,
+        ).validate_url_multihash(
+            any_s3_url(), sha256_hex_digest_to_multihash(sha256(file_contents).hexdigest())
+        )
+
+
+@patch("geostore.check_files_checksums.utils.checksum_cache_model_with_meta")
+@patch("geostore.check_files_checksums.utils.get_s3_client_for_role")
+@patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta")
+def should_skip_download_when_source_object_checksum_is_cached(
+    processing_assets_model_mock: MagicMock,
+    get_s3_client_for_role_mock: MagicMock,
+    checksum_cache_model_mock: MagicMock,
+    subtests: SubTests,
+) -> None:
+    # Given
+    hash_key = get_hash_key(any_dataset_id(), any_dataset_version_id())
+    range_key = f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}0"
+    url = any_s3_url()
+    multihash = any_hex_multihash()
+    etag = any_etag()
+    version_id = any_dataset_version_id()
+    processing_assets_model_mock.return_value.get.return_value = ProcessingAssetsModelBase(
+        hash_key=hash_key, range_key=range_key, url=url, multihash=multihash
+    )
+    get_s3_client_for_role_mock.return_value.head_object.return_value = {
+        "ContentLength": 1,
+        "ETag": etag,
+        "VersionId": version_id,
+    }
+    validation_result_factory = MockValidationResultFactory()
+
+    # When
+    ChecksumValidator(
+        any_table_name(),
+        validation_result_factory,
+        any_role_arn(),
+        MagicMock(),
+        checksum_cache_table_name=any_table_name(),
+    ).validate(hash_key, range_key)
+
+    # Then
+    with subtests.test(msg="Cache lookup"):
+        checksum_cache_model_mock.return_value.get.assert_called_once_with(
+            url,
+            range_key=f"ETAG#{etag}#VERSION#{version_id}#SIZE#1#MULTIHASH#{multihash}",
+        )
+
+    with subtests.test(msg="No download"):
+        get_s3_client_for_role_mock.return_value.get_object.assert_not_called()
+
+    with subtests.test(msg="Validation result"):
+        assert validation_result_factory.mock_calls == [
+            call.save(url, Check.CHECKSUM, ValidationResult.CACHED)
+        ]
+
+
+@patch("geostore.check_files_checksums.utils.checksum_cache_model_with_meta")
+@patch("geostore.check_files_checksums.utils.get_s3_client_for_role")
+@patch("geostore.check_files_checksums.utils.processing_assets_model_with_meta")
+def should_cache_checksum_of_source_object_after_download(
+    processing_assets_model_mock: MagicMock,
+    get_s3_client_for_role_mock: MagicMock,
+    checksum_cache_model_mock: MagicMock,
+    subtests: SubTests,
+) -> None:
+    # Given
+    hash_key = get_hash_key(any_dataset_id(), any_dataset_version_id())
+    range_key = f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}0"
+    url = any_s3_url()
+    file_contents = any_file_contents(byte_count=10)
+    multihash = sha256_hex_digest_to_multihash(sha256(file_contents).hexdigest())
+    etag = any_etag()
+    processing_assets_model_mock.return_value.get.return_value = ProcessingAssetsModelBase(
+        hash_key=hash_key, range_key=range_key, url=url, multihash=multihash
+    )
+    get_s3_client_for_role_mock.return_value.get_object.return_value = {
+        "Body": StreamingBody(BytesIO(file_contents), len(file_contents)),
+        "ContentLength": len(file_contents),
+        "ETag": etag,
+    }
+    validation_result_factory = MockValidationResultFactory()
+
+    # When
+    ChecksumValidator(
+        any_table_name(),
+        validation_result_factory,
+        any_role_arn(),
+        MagicMock(),
+        checksum_cache_table_name=any_table_name(),
+        force_rehash=True,
+    ).validate(hash_key, range_key)
+
+    # Then
+    with subtests.test(msg="Forced rehash skips lookup"):
+        get_s3_client_for_role_mock.return_value.head_object.assert_not_called()
+        checksum_cache_model_mock.return_value.get.assert_not_called()
+
+    with subtests.test(msg="Cache entry"):
+        checksum_cache_model_mock.return_value.assert_called_once_with(
+            hash_key=url,
+            range_key=f"ETAG#{etag}#VERSION##SIZE#{len(file_contents)}#MULTIHASH#{multihash}",
+        )
+        checksum_cache_model_mock.return_value.return_value.save.assert_called_once_with()
+
+    with subtests.test(msg="Validation result"):
+        assert validation_result_factory.mock_calls == [
+            call.save(url, Check.CHECKSUM, ValidationResult.PASSED)
+        ]
+
+
+def should_hash_stream_across_reused_buffers(subtests: SubTests) -> None:
+    buffer_size = 16
+    for byte_count in [0, 1, buffer_size - 1, buffer_size, buffer_size + 1, buffer_size * 5 + 3]:
+        file_contents = any_file_contents(byte_count=byte_count)
+        digest = sha256()
+
+        update_digest_from_stream(
+            digest, StreamingBody(BytesIO(file_contents), byte_count), buffer_size=buffer_size
+        )
+
+        with subtests.test(msg=byte_count):
+            assert digest.hexdigest() == sha256(file_contents).hexdigest()
+
+
+def should_stop_reader_thread_and_close_stream_when_hashing_fails(subtests: SubTests) -> None:
+    file_contents = any_file_contents()
+    raw_stream = BytesIO(file_contents)
+    digest = MagicMock()
+    digest.update.side_effect = MemoryError()
+    threads_before = active_count()
+
+    with raises(MemoryError):
+        update_digest_from_stream(
+            digest, StreamingBody(raw_stream, len(file_contents)), buffer_size=1
+        )
+
+    with subtests.test(msg="Reader thread stopped"):
+        assert active_count() == threads_before
+    with subtests.test(msg="Stream closed"):
+        assert raw_stream.closed
+
+
+def should_raise_stream_error_from_reader_thread() -> None:
+    file_contents = any_file_contents()
+
+    with raises(IncompleteReadError):
+        update_digest_from_stream(
+            sha256(), StreamingBody(BytesIO(file_contents), len(file_contents) + 1)
+        )
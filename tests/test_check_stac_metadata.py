@@ -5,7 +5,9 @@ from hashlib import sha256, sha512
 from io import BytesIO, StringIO
 from json import JSONDecodeError, dumps, load
 from os.path import basename
-from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+from pathlib import Path
+from sys import getrecursionlimit
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple
 from unittest.mock import MagicMock, call, patch
 
 from botocore.exceptions import ClientError
@@ -27,6 +29,7 @@ from geostore.check_stac_metadata.utils import (
     PROCESSING_ASSET_URL_KEY,
     InvalidSecurityClassificationError,
     STACDatasetValidator,
+    get_compiled_stac_type_validation_map,
 )
 from geostore.import_metadata_file.task import S3_BODY_KEY
 from geostore.logging_keys import LOG_MESSAGE_VALIDATION_COMPLETE
@@ -46,6 +49,8 @@ from geostore.stac_format import (
     STAC_HREF_KEY,
     STAC_ID_KEY,
     STAC_LINKS_KEY,
+    STAC_TYPE_COLLECTION,
+    STAC_TYPE_KEY,
 )
 from geostore.step_function import Outcome, get_hash_key
 from geostore.step_function_keys import (
@@ -118,7 +123,7 @@ def should_succeed_with_validation_failure(
         )
 
 
-@patch("geostore.check_stac_metadata.task.ValidationResultFactory")
+@patch("geostore.check_stac_metadata.task.BufferedValidationResultFactory")
 @patch("geostore.check_stac_metadata.task.get_s3_client_for_role")
 @patch("geostore.check_stac_metadata.task.get_param")
 def should_save_non_s3_url_validation_results(
@@ -129,6 +134,9 @@ def should_save_non_s3_url_validation_results(
     # Given
     validation_results_table_name = any_table_name()
     get_param_mock.return_value = validation_results_table_name
+    validation_results_factory_mock.return_value.__enter__.return_value = (
+        validation_results_factory_mock.return_value
+    )
     non_s3_url = any_https_url()
     dataset_id = any_dataset_id()
     version_id = any_dataset_version_id()
@@ -152,16 +160,19 @@ def should_save_non_s3_url_validation_results(
     hash_key = get_hash_key(dataset_id, version_id)
     assert validation_results_factory_mock.mock_calls == [
         call(hash_key, validation_results_table_name),
+        call().__enter__(),
         call().save(
             non_s3_url,
             Check.NON_S3_URL,
             ValidationResult.FAILED,
             details={MESSAGE_KEY: f"URL doesn't start with “{S3_URL_PREFIX}”: “{non_s3_url}”"},
         ),
+        call().flush(),
+        call().__exit__(None, None, None),
     ]
 
 
-@patch("geostore.check_stac_metadata.task.ValidationResultFactory")
+@patch("geostore.check_stac_metadata.task.BufferedValidationResultFactory")
 def should_report_duplicate_asset_names(validation_results_factory_mock: MagicMock) -> None:
     # Given
     asset_name = "name"
@@ -215,13 +226,16 @@ def should_report_duplicate_asset_names(validation_results_factory_mock: MagicMo
 
 @mark.infrastructure
 @patch("geostore.check_stac_metadata.task.get_s3_client_for_role")
-@patch("geostore.check_stac_metadata.task.ValidationResultFactory")
+@patch("geostore.check_stac_metadata.task.BufferedValidationResultFactory")
 def should_save_staging_access_validation_results(
     validation_results_factory_mock: MagicMock,
     get_s3_client_for_role_mock: MagicMock,
 ) -> None:
 
     validation_results_table_name = get_param(ParameterName.STORAGE_VALIDATION_RESULTS_TABLE_NAME)
+    validation_results_factory_mock.return_value.__enter__.return_value = (
+        validation_results_factory_mock.return_value
+    )
     expected_error = ClientError(
         ClientErrorResponseTypeDef(Error=ClientErrorResponseError(Code="TEST", Message="TEST")),
         operation_name="get_object",
@@ -245,12 +259,14 @@ def should_save_staging_access_validation_results(
     hash_key = get_hash_key(dataset_id, version_id)
     assert validation_results_factory_mock.mock_calls == [
         call(hash_key, validation_results_table_name),
+        call().__enter__(),
         call().save(
             s3_url,
             Check.STAGING_ACCESS,
             ValidationResult.FAILED,
             details={MESSAGE_KEY: str(expected_error)},
         ),
+        call().__exit__(None, None, None),
     ]
 
 
@@ -397,12 +413,14 @@ def should_insert_asset_urls_and_checksums_into_database(subtests: SubTests) ->
                     range_key=f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}0",
                     url=first_asset_s3_object.url,
                     multihash=first_asset_multihash,
+                    size=len(first_asset_content),
                 ),
                 processing_assets_model(
                     hash_key=expected_hash_key,
                     range_key=f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}1",
                     url=second_asset_s3_object.url,
                     multihash=second_asset_multihash,
+                    size=len(second_asset_content),
                 ),
             ]
 
@@ -525,6 +543,30 @@ def should_treat_any_missing_item_top_level_key_as_invalid(subtests: SubTests) -
             STACItemSchemaValidator.validate(stac_object)
 
 
+def should_validate_minimal_objects_with_compiled_schemas(tmp_path: Path) -> None:
+    schema_validators = get_compiled_stac_type_validation_map(str(tmp_path))
+
+    for stac_object in [
+        MINIMAL_VALID_STAC_CATALOG_OBJECT,
+        MINIMAL_VALID_STAC_COLLECTION_OBJECT,
+        MINIMAL_VALID_STAC_ITEM_OBJECT,
+    ]:
+        schema_validators[stac_object[STAC_TYPE_KEY]].validate(deepcopy(stac_object))
+
+
+def should_report_the_jsonschema_error_from_compiled_schemas(tmp_path: Path) -> None:
+    schema_validators = get_compiled_stac_type_validation_map(str(tmp_path))
+    stac_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+    stac_object["extent"]["temporal"]["interval"][0][0] = "not a datetime"
+
+    with raises(ValidationError) as expected_error:
+        STACCollectionSchemaValidator.validate(stac_object)
+    with raises(ValidationError) as actual_error:
+        schema_validators[STAC_TYPE_COLLECTION].validate(stac_object)
+
+    assert str(actual_error.value) == str(expected_error.value)
+
+
 def should_detect_invalid_datetime() -> None:
     stac_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
     stac_object["extent"]["temporal"]["interval"][0][0] = "not a datetime"
@@ -593,6 +635,136 @@ def should_only_validate_each_file_once() -> None:
     assert url_reader.mock_calls == [call(root_url), call(child_url), call(leaf_url)]
 
 
+def should_validate_catalogs_nested_deeper_than_the_recursion_limit() -> None:
+    base_url = any_s3_url()
+    urls = [f"{base_url}/{index}.json" for index in range(getrecursionlimit() + 1)]
+    url_to_json = {}
+    for url, child_url in zip(urls, [*urls[1:], None]):
+        stac_object = deepcopy(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+        stac_object[STAC_LINKS_KEY] = [{STAC_HREF_KEY: urls[0], "rel": "root"}]
+        if child_url is not None:
+            stac_object[STAC_LINKS_KEY].append({STAC_HREF_KEY: child_url, "rel": "child"})
+        url_to_json[url] = stac_object
+
+    with patch("geostore.check_stac_metadata.utils.processing_assets_model_with_meta"):
+        validator = STACDatasetValidator(
+            any_hash_key(), MockJSONURLReader(url_to_json), MockValidationResultFactory()
+        )
+
+    validator.validate(urls[0])
+
+    assert list(validator.dataset_metadata) == [{PROCESSING_ASSET_URL_KEY: url} for url in urls]
+
+
+def should_report_the_same_results_when_reading_metadata_files_concurrently(
+    subtests: SubTests,
+) -> None:
+    # Given a catalog linking to a collection with several items, one of which has a duplicate key
+    base_url = any_s3_url()
+    root_url = f"{base_url}/{any_safe_filename()}"
+    collection_url = f"{base_url}/{any_safe_filename()}"
+    item_urls = [f"{base_url}/{any_safe_filename()}" for _ in range(5)]
+
+    root_stac_object = deepcopy(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+    root_stac_object[STAC_LINKS_KEY] = [{STAC_HREF_KEY: collection_url, "rel": "child"}]
+    collection_stac_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+    collection_stac_object[STAC_LINKS_KEY] = [
+        {STAC_HREF_KEY: root_url, "rel": "root"},
+        *({STAC_HREF_KEY: item_url, "rel": "item"} for item_url in item_urls),
+    ]
+    url_to_json: Dict[str, Any] = {
+        root_url: root_stac_object,
+        collection_url: collection_stac_object,
+    }
+    for item_url in item_urls:
+        item_stac_object = deepcopy(MINIMAL_VALID_STAC_ITEM_OBJECT)
+        item_stac_object[STAC_LINKS_KEY] = [{STAC_HREF_KEY: root_url, "rel": "root"}]
+        url_to_json[item_url] = item_stac_object
+    url_to_json[item_urls[2]] = StringIO(
+        initial_value=dumps(url_to_json[item_urls[2]])[:-1] + ', "type": "Feature"}'
+    )
+
+    serial_result_factory = MockValidationResultFactory()
+    concurrent_result_factory = MockValidationResultFactory()
+    with patch("geostore.check_stac_metadata.utils.processing_assets_model_with_meta"):
+        serial_validator = STACDatasetValidator(
+            any_hash_key(), MockJSONURLReader(url_to_json), serial_result_factory
+        )
+        concurrent_url_reader = MockJSONURLReader(url_to_json)
+        concurrent_validator = STACDatasetValidator(
+            any_hash_key(), concurrent_url_reader, concurrent_result_factory, concurrency=4
+        )
+
+    # When
+    serial_validator.validate(root_url)
+    concurrent_validator.validate(root_url)
+
+    # Then
+    with subtests.test(msg="Each file read once"):
+        assert sorted(url for (url,), _ in concurrent_url_reader.call_args_list) == sorted(
+            url_to_json
+        )
+    with subtests.test(msg="Validation results"):
+        assert concurrent_result_factory.mock_calls == serial_result_factory.mock_calls
+    with subtests.test(msg="Metadata"):
+        assert list(concurrent_validator.dataset_metadata) == list(
+            serial_validator.dataset_metadata
+        )
+
+
+def should_batch_write_processing_assets_from_several_threads(subtests: SubTests) -> None:
+    # Given a validated dataset with more assets than write streams
+    hash_key = any_hash_key()
+    metadata_url = any_s3_url()
+    assets = [
+        {
+            PROCESSING_ASSET_URL_KEY: any_s3_url(),
+            PROCESSING_ASSET_MULTIHASH_KEY: any_hex_multihash(),
+        }
+        for _ in range(20)
+    ]
+    with patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ) as processing_assets_model_with_meta_mock:
+        validator = STACDatasetValidator(hash_key, MagicMock(), MockValidationResultFactory())
+    validator.dataset_metadata.append({PROCESSING_ASSET_URL_KEY: metadata_url})
+    validator.dataset_assets.extend(assets)
+    processing_assets_model_mock = processing_assets_model_with_meta_mock.return_value
+    batch_mock = processing_assets_model_mock.batch_write.return_value.__enter__.return_value
+
+    # When
+    validator.save_processing_assets()
+
+    # Then
+    with subtests.test(msg="Items"):
+        assert {
+            item.kwargs["range_key"]: item.kwargs
+            for item in processing_assets_model_mock.call_args_list
+        } == {
+            f"{ProcessingAssetType.METADATA.value}{DB_KEY_SEPARATOR}0": {
+                "hash_key": hash_key,
+                "range_key": f"{ProcessingAssetType.METADATA.value}{DB_KEY_SEPARATOR}0",
+                "url": metadata_url,
+                "multihash": None,
+                "size": None,
+            },
+            **{
+                f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}": {
+                    "hash_key": hash_key,
+                    "range_key": f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}",
+                    "url": asset[PROCESSING_ASSET_URL_KEY],
+                    "multihash": asset[PROCESSING_ASSET_MULTIHASH_KEY],
+                    "size": None,
+                }
+                for index, asset in enumerate(assets)
+            },
+        }
+    with subtests.test(msg="Batch writes"):
+        assert processing_assets_model_mock.batch_write.call_count == 8
+    with subtests.test(msg="Saved"):
+        assert batch_mock.save.call_count == len(assets) + 1
+
+
 def should_collect_assets_from_validated_collection_metadata_files(subtests: SubTests) -> None:
     # Given one asset in another directory and one relative link
     base_url = any_s3_url()
@@ -640,7 +812,60 @@ def should_collect_assets_from_validated_collection_metadata_files(subtests: Sub
     with subtests.test():
         assert _sort_assets(validator.dataset_assets) == _sort_assets(expected_assets)
     with subtests.test():
-        assert validator.dataset_metadata == expected_metadata
+        assert list(validator.dataset_metadata) == expected_metadata
+
+
+def should_collect_every_link_and_asset_and_schema_validate_the_others_in_batches(
+    subtests: SubTests,
+) -> None:
+    # Given more links and assets than are materialised, and an asset without a checksum
+    base_url = any_s3_url()
+    metadata_url = f"{base_url}/{any_safe_filename()}"
+    link_urls = [f"{base_url}/{any_safe_filename()}" for _ in range(2)]
+    assets = {
+        any_asset_name(): {
+            STAC_HREF_KEY: f"{base_url}/{any_safe_filename()}",
+            STAC_FILE_CHECKSUM_KEY: any_hex_multihash(),
+        }
+        for _ in range(2)
+    }
+    incomplete_asset_name = any_asset_name()
+    incomplete_asset = {STAC_HREF_KEY: f"{base_url}/{any_safe_filename()}"}
+    stac_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+    stac_object[STAC_LINKS_KEY] = [{STAC_HREF_KEY: url, "rel": "item"} for url in link_urls]
+    stac_object[STAC_ASSETS_KEY] = {**assets, incomplete_asset_name: incomplete_asset}
+    schema_validator = MagicMock()
+
+    with patch("geostore.check_stac_metadata.utils.processing_assets_model_with_meta"), patch(
+        "geostore.check_stac_metadata.utils.MAX_MATERIALISED_LINK_AND_ASSET_COUNT", 2
+    ):
+        validator = STACDatasetValidator(
+            any_hash_key(),
+            MockJSONURLReader({metadata_url: stac_object}),
+            MockValidationResultFactory(),
+            schema_validators={STAC_TYPE_COLLECTION: schema_validator},
+        )
+
+        # When
+        next_urls = validator.validate_object(metadata_url)
+
+    # Then
+    with subtests.test(msg="Links"):
+        assert next_urls == link_urls
+    with subtests.test(msg="Assets"):
+        assert list(validator.dataset_assets) == [
+            {
+                PROCESSING_ASSET_URL_KEY: asset[STAC_HREF_KEY],
+                PROCESSING_ASSET_MULTIHASH_KEY: asset[STAC_FILE_CHECKSUM_KEY],
+            }
+            for asset in assets.values()
+        ]
+    with subtests.test(msg="Schema validated objects"):
+        first_links = stac_object[STAC_LINKS_KEY][:1]
+        assert schema_validator.validate.mock_calls == [
+            call({**stac_object, STAC_ASSETS_KEY: {incomplete_asset_name: incomplete_asset}}),
+            call({**stac_object, STAC_LINKS_KEY: first_links, STAC_ASSETS_KEY: assets}),
+        ]
 
 
 def should_collect_assets_from_validated_item_metadata_files(subtests: SubTests) -> None:
@@ -686,7 +911,7 @@ def should_collect_assets_from_validated_item_metadata_files(subtests: SubTests)
     with subtests.test():
         assert _sort_assets(validator.dataset_assets) == _sort_assets(expected_assets)
     with subtests.test():
-        assert validator.dataset_metadata == expected_metadata
+        assert list(validator.dataset_metadata) == expected_metadata
 
 
 def should_raise_exception_when_loading_not_unclassified_dataset(subtests: SubTests) -> None:
@@ -719,7 +944,7 @@ def should_raise_exception_when_loading_not_unclassified_dataset(subtests: SubTe
         ]
 
 
-@patch("geostore.check_stac_metadata.task.ValidationResultFactory")
+@patch("geostore.check_stac_metadata.task.BufferedValidationResultFactory")
 def should_report_invalid_json(validation_results_factory_mock: MagicMock) -> None:
     # Given
     metadata_url = any_s3_url()
@@ -744,7 +969,7 @@ def should_report_invalid_json(validation_results_factory_mock: MagicMock) -> No
     ]
 
 
-@patch("geostore.check_stac_metadata.task.ValidationResultFactory")
+@patch("geostore.check_stac_metadata.task.BufferedValidationResultFactory")
 def should_report_when_the_dataset_has_no_assets(
     validation_results_factory_mock: MagicMock, subtests: SubTests
 ) -> None:
@@ -771,5 +996,5 @@ def should_report_when_the_dataset_has_no_assets(
         )
 
 
-def _sort_assets(assets: List[Dict[str, str]]) -> List[Dict[str, str]]:
+def _sort_assets(assets: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
     return sorted(assets, key=lambda entry: entry[PROCESSING_ASSET_URL_KEY])
@@ -0,0 +1,227 @@
+from copy import deepcopy
+from typing import Dict, Iterator, List, Tuple
+from unittest.mock import MagicMock, call, patch
+
+from botocore.exceptions import ClientError
+from pytest_subtests import SubTests
+
+from geostore.api_keys import MESSAGE_KEY
+from geostore.check import Check
+from geostore.check_stac_metadata.asset_inventory import get_object_sizes
+from geostore.check_stac_metadata.utils import STACDatasetValidator
+from geostore.processing_assets_model import PROCESSING_ASSETS_SUMMARY_RANGE_KEY
+from geostore.stac_format import (
+    STAC_ASSETS_KEY,
+    STAC_FILE_CHECKSUM_KEY,
+    STAC_HREF_KEY,
+    STAC_TYPE_COLLECTION,
+)
+from geostore.validation_policy import (
+    SUPPRESSED_FAILURE_COUNT_KEY,
+    ValidationPolicy,
+    save_suppressed_failures,
+)
+from geostore.validation_results_model import ValidationResult
+
+from .aws_utils import (
+    MockFailureCounters,
+    MockJSONURLReader,
+    MockValidationResultFactory,
+    any_error_code,
+    any_operation_name,
+    any_s3_url,
+)
+from .dynamodb_generators import any_hash_key
+from .general_generators import any_error_message, any_safe_filename
+from .stac_generators import any_asset_name, any_hex_multihash
+from .stac_objects import MINIMAL_VALID_STAC_COLLECTION_OBJECT
+
+
+def should_list_each_asset_directory_once() -> None:
+    first_directory_url = f"{any_s3_url()}/"
+    second_directory_url = f"{any_s3_url()}/"
+    first_url = f"{first_directory_url}{any_safe_filename()}"
+    second_url = f"{first_directory_url}{any_safe_filename()}"
+    third_url = f"{second_directory_url}{any_safe_filename()}"
+    listing: Dict[str, List[Tuple[str, int]]] = {
+        first_directory_url: [
+            (first_url, 1),
+            (second_url, 2),
+            (f"{first_directory_url}{any_safe_filename()}", 3),
+        ],
+        second_directory_url: [],
+    }
+    object_lister = MagicMock(side_effect=lambda url: iter(listing[url]))
+
+    sizes = get_object_sizes(object_lister, [first_url, second_url, third_url])
+
+    assert sizes == {first_url: 1, second_url: 2}
+    assert sorted(object_lister.mock_calls) == sorted(
+        [call(first_directory_url), call(second_directory_url)]
+    )
+
+
+def should_report_missing_asset_files_and_record_sizes_of_others(subtests: SubTests) -> None:
+    # Given a collection with an existing and a missing asset file
+    base_url = any_s3_url()
+    metadata_url = f"{base_url}/{any_safe_filename()}"
+    existing_asset_url = f"{base_url}/{any_safe_filename()}"
+    missing_asset_url = f"{base_url}/{any_safe_filename()}"
+    existing_asset_size = 1_024
+    collection_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+    collection_object[STAC_ASSETS_KEY] = {
+        any_asset_name(): {STAC_HREF_KEY: url, STAC_FILE_CHECKSUM_KEY: any_hex_multihash()}
+        for url in [existing_asset_url, missing_asset_url]
+    }
+
+    def object_lister(_directory_url: str) -> Iterator[Tuple[str, int]]:
+        yield metadata_url, 1
+        yield existing_asset_url, existing_asset_size
+
+    validation_result_factory = MockValidationResultFactory()
+
+    # When
+    with patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ) as processing_assets_model_mock:
+        validator = STACDatasetValidator(
+            any_hash_key(),
+            MockJSONURLReader({metadata_url: collection_object}),
+            validation_result_factory,
+            schema_validators={STAC_TYPE_COLLECTION: MagicMock()},
+            object_lister=object_lister,
+        )
+        validator.run(metadata_url)
+
+    # Then
+    with subtests.test(msg="Missing asset"):
+        assert (
+            call(
+                missing_asset_url,
+                Check.STAGING_ACCESS,
+                ValidationResult.FAILED,
+                details={MESSAGE_KEY: f"Asset file not found: “{missing_asset_url}”"},
+            )
+            in validation_result_factory.save.mock_calls
+        )
+    with subtests.test(msg="Sizes"):
+        assert validator.asset_sizes == {existing_asset_url: existing_asset_size}
+    with subtests.test(msg="Processing assets"):
+        assert not processing_assets_model_mock.return_value.mock_calls
+
+
+def should_leave_missing_asset_files_to_later_checks_when_listing_fails() -> None:
+    base_url = any_s3_url()
+    metadata_url = f"{base_url}/{any_safe_filename()}"
+    collection_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+    collection_object[STAC_ASSETS_KEY] = {
+        any_asset_name(): {
+            STAC_HREF_KEY: f"{base_url}/{any_safe_filename()}",
+            STAC_FILE_CHECKSUM_KEY: any_hex_multihash(),
+        }
+    }
+    error = ClientError(
+        {"Error": {"Code": any_error_code(), "Message": any_error_message()}},
+        any_operation_name(),
+    )
+
+    with patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ) as processing_assets_model_mock:
+        validator = STACDatasetValidator(
+            any_hash_key(),
+            MockJSONURLReader({metadata_url: collection_object}),
+            MockValidationResultFactory(),
+            schema_validators={STAC_TYPE_COLLECTION: MagicMock()},
+            object_lister=MagicMock(side_effect=error),
+        )
+        validator.run(metadata_url)
+
+    # Both the metadata file and the asset are saved, followed by their summary
+    saved_range_keys = [
+        mock_call.kwargs["range_key"]
+        for mock_call in processing_assets_model_mock.return_value.call_args_list
+    ]
+    assert saved_range_keys[-1] == PROCESSING_ASSETS_SUMMARY_RANGE_KEY
+    assert len(saved_range_keys) == 3
+
+
+def should_save_summary_of_processing_assets_with_total_asset_size(subtests: SubTests) -> None:
+    # Given a collection with two existing asset files
+    base_url = any_s3_url()
+    metadata_url = f"{base_url}/{any_safe_filename()}"
+    asset_sizes = {f"{base_url}/{any_safe_filename()}": size for size in [1_024, 2_048]}
+    collection_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+    collection_object[STAC_ASSETS_KEY] = {
+        any_asset_name(): {STAC_HREF_KEY: url, STAC_FILE_CHECKSUM_KEY: any_hex_multihash()}
+        for url in asset_sizes
+    }
+    hash_key = any_hash_key()
+
+    # When
+    with patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ) as processing_assets_model_mock:
+        validator = STACDatasetValidator(
+            hash_key,
+            MockJSONURLReader({metadata_url: collection_object}),
+            MockValidationResultFactory(),
+            schema_validators={STAC_TYPE_COLLECTION: MagicMock()},
+            object_lister=lambda _directory_url: iter([(metadata_url, 1), *asset_sizes.items()]),
+        )
+        validator.run(metadata_url)
+
+    # Then
+    summary_call = processing_assets_model_mock.return_value.call_args_list[-1]
+    with subtests.test(msg="Summary"):
+        assert summary_call == call(
+            hash_key=hash_key,
+            range_key=PROCESSING_ASSETS_SUMMARY_RANGE_KEY,
+            url=metadata_url,
+            size=1_024 + 2_048,
+            asset_count=2,
+            metadata_count=1,
+        )
+    with subtests.test(msg="Saved"):
+        processing_assets_model_mock.return_value.return_value.save.assert_called_once_with()
+
+
+def should_summarise_missing_asset_files_past_limit_of_check() -> None:
+    # Given a collection with three missing asset files and a limit of one failure per check
+    base_url = any_s3_url()
+    metadata_url = f"{base_url}/{any_safe_filename()}"
+    collection_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+    collection_object[STAC_ASSETS_KEY] = {
+        any_asset_name(): {
+            STAC_HREF_KEY: f"{base_url}/{any_safe_filename()}",
+            STAC_FILE_CHECKSUM_KEY: any_hex_multihash(),
+        }
+        for _ in range(3)
+    }
+    validation_result_factory = MockValidationResultFactory()
+
+    # When
+    with patch("geostore.check_stac_metadata.utils.processing_assets_model_with_meta"), patch(
+        "geostore.validation_policy.increment_failure_count", new_callable=MockFailureCounters
+    ):
+        validator = STACDatasetValidator(
+            any_hash_key(),
+            MockJSONURLReader({metadata_url: collection_object}),
+            validation_result_factory,
+            schema_validators={STAC_TYPE_COLLECTION: MagicMock()},
+            object_lister=lambda _directory_url: iter([(metadata_url, 1)]),
+            validation_policy=ValidationPolicy(max_failures_per_check=1),
+        )
+        validator.run(metadata_url)
+        save_suppressed_failures(validator.validation_result_factory)
+
+    # Then the first is saved, and the other two are saved as one with their count
+    staging_access_failures = [
+        mock_call
+        for mock_call in validation_result_factory.save.mock_calls
+        if mock_call.args[1] is Check.STAGING_ACCESS
+    ]
+    assert [
+        mock_call.kwargs["details"].get(SUPPRESSED_FAILURE_COUNT_KEY)
+        for mock_call in staging_access_failures
+    ] == [None, 2]
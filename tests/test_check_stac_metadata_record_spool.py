@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from pytest_subtests import SubTests
+
+from geostore.check_stac_metadata.record_spool import RecordSpool
+
+from .aws_utils import any_s3_url
+from .stac_generators import any_hex_multihash
+
+
+def should_iterate_records_in_order_after_spilling_to_disk() -> None:
+    records = [{"url": any_s3_url(), "multihash": any_hex_multihash()} for _ in range(100)]
+    records.append({"url": "s3://bucket/ünïcödé\\0\n\0\\", "multihash": ""})
+    on_spill = MagicMock()
+    spool = RecordSpool(["url", "multihash"], memory_budget=1_000, on_spill=on_spill)
+
+    spool.extend(records)
+
+    # Reading in small chunks splits records between chunks
+    with patch("geostore.check_stac_metadata.record_spool.READ_CHUNK_SIZE", 7):
+        assert list(spool) == records
+    assert len(spool) == len(records)
+    assert spool.spilled_size > 0
+    assert sum(args[0] for args, _ in on_spill.call_args_list) == spool.spilled_size
+
+
+def should_iterate_spilled_records_from_several_threads() -> None:
+    records = [{"url": any_s3_url()} for _ in range(1_000)]
+    spool = RecordSpool(["url"], memory_budget=1_000)
+    spool.extend(records)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        iterations = list(executor.map(lambda _: list(spool), range(8)))
+
+    assert iterations == [records] * 8
+
+
+def should_delete_spill_file_when_leaving_context(subtests: SubTests) -> None:
+    with RecordSpool(["url"], memory_budget=1_000) as spool:
+        spool.extend({"url": any_s3_url()} for _ in range(100))
+        spill_file = spool.spill_file
+
+    with subtests.test(msg="Deleted"):
+        assert spill_file is not None and spill_file.closed
+    with subtests.test(msg="Empty"):
+        assert not list(spool)
+        assert not spool
@@ -0,0 +1,233 @@
+from copy import deepcopy
+from os import listdir
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+from unittest.mock import patch
+
+from jsonschema import Draft7Validator, RefResolver, ValidationError
+from pytest import raises
+from pytest_subtests import SubTests
+
+from geostore.check_stac_metadata.schema_compiler import (
+    CompiledSchemaValidator,
+    SchemaCompiler,
+    UnsupportedSchemaError,
+    get_cache_key,
+)
+from geostore.check_stac_metadata.stac_validators import (
+    STAC_TYPE_VALIDATION_MAP,
+    STACCollectionSchemaValidator,
+)
+from geostore.check_stac_metadata.utils import CompiledSTACTypeValidationMap
+from geostore.stac_format import (
+    STAC_EXTENT_KEY,
+    STAC_EXTENT_TEMPORAL_INTERVAL_KEY,
+    STAC_EXTENT_TEMPORAL_KEY,
+    STAC_GEOMETRY_KEY,
+    STAC_LINKS_KEY,
+    STAC_PROPERTIES_DATETIME_KEY,
+    STAC_PROPERTIES_KEY,
+    STAC_TYPE_COLLECTION,
+    STAC_TYPE_KEY,
+    STAC_VERSION_KEY,
+)
+from geostore.types import JsonObject
+
+from .stac_objects import (
+    MINIMAL_VALID_STAC_CATALOG_OBJECT,
+    MINIMAL_VALID_STAC_COLLECTION_OBJECT,
+    MINIMAL_VALID_STAC_ITEM_OBJECT,
+)
+
+REFERENCED_SCHEMA_URL = "https://example.com/definitions.json"
+SCHEMA = {
+    "$id": "https://example.com/schema.json",
+    "type": "object",
+    "required": ["name"],
+    "properties": {
+        "name": {"type": "string", "pattern": "^[a-z]+$", "maxLength": 5},
+        "count": {"type": "integer", "minimum": 0, "multipleOf": 0.5},
+        "kind": {"enum": [1, True, "other"]},
+        "tags": {
+            "type": "array",
+            "items": {"$ref": "definitions.json#/definitions/tag"},
+            "uniqueItems": True,
+            "contains": {"const": "required"},
+        },
+        "child": {"$ref": "#"},
+    },
+    "patternProperties": {"^x-": {}},
+    "additionalProperties": False,
+    "dependencies": {"count": ["kind"]},
+    "if": {"properties": {"count": {"const": 1}}},
+    "then": {"required": ["tags"]},
+    "else": {"not": {"required": ["tags"]}},
+}
+REFERENCED_SCHEMA = {"definitions": {"tag": {"type": "string", "minLength": 3}}}
+INSTANCES = [
+    {},
+    {"name": "ab"},
+    {"name": "AB"},
+    {"name": "abcdef"},
+    {"name": 1},
+    {"name": "ab", "x-extra": None},
+    {"name": "ab", "extra": None},
+    {"name": "ab", "count": 1, "kind": 1, "tags": ["required"]},
+    {"name": "ab", "count": 1.0, "kind": True, "tags": ["required", "other"]},
+    {"name": "ab", "count": 1, "kind": 1},
+    {"name": "ab", "count": 1, "kind": 1, "tags": ["required", "required"]},
+    {"name": "ab", "count": 1, "kind": 1, "tags": ["other"]},
+    {"name": "ab", "count": 1, "kind": 1, "tags": ["required", "ab"]},
+    {"name": "ab", "count": 1.5, "kind": "other"},
+    {"name": "ab", "count": 1.25, "kind": "other"},
+    {"name": "ab", "count": -2, "kind": "other"},
+    {"name": "ab", "count": True, "kind": "other"},
+    {"name": "ab", "count": 2},
+    {"name": "ab", "kind": False},
+    {"name": "ab", "kind": 1.0},
+    {"name": "ab", "tags": ["required"]},
+    {"name": "ab", "child": {"name": "cd"}},
+    {"name": "ab", "child": {"name": "cd", "child": {}}},
+    [],
+    "ab",
+]
+
+
+def get_stac_objects() -> List[JsonObject]:
+    """The minimal valid STAC objects, and invalid variants of them."""
+    minimal_objects = [
+        MINIMAL_VALID_STAC_CATALOG_OBJECT,
+        MINIMAL_VALID_STAC_COLLECTION_OBJECT,
+        MINIMAL_VALID_STAC_ITEM_OBJECT,
+    ]
+    stac_objects = [deepcopy(stac_object) for stac_object in minimal_objects]
+    for minimal_object in minimal_objects:
+        for key in minimal_object:
+            if key != STAC_TYPE_KEY:
+                stac_objects.append(deepcopy(minimal_object))
+                stac_objects[-1].pop(key)
+
+        stac_objects.append({**deepcopy(minimal_object), STAC_VERSION_KEY: 1})
+        stac_objects.append({**deepcopy(minimal_object), STAC_LINKS_KEY: [{"rel": "child"}]})
+
+    collection_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+    collection_object[STAC_EXTENT_KEY][STAC_EXTENT_TEMPORAL_KEY][STAC_EXTENT_TEMPORAL_INTERVAL_KEY][
+        0
+    ][0] = "not a datetime"
+    item_object = deepcopy(MINIMAL_VALID_STAC_ITEM_OBJECT)
+    item_object[STAC_PROPERTIES_KEY][STAC_PROPERTIES_DATETIME_KEY] = "not a datetime"
+    geometry_item_object = deepcopy(MINIMAL_VALID_STAC_ITEM_OBJECT)
+    geometry_item_object[STAC_GEOMETRY_KEY] = {"type": "Point", "coordinates": []}
+    return [*stac_objects, collection_object, item_object, geometry_item_object]
+
+
+def get_validation_error(
+    validator: Any, instance: Any
+) -> Optional[Tuple[List[Any], List[Any], str]]:
+    try:
+        validator.validate(instance)
+    except ValidationError as error:
+        return list(error.path), list(error.schema_path), error.message
+    return None
+
+
+def get_validator() -> Draft7Validator:
+    resolver = RefResolver.from_schema(SCHEMA, store={REFERENCED_SCHEMA_URL: REFERENCED_SCHEMA})
+    return Draft7Validator(SCHEMA, resolver=resolver)
+
+
+def should_accept_the_same_instances_as_jsonschema(tmp_path: Path) -> None:
+    validator = get_validator()
+    compiled_validator = CompiledSchemaValidator(validator, str(tmp_path))
+
+    for instance in INSTANCES:
+        assert compiled_validator.is_valid(instance) == validator.is_valid(instance), instance
+
+
+def should_validate_stac_objects_like_jsonschema(subtests: SubTests, tmp_path: Path) -> None:
+    for index, stac_object in enumerate(get_stac_objects()):
+        validator = STAC_TYPE_VALIDATION_MAP[stac_object[STAC_TYPE_KEY]]
+        compiled_validator = CompiledSchemaValidator(validator, str(tmp_path))
+
+        with subtests.test(msg=f"{stac_object[STAC_TYPE_KEY]} {index}"):
+            assert compiled_validator.is_valid(stac_object) == validator.is_valid(stac_object)
+            assert get_validation_error(compiled_validator, stac_object) == get_validation_error(
+                validator, stac_object
+            )
+
+
+def should_raise_the_jsonschema_error_for_invalid_instances(tmp_path: Path) -> None:
+    validator = get_validator()
+    compiled_validator = CompiledSchemaValidator(validator, str(tmp_path))
+    instance = {"name": "ab", "count": -2, "kind": "other"}
+
+    with raises(ValidationError) as expected_error:
+        validator.validate(instance)
+    with raises(ValidationError) as actual_error:
+        compiled_validator.validate(instance)
+
+    assert str(actual_error.value) == str(expected_error.value)
+
+
+def should_reuse_cached_compiled_schema(tmp_path: Path) -> None:
+    CompiledSchemaValidator(get_validator(), str(tmp_path))
+    cached_files = listdir(tmp_path)
+
+    with patch.object(SchemaCompiler, "compile") as compile_mock:
+        compiled_validator = CompiledSchemaValidator(get_validator(), str(tmp_path))
+
+    compile_mock.assert_not_called()
+    assert compiled_validator.is_valid({"name": "ab", "tags": ["required"]})
+    assert listdir(tmp_path) == cached_files
+
+
+def should_refuse_to_compile_unknown_types(tmp_path: Path) -> None:
+    with raises(UnsupportedSchemaError):
+        CompiledSchemaValidator(Draft7Validator({"type": "unknown"}), str(tmp_path))
+
+
+def should_import_packaged_compiled_schema(tmp_path: Path) -> None:
+    packaged_module_path = tmp_path / "packaged_schema.py"
+    packaged_module_path.write_text(SchemaCompiler(get_validator()).compile())
+    cache_directory = tmp_path / "cache"
+
+    with patch.object(SchemaCompiler, "compile") as compile_mock:
+        compiled_validator = CompiledSchemaValidator(
+            get_validator(), str(cache_directory), str(packaged_module_path)
+        )
+
+    compile_mock.assert_not_called()
+    assert compiled_validator.is_valid({"name": "ab", "tags": ["required"]})
+    assert not compiled_validator.is_valid({"name": "AB"})
+    assert not cache_directory.exists()
+
+
+def should_compile_into_cache_directory_without_packaged_compiled_schema(tmp_path: Path) -> None:
+    compiled_validator = CompiledSchemaValidator(
+        get_validator(), str(tmp_path), str(tmp_path / "missing" / "packaged_schema.py")
+    )
+
+    assert compiled_validator.is_valid({"name": "ab", "tags": ["required"]})
+    assert [name for name in listdir(tmp_path) if name.endswith(".py")] == [
+        f"schema_{get_cache_key(get_validator())}.py"
+    ]
+
+
+def should_compile_schemas_only_when_first_used(tmp_path: Path) -> None:
+    packaged_module_path = str(tmp_path / "packaged_schema.py")
+    with patch(
+        "geostore.check_stac_metadata.utils.CompiledSchemaValidator"
+    ) as compiled_schema_validator_mock, patch(
+        "geostore.check_stac_metadata.utils.get_packaged_compiled_schema_path",
+        return_value=packaged_module_path,
+    ):
+        schema_validators = CompiledSTACTypeValidationMap(str(tmp_path))
+        assert STAC_TYPE_COLLECTION in schema_validators
+        compiled_schema_validator_mock.assert_not_called()
+
+        schema_validators[STAC_TYPE_COLLECTION].validate(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+        schema_validators[STAC_TYPE_COLLECTION].validate(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+
+    compiled_schema_validator_mock.assert_called_once_with(
+        STACCollectionSchemaValidator, str(tmp_path), packaged_module_path
+    )
@@ -0,0 +1,128 @@
+from typing import Any, Dict
+from unittest.mock import MagicMock, call, patch
+
+from jsonschema import Draft7Validator, ValidationError
+from pytest_subtests import SubTests
+
+from geostore.api_keys import MESSAGE_KEY
+from geostore.check import Check
+from geostore.check_stac_metadata.schema_validation_pool import (
+    SchemaValidationPool,
+    SchemaValidationResult,
+)
+from geostore.check_stac_metadata.utils import STACDatasetValidator
+from geostore.check_stac_metadata.validation_metrics import get_schema_validation_phase
+from geostore.stac_format import STAC_ID_KEY, STAC_TYPE_CATALOG, STAC_TYPE_KEY
+from geostore.validation_results_model import ValidationResult
+
+from .aws_utils import MockJSONURLReader, MockValidationResultFactory, any_s3_url
+from .dynamodb_generators import any_hash_key
+from .general_generators import any_error_message
+from .stac_objects import MINIMAL_VALID_STAC_CATALOG_OBJECT
+
+CATALOG_SCHEMA = {"type": "object", "required": [STAC_ID_KEY]}
+WORKER_ERROR_MESSAGE = "Schema validators unavailable"
+
+
+def get_catalog_schema_validators() -> Dict[str, Any]:
+    return {STAC_TYPE_CATALOG: Draft7Validator(CATALOG_SCHEMA)}
+
+
+def get_unavailable_schema_validators() -> Dict[str, Any]:
+    raise RuntimeError(WORKER_ERROR_MESSAGE)
+
+
+def should_validate_objects_in_worker_processes(subtests: SubTests) -> None:
+    invalid_catalog = {STAC_TYPE_KEY: STAC_TYPE_CATALOG}
+    try:
+        Draft7Validator(CATALOG_SCHEMA).validate(invalid_catalog)
+    except ValidationError as error:
+        expected_error_message = str(error)
+
+    with SchemaValidationPool(2, get_catalog_schema_validators) as pool:
+        valid_result = pool.validate(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+        invalid_result = pool.validate(invalid_catalog)
+
+    with subtests.test(msg="Valid"):
+        assert valid_result.error_message is None
+    with subtests.test(msg="Invalid"):
+        assert invalid_result.error_message == expected_error_message
+
+
+def should_send_back_worker_errors() -> None:
+    with SchemaValidationPool(1, get_unavailable_schema_validators) as pool:
+        result = pool.validate(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+
+    assert result == SchemaValidationResult(None, 0.0, repr(RuntimeError(WORKER_ERROR_MESSAGE)))
+
+
+def should_replace_dead_worker(subtests: SubTests) -> None:
+    with SchemaValidationPool(1, get_catalog_schema_validators) as pool:
+        [process] = pool.processes.values()
+        process.kill()
+        process.join()
+
+        dead_worker_result = pool.validate(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+        replacement_worker_result = pool.validate(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+
+    with subtests.test(msg="Dead worker"):
+        assert dead_worker_result.worker_error is not None
+    with subtests.test(msg="Replacement worker"):
+        assert replacement_worker_result.worker_error is None
+        assert replacement_worker_result.error_message is None
+
+
+def should_validate_on_calling_thread_when_pool_fails() -> None:
+    metadata_url = any_s3_url()
+    pool = MagicMock()
+    pool.validate.return_value = SchemaValidationResult(None, 0.0, any_error_message())
+    schema_validator = MagicMock()
+
+    with patch("geostore.check_stac_metadata.utils.processing_assets_model_with_meta"):
+        STACDatasetValidator(
+            any_hash_key(),
+            MockJSONURLReader({metadata_url: MINIMAL_VALID_STAC_CATALOG_OBJECT}),
+            MockValidationResultFactory(),
+            schema_validators={STAC_TYPE_CATALOG: schema_validator},
+            schema_validation_pool=pool,
+        ).run(metadata_url)
+
+    schema_validator.validate.assert_called_once_with(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+
+
+def should_report_schema_validation_done_by_pool(subtests: SubTests) -> None:
+    # Given
+    metadata_url = any_s3_url()
+    error_message = any_error_message()
+    pool = MagicMock()
+    pool.validate.return_value = SchemaValidationResult(error_message, 0.5)
+    schema_validator = MagicMock()
+    validation_result_factory = MockValidationResultFactory()
+
+    # When
+    with patch("geostore.check_stac_metadata.utils.processing_assets_model_with_meta"):
+        validator = STACDatasetValidator(
+            any_hash_key(),
+            MockJSONURLReader({metadata_url: MINIMAL_VALID_STAC_CATALOG_OBJECT}),
+            validation_result_factory,
+            schema_validators={STAC_TYPE_CATALOG: schema_validator},
+            schema_validation_pool=pool,
+        )
+        validator.run(metadata_url)
+
+    # Then
+    with subtests.test(msg="Validated by pool"):
+        pool.validate.assert_called_once_with(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+        schema_validator.validate.assert_not_called()
+    with subtests.test(msg="Saved"):
+        assert validation_result_factory.save.mock_calls == [
+            call(
+                metadata_url,
+                Check.JSON_SCHEMA,
+                ValidationResult.FAILED,
+                details={MESSAGE_KEY: error_message},
+            )
+        ]
+    with subtests.test(msg="Metrics"):
+        phase = get_schema_validation_phase(STAC_TYPE_CATALOG)
+        assert validator.metrics.phase_seconds[phase] == 0.5
@@ -0,0 +1,201 @@
+from copy import deepcopy
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+from unittest.mock import call, patch
+
+from pytest_subtests import SubTests
+
+from geostore.check_stac_metadata.utils import (
+    METADATA_SHARD_SEED_TYPE,
+    STACDatasetValidator,
+    get_metadata_shard_range_key_prefix,
+)
+from geostore.models import DB_KEY_SEPARATOR
+from geostore.processing_assets_model import ProcessingAssetType
+from geostore.stac_format import STAC_HREF_KEY, STAC_LINKS_KEY
+
+from .aws_utils import (
+    MockJSONURLReader,
+    MockValidationResultFactory,
+    any_s3_url,
+    get_saved_processing_asset_values,
+)
+from .dynamodb_generators import any_hash_key
+from .general_generators import any_safe_filename
+from .stac_generators import any_hex_multihash
+from .stac_objects import MINIMAL_VALID_STAC_CATALOG_OBJECT
+
+DATA = ProcessingAssetType.DATA.value
+METADATA = ProcessingAssetType.METADATA.value
+
+
+def get_shard_range_key(shard: int, item_type: str, index: int) -> str:
+    return f"{get_metadata_shard_range_key_prefix(shard)}{item_type}{DB_KEY_SEPARATOR}{index}"
+
+
+def should_split_the_files_left_after_the_root_pass_into_shards() -> None:
+    # Given a catalog linking to more catalogs than the sharding threshold
+    base_url = any_s3_url()
+    root_url = f"{base_url}/{any_safe_filename()}"
+    child_urls = [f"{base_url}/{any_safe_filename()}" for _ in range(3)]
+    root_object = deepcopy(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+    root_object[STAC_LINKS_KEY] = [{STAC_HREF_KEY: url, "rel": "child"} for url in child_urls]
+    url_reader = MockJSONURLReader({root_url: root_object})
+
+    # When
+    with patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ) as processing_assets_model_mock, patch(
+        "geostore.check_stac_metadata.utils.SHARDED_VALIDATION_MIN_URL_COUNT", 3
+    ), patch(
+        "geostore.check_stac_metadata.utils.MAX_METADATA_SHARD_COUNT", 2
+    ):
+        validator = STACDatasetValidator(any_hash_key(), url_reader, MockValidationResultFactory())
+        shards = validator.run_root_pass(root_url)
+
+    # Then only the root is validated, and the children are left to two shards
+    assert shards == [1, 2]
+    assert url_reader.mock_calls == [call(root_url)]
+    assert get_saved_processing_asset_values(processing_assets_model_mock) == [
+        (get_shard_range_key(0, METADATA, 0), root_url, None),
+        (get_shard_range_key(1, METADATA_SHARD_SEED_TYPE, 0), child_urls[0], None),
+        (get_shard_range_key(2, METADATA_SHARD_SEED_TYPE, 0), child_urls[1], None),
+        (get_shard_range_key(2, METADATA_SHARD_SEED_TYPE, 1), child_urls[2], None),
+    ]
+
+
+def should_skip_files_validated_by_the_root_pass_when_validating_a_shard() -> None:
+    # Given a shard starting from a catalog linking back to the root
+    base_url = any_s3_url()
+    root_url = f"{base_url}/{any_safe_filename()}"
+    child_url = f"{base_url}/{any_safe_filename()}"
+    child_object = deepcopy(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+    child_object[STAC_LINKS_KEY] = [{STAC_HREF_KEY: root_url, "rel": "root"}]
+    url_reader = MockJSONURLReader({child_url: child_object})
+    shard_items = {
+        (0, METADATA): [SimpleNamespace(url=root_url)],
+        (1, METADATA_SHARD_SEED_TYPE): [SimpleNamespace(url=child_url)],
+    }
+
+    # When
+    with patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ) as processing_assets_model_mock, patch(
+        "geostore.check_stac_metadata.utils.STACDatasetValidator.query_metadata_shard",
+        side_effect=lambda shard, item_type: shard_items[(shard, item_type)],
+    ):
+        validator = STACDatasetValidator(any_hash_key(), url_reader, MockValidationResultFactory())
+        validator.run_shard(1)
+
+    # Then
+    assert url_reader.mock_calls == [call(child_url)]
+    assert get_saved_processing_asset_values(processing_assets_model_mock) == [
+        (get_shard_range_key(1, METADATA, 0), child_url, None)
+    ]
+
+
+def should_merge_shards_into_contiguous_processing_assets(subtests: SubTests) -> None:
+    # Given two shards which both validated a shared catalog
+    base_url = any_s3_url()
+    root_url = f"{base_url}/{any_safe_filename()}"
+    shared_url = f"{base_url}/{any_safe_filename()}"
+    first_asset = SimpleNamespace(
+        url=f"{base_url}/{any_safe_filename()}", multihash=any_hex_multihash()
+    )
+    second_asset = SimpleNamespace(
+        url=f"{base_url}/{any_safe_filename()}", multihash=any_hex_multihash()
+    )
+    shard_items: Dict[Tuple[int, str], List[SimpleNamespace]] = {
+        (0, METADATA): [SimpleNamespace(url=root_url)],
+        (0, DATA): [],
+        (1, METADATA): [SimpleNamespace(url=shared_url)],
+        (1, DATA): [first_asset],
+        (2, METADATA): [SimpleNamespace(url=shared_url)],
+        (2, DATA): [second_asset],
+    }
+    validation_result_factory = MockValidationResultFactory()
+
+    # When
+    with patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ) as processing_assets_model_mock, patch(
+        "geostore.check_stac_metadata.utils.STACDatasetValidator.query_metadata_shard",
+        side_effect=lambda shard, item_type: shard_items[(shard, item_type)],
+    ):
+        validator = STACDatasetValidator(
+            any_hash_key(), MockJSONURLReader({}), validation_result_factory
+        )
+        validator.run_merge(root_url, [1, 2])
+
+    # Then
+    with subtests.test(msg="Processing assets"):
+        assert get_saved_processing_asset_values(processing_assets_model_mock) == [
+            (f"{DATA}{DB_KEY_SEPARATOR}0", first_asset.url, first_asset.multihash),
+            (f"{DATA}{DB_KEY_SEPARATOR}1", second_asset.url, second_asset.multihash),
+            (f"{METADATA}{DB_KEY_SEPARATOR}0", root_url, None),
+            (f"{METADATA}{DB_KEY_SEPARATOR}1", shared_url, None),
+        ]
+    with subtests.test(msg="Released"):
+        assert not validator.dataset_assets
+    with subtests.test(msg="Validation results"):
+        assert not validation_result_factory.save.mock_calls
+
+
+def should_merge_assets_of_item_validated_by_several_shards_once() -> None:
+    # Given two subtrees linking the same item
+    base_url = any_s3_url()
+    root_url = f"{base_url}/{any_safe_filename()}"
+    item_url = f"{base_url}/{any_safe_filename()}"
+    asset = SimpleNamespace(url=f"{base_url}/{any_safe_filename()}", multihash=any_hex_multihash())
+    shard_items: Dict[Tuple[int, str], List[SimpleNamespace]] = {
+        (0, METADATA): [SimpleNamespace(url=root_url)],
+        (0, DATA): [],
+        (1, METADATA): [SimpleNamespace(url=item_url)],
+        (1, DATA): [asset],
+        (2, METADATA): [SimpleNamespace(url=item_url)],
+        (2, DATA): [asset],
+    }
+
+    # When
+    with patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ) as processing_assets_model_mock, patch(
+        "geostore.check_stac_metadata.utils.STACDatasetValidator.query_metadata_shard",
+        side_effect=lambda shard, item_type: shard_items[(shard, item_type)],
+    ):
+        validator = STACDatasetValidator(
+            any_hash_key(), MockJSONURLReader({}), MockValidationResultFactory()
+        )
+        validator.run_merge(root_url, [1, 2])
+
+    # Then
+    assert [
+        values
+        for values in get_saved_processing_asset_values(processing_assets_model_mock)
+        if values[0].startswith(DATA)
+    ] == [(f"{DATA}{DB_KEY_SEPARATOR}0", asset.url, asset.multihash)]
+
+
+def should_not_save_dataset_when_validating_a_shard_failed() -> None:
+    # Given a shard which saved nothing
+    root_url = any_s3_url()
+    shard_items: Dict[Tuple[int, str], List[SimpleNamespace]] = {
+        (0, METADATA): [SimpleNamespace(url=root_url)],
+        (0, DATA): [SimpleNamespace(url=any_s3_url(), multihash=any_hex_multihash())],
+        (1, METADATA): [],
+    }
+
+    # When
+    with patch("geostore.check_stac_metadata.utils.processing_assets_model_with_meta"), patch(
+        "geostore.check_stac_metadata.utils.STACDatasetValidator.query_metadata_shard",
+        side_effect=lambda shard, item_type: shard_items[(shard, item_type)],
+    ), patch(
+        "geostore.check_stac_metadata.utils.STACDatasetValidator.save_validated_dataset"
+    ) as save_validated_dataset_mock:
+        validator = STACDatasetValidator(
+            any_hash_key(), MockJSONURLReader({}), MockValidationResultFactory()
+        )
+        validator.run_merge(root_url, [1])
+
+    # Then
+    save_validated_dataset_mock.assert_not_called()
@@ -0,0 +1,91 @@
+from json import dump
+from pathlib import Path
+from unittest.mock import patch
+
+from jsonschema import Draft7Validator, ValidationError
+from pytest import raises
+
+from geostore.check_stac_metadata.schema_compiler import CompiledSchemaValidator, SchemaCompiler
+from geostore.check_stac_metadata.stac_validators import (
+    LazySTACSchemaValidator,
+    Schema,
+    get_packaged_compiled_schema_path,
+    get_schemas_digest,
+    get_serialised_schemas,
+    write_compiled_schemas,
+)
+from geostore.stac_format import STAC_TYPE_CATALOG
+
+from .general_generators import any_safe_filename
+from .stac_generators import any_hex_multihash
+
+
+def should_read_schemas_from_serialised_artefact(tmp_path: Path) -> None:
+    schema_path = f"{any_safe_filename()}.json"
+    schema = {"$id": f"https://example.com/{schema_path}", "type": "string"}
+    serialised_schemas_path = tmp_path / "schemas.json"
+    with serialised_schemas_path.open("w") as file_pointer:
+        dump({schema_path: schema}, file_pointer)
+
+    get_serialised_schemas.cache_clear()
+    try:
+        with patch(
+            "geostore.check_stac_metadata.stac_validators.SERIALISED_SCHEMAS_PATH",
+            str(serialised_schemas_path),
+        ), patch("geostore.check_stac_metadata.stac_validators.get_schema_store", return_value={}):
+            validator = LazySTACSchemaValidator(Schema(schema_path))
+
+            with raises(ValidationError):
+                validator.validate(1)
+    finally:
+        get_serialised_schemas.cache_clear()
+
+
+def should_not_load_schema_until_validator_is_used() -> None:
+    validator = LazySTACSchemaValidator(Schema(f"{any_safe_filename()}.json"))
+
+    with raises(FileNotFoundError):
+        validator.validate(1)
+
+
+def should_read_schemas_digest_from_artefact(tmp_path: Path) -> None:
+    digest = any_hex_multihash()
+    schemas_digest_path = tmp_path / "schemas.sha256"
+    schemas_digest_path.write_text(digest)
+
+    get_schemas_digest.cache_clear()
+    try:
+        with patch(
+            "geostore.check_stac_metadata.stac_validators.SCHEMAS_DIGEST_PATH",
+            str(schemas_digest_path),
+        ), patch("geostore.check_stac_metadata.stac_validators.Schema.read_file") as read_file_mock:
+            assert get_schemas_digest() == digest
+
+        read_file_mock.assert_not_called()
+    finally:
+        get_schemas_digest.cache_clear()
+
+
+def should_import_compiled_schemas_written_when_bundling(tmp_path: Path) -> None:
+    validator = Draft7Validator({"type": "string"})
+
+    with patch(
+        "geostore.check_stac_metadata.stac_validators.COMPILED_SCHEMAS_DIRECTORY", str(tmp_path)
+    ), patch(
+        "geostore.check_stac_metadata.stac_validators.STAC_TYPE_VALIDATION_MAP",
+        {STAC_TYPE_CATALOG: validator},
+    ), patch(
+        "geostore.check_stac_metadata.stac_validators.get_schemas_digest",
+        return_value=any_hex_multihash(),
+    ):
+        write_compiled_schemas()
+        packaged_module_path = get_packaged_compiled_schema_path(STAC_TYPE_CATALOG)
+
+    with patch.object(SchemaCompiler, "compile") as compile_mock:
+        compiled_validator = CompiledSchemaValidator(
+            validator, str(tmp_path / "cache"), packaged_module_path
+        )
+
+    compile_mock.assert_not_called()
+    assert compiled_validator.is_valid(any_safe_filename())
+    assert not compiled_validator.is_valid(1)
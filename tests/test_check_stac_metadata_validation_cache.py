@@ -0,0 +1,158 @@
+from copy import deepcopy
+from io import StringIO
+from json import dumps
+from unittest.mock import MagicMock, call, patch
+
+from pytest_subtests import SubTests
+
+from geostore.check import Check
+from geostore.check_stac_metadata.task import s3_object_reader_for
+from geostore.check_stac_metadata.utils import (
+    PROCESSING_ASSET_MULTIHASH_KEY,
+    PROCESSING_ASSET_URL_KEY,
+    MetadataObject,
+    STACDatasetValidator,
+    ValidatedMetadata,
+)
+from geostore.metadata_validation_cache_model import get_metadata_validation_cache_range_key
+from geostore.models import DB_KEY_SEPARATOR
+from geostore.processing_assets_model import ProcessingAssetType
+from geostore.stac_format import STAC_HREF_KEY, STAC_LINKS_KEY, STAC_TYPE_KEY
+from geostore.validation_results_model import ValidationResult
+
+from .aws_utils import (
+    MockJSONURLReader,
+    MockValidationResultFactory,
+    any_s3_url,
+    any_s3_version_id,
+    get_saved_processing_asset_values,
+)
+from .dynamodb_generators import any_hash_key
+from .general_generators import any_etag, any_safe_filename
+from .stac_generators import any_hex_multihash
+from .stac_objects import MINIMAL_VALID_STAC_CATALOG_OBJECT, MINIMAL_VALID_STAC_COLLECTION_OBJECT
+
+
+def should_reuse_validation_results_of_unchanged_metadata_files(subtests: SubTests) -> None:
+    # Given a changed collection linking to an unchanged item
+    base_url = any_s3_url()
+    collection_url = f"{base_url}/{any_safe_filename()}"
+    item_url = f"{base_url}/{any_safe_filename()}"
+    collection_object = deepcopy(MINIMAL_VALID_STAC_COLLECTION_OBJECT)
+    collection_object[STAC_LINKS_KEY] = [{STAC_HREF_KEY: item_url, "rel": "item"}]
+    item_asset = {
+        PROCESSING_ASSET_URL_KEY: f"{base_url}/{any_safe_filename()}",
+        PROCESSING_ASSET_MULTIHASH_KEY: any_hex_multihash(),
+    }
+    collection_cache_range_key = any_etag()
+    cached_validation_results = {
+        collection_url: (collection_cache_range_key, None),
+        item_url: (any_etag(), ValidatedMetadata([collection_url], [item_asset])),
+    }
+    url_reader = MockJSONURLReader({collection_url: collection_object, item_url: {}})
+    item_body = MagicMock()
+    metadata_objects = {
+        collection_url: MetadataObject(url_reader(collection_url), any_etag(), None),
+        item_url: MetadataObject(item_body, any_etag(), any_s3_version_id()),
+    }
+    metadata_validation_cache_mock = MagicMock()
+    metadata_validation_cache_mock.object_reader.side_effect = metadata_objects.get
+    metadata_validation_cache_mock.get.side_effect = (
+        lambda url, _etag, _version_id: cached_validation_results[url]
+    )
+    validation_result_factory = MockValidationResultFactory()
+
+    # When
+    with patch(
+        "geostore.check_stac_metadata.utils.processing_assets_model_with_meta"
+    ) as processing_assets_model_mock:
+        validator = STACDatasetValidator(
+            any_hash_key(),
+            url_reader,
+            validation_result_factory,
+            metadata_validation_cache=metadata_validation_cache_mock,
+        )
+        validator.run(collection_url)
+
+    # Then only the changed collection is parsed, and its result cached
+    with subtests.test(msg="Reads"):
+        assert metadata_validation_cache_mock.object_reader.mock_calls == [
+            call(collection_url),
+            call(item_url),
+        ]
+    with subtests.test(msg="Cache lookups by object identity"):
+        assert metadata_validation_cache_mock.get.mock_calls == [
+            call(collection_url, *metadata_objects[collection_url][1:]),
+            call(item_url, *metadata_objects[item_url][1:]),
+        ]
+    with subtests.test(msg="Unchanged item not parsed"):
+        assert item_body.mock_calls == [call.close()]
+    with subtests.test(msg="Validation results"):
+        assert validation_result_factory.save.mock_calls == [
+            call(collection_url, Check.JSON_SCHEMA, ValidationResult.PASSED),
+            call(item_url, Check.JSON_SCHEMA, ValidationResult.PASSED),
+        ]
+    with subtests.test(msg="Processing assets"):
+        assert get_saved_processing_asset_values(processing_assets_model_mock) == [
+            (
+                f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}0",
+                item_asset[PROCESSING_ASSET_URL_KEY],
+                item_asset[PROCESSING_ASSET_MULTIHASH_KEY],
+            ),
+            (f"{ProcessingAssetType.METADATA.value}{DB_KEY_SEPARATOR}0", collection_url, None),
+            (f"{ProcessingAssetType.METADATA.value}{DB_KEY_SEPARATOR}1", item_url, None),
+        ]
+    with subtests.test(msg="Cached"):
+        metadata_validation_cache_mock.save.assert_called_once_with(
+            [(collection_url, collection_cache_range_key, ValidatedMetadata([item_url], []))]
+        )
+
+
+def should_not_cache_validation_results_of_metadata_files_with_duplicate_keys() -> None:
+    metadata_url = any_s3_url()
+    stac_type = dumps(MINIMAL_VALID_STAC_CATALOG_OBJECT[STAC_TYPE_KEY])
+    duplicate_key_json = (
+        f'{dumps(MINIMAL_VALID_STAC_CATALOG_OBJECT)[:-1]}, "{STAC_TYPE_KEY}": {stac_type}}}'
+    )
+    url_reader = MockJSONURLReader({metadata_url: StringIO(initial_value=duplicate_key_json)})
+    metadata_validation_cache_mock = MagicMock()
+    metadata_validation_cache_mock.object_reader.return_value = MetadataObject(
+        url_reader(metadata_url), any_etag(), None
+    )
+    metadata_validation_cache_mock.get.return_value = (any_etag(), None)
+
+    with patch("geostore.check_stac_metadata.utils.processing_assets_model_with_meta"):
+        validator = STACDatasetValidator(
+            any_hash_key(),
+            url_reader,
+            MockValidationResultFactory(),
+            metadata_validation_cache=metadata_validation_cache_mock,
+        )
+        validator.run(metadata_url)
+
+    metadata_validation_cache_mock.save.assert_called_once_with([])
+
+
+def should_include_source_object_identity_and_schemas_in_cache_key() -> None:
+    etag = any_etag()
+    schema_set_version = any_hex_multihash()
+
+    unversioned_key = get_metadata_validation_cache_range_key(etag, None, schema_set_version)
+    versioned_key = get_metadata_validation_cache_range_key(etag, "1", schema_set_version)
+    other_schemas_key = get_metadata_validation_cache_range_key(etag, "1", any_hex_multihash())
+
+    assert len({unversioned_key, versioned_key, other_schemas_key}) == 3
+    assert etag in unversioned_key
+
+
+def should_identify_metadata_file_by_the_response_to_reading_it() -> None:
+    body = MagicMock()
+    etag = any_etag()
+    version_id = any_s3_version_id()
+    s3_client = MagicMock()
+    s3_client.get_object.return_value = {"Body": body, "ETag": etag, "VersionId": version_id}
+
+    metadata_object = s3_object_reader_for(s3_client)(any_s3_url())
+
+    assert metadata_object == MetadataObject(body, etag, version_id)
+    s3_client.head_object.assert_not_called()
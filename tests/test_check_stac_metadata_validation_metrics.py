@@ -0,0 +1,85 @@
+from json import dumps
+from unittest.mock import MagicMock, patch
+
+from pytest_subtests import SubTests
+
+from geostore.check_stac_metadata.utils import LOG_MESSAGE_SLOW_METADATA_FILE, STACDatasetValidator
+from geostore.check_stac_metadata.validation_metrics import (
+    BYTES_READ_COUNTER,
+    FETCH_PHASE,
+    METRICS_NAMESPACE,
+    PARSE_PHASE,
+    PEAK_MEMORY_METRIC,
+    VALIDATION_RESULTS_WRITE_PHASE,
+    ValidationMetrics,
+    get_schema_validation_phase,
+)
+from geostore.stac_format import STAC_TYPE_CATALOG
+
+from .aws_utils import MockJSONURLReader, MockValidationResultFactory, any_s3_url
+from .dynamodb_generators import any_hash_key
+from .stac_objects import MINIMAL_VALID_STAC_CATALOG_OBJECT
+
+
+def should_report_metrics_in_embedded_metric_format() -> None:
+    metrics = ValidationMetrics()
+    metrics.add_phase(FETCH_PHASE, 0.25)
+    metrics.add_phase(FETCH_PHASE, 0.5)
+    metrics.increment(BYTES_READ_COUNTER, 1_024)
+
+    document = metrics.as_embedded_metric_format()
+
+    assert document["_aws"]["CloudWatchMetrics"] == [
+        {
+            "Namespace": METRICS_NAMESPACE,
+            "Dimensions": [[]],
+            "Metrics": [
+                {"Name": f"{FETCH_PHASE}Time", "Unit": "Milliseconds"},
+                {"Name": f"{FETCH_PHASE}Count", "Unit": "Count"},
+                {"Name": BYTES_READ_COUNTER, "Unit": "Bytes"},
+                {"Name": PEAK_MEMORY_METRIC, "Unit": "Kilobytes"},
+            ],
+        }
+    ]
+    assert document[PEAK_MEMORY_METRIC] > 0
+    assert {
+        key: value for key, value in document.items() if key not in ["_aws", PEAK_MEMORY_METRIC]
+    } == {
+        f"{FETCH_PHASE}Time": 750,
+        f"{FETCH_PHASE}Count": 2,
+        BYTES_READ_COUNTER: 1_024,
+    }
+
+
+def should_accumulate_metrics_of_each_validation_phase(subtests: SubTests) -> None:
+    # Given
+    metadata_url = any_s3_url()
+    url_reader = MockJSONURLReader({metadata_url: MINIMAL_VALID_STAC_CATALOG_OBJECT})
+
+    # When
+    with patch("geostore.check_stac_metadata.utils.processing_assets_model_with_meta"), patch(
+        "geostore.check_stac_metadata.utils.LOGGER.warning"
+    ) as logger_mock:
+        validator = STACDatasetValidator(
+            any_hash_key(),
+            url_reader,
+            MockValidationResultFactory(),
+            schema_validators={STAC_TYPE_CATALOG: MagicMock()},
+            slow_log_threshold=0,
+        )
+        validator.run(metadata_url)
+
+    # Then
+    with subtests.test(msg="Counts"):
+        assert validator.metrics.phase_counts[FETCH_PHASE] == 1
+        assert validator.metrics.phase_counts[PARSE_PHASE] == 1
+        assert validator.metrics.phase_counts[get_schema_validation_phase(STAC_TYPE_CATALOG)] == 1
+        # The catalog passing, and the dataset failing for having no assets
+        assert validator.metrics.phase_counts[VALIDATION_RESULTS_WRITE_PHASE] == 2
+    with subtests.test(msg="Bytes read"):
+        assert validator.metrics.counters[BYTES_READ_COUNTER] == len(
+            dumps(MINIMAL_VALID_STAC_CATALOG_OBJECT)
+        )
+    with subtests.test(msg="Slow log"):
+        assert logger_mock.call_args.args == (LOG_MESSAGE_SLOW_METADATA_FILE,)
+        assert logger_mock.call_args.kwargs["extra"]["url"] == metadata_url
@@ -1,30 +1,57 @@
 from copy import deepcopy
+from math import ceil
 from typing import Any, Dict
 from unittest.mock import MagicMock, patch
 
 from jsonschema import ValidationError
+from pynamodb.exceptions import DoesNotExist
 from pytest import mark, raises
 from pytest_subtests import SubTests
 
+from geostore.content_iterator.checksum_shards import (
+    CHECKSUM_SHARD_MAX_ASSET_COUNT,
+    ChecksumShard,
+    pack_checksum_shards,
+)
 from geostore.content_iterator.task import (
+    CHECKSUM_ASSETS_PER_JOB,
+    LAMBDA_CHECKSUM_MAX_TOTAL_SIZE,
+    MAX_ITERATION_SIZE,
+    lambda_handler,
+)
+from geostore.content_iterator_keys import (
+    ARRAY_SIZE_KEY,
+    ASSETS_PER_JOB_KEY,
     ASSETS_TABLE_NAME_KEY,
+    CHECKSUM_CACHE_TABLE_NAME_KEY,
+    CHECKSUM_TIER_BATCH,
+    CHECKSUM_TIER_KEY,
+    CHECKSUM_TIER_LAMBDA,
     CONTENT_KEY,
     FIRST_ITEM_KEY,
     ITERATION_SIZE_KEY,
-    MAX_ITERATION_SIZE,
     NEXT_ITEM_KEY,
+    NO_CHECKSUM_SHARDS,
     RESULTS_TABLE_NAME_KEY,
-    lambda_handler,
+    SHARD_COUNT_KEY,
 )
 from geostore.models import DB_KEY_SEPARATOR
-from geostore.processing_assets_model import ProcessingAssetType, processing_assets_model_with_meta
+from geostore.processing_assets_model import (
+    ProcessingAssetType,
+    ProcessingAssetsModelBase,
+    get_checksum_shard_range_key,
+    processing_assets_model_with_meta,
+)
 from geostore.step_function import get_hash_key
 from geostore.step_function_keys import (
     DATASET_ID_KEY,
+    MAX_FAILURES_KEY,
+    MAX_FAILURES_PER_CHECK_KEY,
     METADATA_URL_KEY,
     S3_ROLE_ARN_KEY,
     VERSION_ID_KEY,
 )
+from geostore.validation_policy import NO_FAILURE_LIMIT
 
 from .aws_utils import (
     any_item_count,
@@ -141,7 +168,7 @@ def should_return_zero_as_first_item_if_no_content(
     processing_assets_model_mock: MagicMock,
 ) -> None:
     event = deepcopy(INITIAL_EVENT)
-    processing_assets_model_mock.return_value.count.return_value = any_item_count()
+    processing_assets_model_mock.return_value.get.return_value.asset_count = any_item_count()
 
     response = lambda_handler(event, any_lambda_context())
 
@@ -153,7 +180,7 @@ def should_return_next_item_as_first_item(processing_assets_model_mock: MagicMoc
     event = deepcopy(SUBSEQUENT_EVENT)
     next_item_index = any_next_item_index()
     event[CONTENT_KEY][NEXT_ITEM_KEY] = next_item_index
-    processing_assets_model_mock.return_value.count.return_value = any_item_count()
+    processing_assets_model_mock.return_value.get.return_value.asset_count = any_item_count()
 
     response = lambda_handler(event, any_lambda_context())
 
@@ -168,21 +195,29 @@ def should_return_minus_one_next_item_if_remaining_item_count_is_less_than_itera
 ) -> None:
     assets_table_name = any_table_name()
     results_table_name = any_table_name()
-    get_param_mock.side_effect = [assets_table_name, results_table_name]
+    checksum_cache_table_name = any_table_name()
+    get_param_mock.side_effect = [assets_table_name, results_table_name, checksum_cache_table_name]
 
     remaining_item_count = MAX_ITERATION_SIZE - 1
     next_item_index = any_next_item_index()
     event = deepcopy(SUBSEQUENT_EVENT)
     event[CONTENT_KEY][NEXT_ITEM_KEY] = next_item_index
-    processing_assets_model_mock.return_value.count.return_value = (
+    processing_assets_model_mock.return_value.get.return_value.asset_count = (
         next_item_index + remaining_item_count
     )
     expected_response = {
         FIRST_ITEM_KEY: str(next_item_index),
         ITERATION_SIZE_KEY: remaining_item_count,
         NEXT_ITEM_KEY: -1,
+        ARRAY_SIZE_KEY: ceil(remaining_item_count / CHECKSUM_ASSETS_PER_JOB),
+        ASSETS_PER_JOB_KEY: str(CHECKSUM_ASSETS_PER_JOB),
+        SHARD_COUNT_KEY: NO_CHECKSUM_SHARDS,
         ASSETS_TABLE_NAME_KEY: assets_table_name,
         RESULTS_TABLE_NAME_KEY: results_table_name,
+        CHECKSUM_CACHE_TABLE_NAME_KEY: checksum_cache_table_name,
+        CHECKSUM_TIER_KEY: CHECKSUM_TIER_BATCH,
+        MAX_FAILURES_KEY: NO_FAILURE_LIMIT,
+        MAX_FAILURES_PER_CHECK_KEY: NO_FAILURE_LIMIT,
     }
 
     response = lambda_handler(event, any_lambda_context())
@@ -198,21 +233,29 @@ def should_return_minus_one_next_item_if_remaining_item_count_matches_iteration_
 ) -> None:
     assets_table_name = any_table_name()
     results_table_name = any_table_name()
-    get_param_mock.side_effect = [assets_table_name, results_table_name]
+    checksum_cache_table_name = any_table_name()
+    get_param_mock.side_effect = [assets_table_name, results_table_name, checksum_cache_table_name]
 
     remaining_item_count = MAX_ITERATION_SIZE
     next_item_index = any_next_item_index()
     event = deepcopy(SUBSEQUENT_EVENT)
     event[CONTENT_KEY][NEXT_ITEM_KEY] = next_item_index
-    processing_assets_model_mock.return_value.count.return_value = (
+    processing_assets_model_mock.return_value.get.return_value.asset_count = (
         next_item_index + remaining_item_count
     )
     expected_response = {
         FIRST_ITEM_KEY: str(next_item_index),
         ITERATION_SIZE_KEY: MAX_ITERATION_SIZE,
         NEXT_ITEM_KEY: -1,
+        ARRAY_SIZE_KEY: MAX_ITERATION_SIZE // CHECKSUM_ASSETS_PER_JOB,
+        ASSETS_PER_JOB_KEY: str(CHECKSUM_ASSETS_PER_JOB),
+        SHARD_COUNT_KEY: NO_CHECKSUM_SHARDS,
         ASSETS_TABLE_NAME_KEY: assets_table_name,
         RESULTS_TABLE_NAME_KEY: results_table_name,
+        CHECKSUM_CACHE_TABLE_NAME_KEY: checksum_cache_table_name,
+        CHECKSUM_TIER_KEY: CHECKSUM_TIER_BATCH,
+        MAX_FAILURES_KEY: NO_FAILURE_LIMIT,
+        MAX_FAILURES_PER_CHECK_KEY: NO_FAILURE_LIMIT,
     }
 
     response = lambda_handler(event, any_lambda_context())
@@ -228,21 +271,29 @@ def should_return_content_when_remaining_item_count_is_more_than_iteration_size(
 ) -> None:
     assets_table_name = any_table_name()
     results_table_name = any_table_name()
-    get_param_mock.side_effect = [assets_table_name, results_table_name]
+    checksum_cache_table_name = any_table_name()
+    get_param_mock.side_effect = [assets_table_name, results_table_name, checksum_cache_table_name]
 
     remaining_item_count = MAX_ITERATION_SIZE + 1
     next_item_index = any_next_item_index()
     event = deepcopy(SUBSEQUENT_EVENT)
     event[CONTENT_KEY][NEXT_ITEM_KEY] = next_item_index
-    processing_assets_model_mock.return_value.count.return_value = (
+    processing_assets_model_mock.return_value.get.return_value.asset_count = (
         next_item_index + remaining_item_count
     )
     expected_response = {
         FIRST_ITEM_KEY: str(next_item_index),
         ITERATION_SIZE_KEY: MAX_ITERATION_SIZE,
         NEXT_ITEM_KEY: next_item_index + MAX_ITERATION_SIZE,
+        ARRAY_SIZE_KEY: MAX_ITERATION_SIZE // CHECKSUM_ASSETS_PER_JOB,
+        ASSETS_PER_JOB_KEY: str(CHECKSUM_ASSETS_PER_JOB),
+        SHARD_COUNT_KEY: NO_CHECKSUM_SHARDS,
         ASSETS_TABLE_NAME_KEY: assets_table_name,
         RESULTS_TABLE_NAME_KEY: results_table_name,
+        CHECKSUM_CACHE_TABLE_NAME_KEY: checksum_cache_table_name,
+        CHECKSUM_TIER_KEY: CHECKSUM_TIER_BATCH,
+        MAX_FAILURES_KEY: NO_FAILURE_LIMIT,
+        MAX_FAILURES_PER_CHECK_KEY: NO_FAILURE_LIMIT,
     }
 
     response = lambda_handler(event, any_lambda_context())
@@ -250,6 +301,229 @@ def should_return_content_when_remaining_item_count_is_more_than_iteration_size(
     assert response == expected_response, response
 
 
+@patch("geostore.content_iterator.task.processing_assets_model_with_meta")
+@patch("geostore.content_iterator.task.get_param")
+def should_choose_lambda_tier_for_small_page_with_recorded_asset_sizes(
+    get_param_mock: MagicMock,
+    processing_assets_model_mock: MagicMock,
+) -> None:
+    # Given a page of small assets, without a sized summary
+    event = deepcopy(INITIAL_EVENT)
+    hash_key = get_hash_key(event[DATASET_ID_KEY], event[VERSION_ID_KEY])
+    get_param_mock.return_value = any_table_name()
+    processing_assets_model_mock.return_value.get.return_value.asset_count = 2
+    processing_assets_model_mock.return_value.get.return_value.size = None
+    processing_assets_model_mock.return_value.batch_get.return_value = [
+        ProcessingAssetsModelBase(
+            hash_key=hash_key,
+            range_key=f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}",
+            url=any_s3_url(),
+            multihash=any_hex_multihash(),
+            size=1,
+        )
+        for index in range(2)
+    ]
+
+    # When
+    response = lambda_handler(event, any_lambda_context())
+
+    # Then
+    assert response[CHECKSUM_TIER_KEY] == CHECKSUM_TIER_LAMBDA
+
+
+@patch("geostore.content_iterator.task.processing_assets_model_with_meta")
+@patch("geostore.content_iterator.task.get_param")
+def should_choose_lambda_tier_for_small_page_of_small_sized_summary(
+    get_param_mock: MagicMock,
+    processing_assets_model_mock: MagicMock,
+) -> None:
+    # Given
+    event = deepcopy(INITIAL_EVENT)
+    get_param_mock.return_value = any_table_name()
+    processing_assets_model_mock.return_value.get.return_value.asset_count = 2
+    processing_assets_model_mock.return_value.get.return_value.size = 2
+
+    # When
+    response = lambda_handler(event, any_lambda_context())
+
+    # Then the assets themselves are not read
+    assert response[CHECKSUM_TIER_KEY] == CHECKSUM_TIER_LAMBDA
+    processing_assets_model_mock.return_value.batch_get.assert_not_called()
+
+
+@patch("geostore.content_iterator.task.processing_assets_model_with_meta")
+@patch("geostore.content_iterator.task.get_param")
+def should_choose_batch_tier_for_small_page_with_unknown_asset_sizes(
+    get_param_mock: MagicMock,
+    processing_assets_model_mock: MagicMock,
+) -> None:
+    # Given
+    event = deepcopy(INITIAL_EVENT)
+    hash_key = get_hash_key(event[DATASET_ID_KEY], event[VERSION_ID_KEY])
+    get_param_mock.return_value = any_table_name()
+    processing_assets_model_mock.return_value.get.return_value.asset_count = 2
+    processing_assets_model_mock.return_value.get.return_value.size = None
+    processing_assets_model_mock.return_value.batch_get.return_value = [
+        ProcessingAssetsModelBase(
+            hash_key=hash_key,
+            range_key=f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}0",
+            url=any_s3_url(),
+            multihash=any_hex_multihash(),
+            size=1,
+        ),
+        ProcessingAssetsModelBase(
+            hash_key=hash_key,
+            range_key=f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}1",
+            url=any_s3_url(),
+            multihash=any_hex_multihash(),
+        ),
+    ]
+
+    # When
+    response = lambda_handler(event, any_lambda_context())
+
+    # Then
+    assert response[CHECKSUM_TIER_KEY] == CHECKSUM_TIER_BATCH
+
+
+@patch("geostore.content_iterator.task.processing_assets_model_with_meta")
+@patch("geostore.content_iterator.task.get_param")
+def should_choose_batch_tier_when_small_page_has_too_many_bytes(
+    get_param_mock: MagicMock,
+    processing_assets_model_mock: MagicMock,
+) -> None:
+    # Given
+    event = deepcopy(INITIAL_EVENT)
+    get_param_mock.return_value = any_table_name()
+    processing_assets_model_mock.return_value.get.return_value.asset_count = 1
+    processing_assets_model_mock.return_value.get.return_value.size = None
+    processing_assets_model_mock.return_value.batch_get.return_value = [
+        ProcessingAssetsModelBase(
+            hash_key=get_hash_key(event[DATASET_ID_KEY], event[VERSION_ID_KEY]),
+            range_key=f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}0",
+            url=any_s3_url(),
+            multihash=any_hex_multihash(),
+            size=LAMBDA_CHECKSUM_MAX_TOTAL_SIZE + 1,
+        )
+    ]
+
+    # When
+    response = lambda_handler(event, any_lambda_context())
+
+    # Then
+    assert response[CHECKSUM_TIER_KEY] == CHECKSUM_TIER_BATCH
+
+
+@patch("geostore.content_iterator.task.processing_assets_model_with_meta")
+@patch("geostore.content_iterator.task.get_param")
+def should_count_assets_when_processing_assets_summary_is_missing(
+    get_param_mock: MagicMock,
+    processing_assets_model_mock: MagicMock,
+    subtests: SubTests,
+) -> None:
+    # Given
+    event = deepcopy(INITIAL_EVENT)
+    get_param_mock.return_value = any_table_name()
+    processing_assets_model_mock.return_value.get.side_effect = DoesNotExist()
+    processing_assets_model_mock.return_value.count.return_value = MAX_ITERATION_SIZE + 1
+
+    # When
+    response = lambda_handler(event, any_lambda_context())
+
+    # Then
+    with subtests.test(msg="Counted"):
+        assert processing_assets_model_mock.return_value.count.call_args.kwargs[
+            "hash_key"
+        ] == get_hash_key(event[DATASET_ID_KEY], event[VERSION_ID_KEY])
+    with subtests.test(msg="Iteration size"):
+        assert response[ITERATION_SIZE_KEY] == MAX_ITERATION_SIZE
+
+
+@patch("geostore.content_iterator.task.processing_assets_model_with_meta")
+@patch("geostore.content_iterator.task.get_param")
+def should_accept_output_of_previous_iteration_as_content(
+    get_param_mock: MagicMock,
+    processing_assets_model_mock: MagicMock,
+) -> None:
+    # Given the output of the first iteration, as placed in the content by the state machine
+    get_param_mock.return_value = any_table_name()
+    processing_assets_model_mock.return_value.get.return_value.asset_count = MAX_ITERATION_SIZE + 1
+    processing_assets_model_mock.return_value.get.return_value.size = None
+    event = {
+        **INITIAL_EVENT,
+        CONTENT_KEY: lambda_handler(deepcopy(INITIAL_EVENT), any_lambda_context()),
+    }
+
+    # When
+    response = lambda_handler(event, any_lambda_context())
+
+    # Then
+    assert (response[FIRST_ITEM_KEY], response[NEXT_ITEM_KEY]) == (str(MAX_ITERATION_SIZE), -1)
+
+
+def should_pack_largest_assets_first_into_least_full_shards() -> None:
+    indexed_sizes = [(0, 1), (1, 10), (2, 4), (3, 5), (4, 1), (5, 3)]
+
+    assert pack_checksum_shards(indexed_sizes, 2) == [
+        ChecksumShard([0, 1, 4], 12),
+        ChecksumShard([2, 3, 5], 12),
+    ]
+
+
+@patch("geostore.content_iterator.task.checksum_shard_model_with_meta")
+@patch("geostore.content_iterator.task.processing_assets_model_with_meta")
+@patch("geostore.content_iterator.task.get_param")
+def should_plan_checksum_shards_for_batch_page_with_recorded_asset_sizes(
+    get_param_mock: MagicMock,
+    processing_assets_model_mock: MagicMock,
+    checksum_shard_model_mock: MagicMock,
+    subtests: SubTests,
+) -> None:
+    # Given a page with one large asset and many small ones, all with recorded sizes
+    event = deepcopy(INITIAL_EVENT)
+    hash_key = get_hash_key(event[DATASET_ID_KEY], event[VERSION_ID_KEY])
+    get_param_mock.return_value = any_table_name()
+    asset_count = CHECKSUM_SHARD_MAX_ASSET_COUNT * 2
+    processing_assets_model_mock.return_value.get.return_value.asset_count = asset_count
+    processing_assets_model_mock.return_value.get.return_value.size = (asset_count - 1) * 2
+    processing_assets_model_mock.return_value.batch_get.return_value = [
+        ProcessingAssetsModelBase(
+            hash_key=hash_key,
+            range_key=f"{ProcessingAssetType.DATA.value}{DB_KEY_SEPARATOR}{index}",
+            url=any_s3_url(),
+            multihash=any_hex_multihash(),
+            size=asset_count - 1 if index == 0 else 1,
+        )
+        for index in range(asset_count)
+    ]
+    batch_mock = checksum_shard_model_mock.return_value.batch_write.return_value.__enter__
+    checksum_shard_model = checksum_shard_model_mock.return_value
+
+    # When
+    response = lambda_handler(event, any_lambda_context())
+
+    # Then the large asset has a shard to itself
+    with subtests.test(msg="Jobs"):
+        assert (response[ARRAY_SIZE_KEY], response[SHARD_COUNT_KEY]) == (2, "2")
+    with subtests.test(msg="Shards"):
+        assert [mock_call.kwargs for mock_call in checksum_shard_model.call_args_list] == [
+            {
+                "hash_key": hash_key,
+                "range_key": get_checksum_shard_range_key(0, 0),
+                "indexes": [0],
+                "size": asset_count - 1,
+            },
+            {
+                "hash_key": hash_key,
+                "range_key": get_checksum_shard_range_key(0, 1),
+                "indexes": list(range(1, asset_count)),
+                "size": asset_count - 1,
+            },
+        ]
+    with subtests.test(msg="Saved"):
+        assert batch_mock.return_value.save.call_count == 2
+
+
 @mark.infrastructure
 def should_count_only_asset_files() -> None:
     # Given a single metadata and asset entry in the database
@@ -273,3 +547,40 @@ def should_count_only_asset_files() -> None:
 
     # Then the iteration size should be one
     assert response[ITERATION_SIZE_KEY] == 1
+
+
+@patch("geostore.content_iterator.task.validation_results_model_with_meta")
+@patch("geostore.content_iterator.task.processing_assets_model_with_meta")
+@patch("geostore.content_iterator.task.get_param")
+def should_stop_iterating_once_failure_limit_is_reached(
+    get_param_mock: MagicMock,
+    processing_assets_model_mock: MagicMock,
+    validation_results_model_mock: MagicMock,
+    subtests: SubTests,
+) -> None:
+    # Given
+    event = deepcopy(SUBSEQUENT_EVENT)
+    event[MAX_FAILURES_KEY] = 2
+    get_param_mock.return_value = any_table_name()
+    processing_assets_model_mock.return_value.get.return_value.asset_count = (
+        event[CONTENT_KEY][NEXT_ITEM_KEY] + MAX_ITERATION_SIZE * 2
+    )
+    get_mock = validation_results_model_mock.return_value.get
+    get_mock.return_value.failure_count = 2
+
+    # When
+    response = lambda_handler(event, any_lambda_context())
+
+    # Then
+    with subtests.test(msg="Empty last page"):
+        assert (
+            response[ITERATION_SIZE_KEY],
+            response[NEXT_ITEM_KEY],
+            response[CHECKSUM_TIER_KEY],
+        ) == (0, -1, CHECKSUM_TIER_LAMBDA)
+    with subtests.test(msg="Counted failures"):
+        assert get_mock.call_args.args[0] == get_hash_key(
+            event[DATASET_ID_KEY], event[VERSION_ID_KEY]
+        )
+    with subtests.test(msg="Parameters"):
+        assert response[MAX_FAILURES_KEY] == "2"
@@ -17,6 +17,8 @@ from geostore.dataset_versions import entrypoint
 from geostore.dataset_versions.create import create_dataset_version
 from geostore.step_function_keys import (
     DATASET_ID_SHORT_KEY,
+    MAX_FAILURES_KEY,
+    MAX_FAILURES_PER_CHECK_KEY,
     METADATA_URL_KEY,
     NOW_KEY,
     S3_ROLE_ARN_KEY,
@@ -54,6 +56,26 @@ def should_return_error_when_missing_required_property(subtests: SubTests) -> No
             }
 
 
+def should_return_error_when_failure_limit_is_not_positive(subtests: SubTests) -> None:
+    for key in [MAX_FAILURES_KEY, MAX_FAILURES_PER_CHECK_KEY]:
+        with subtests.test(msg=key):
+            body = {
+                DATASET_ID_SHORT_KEY: any_dataset_id(),
+                METADATA_URL_KEY: any_s3_url(),
+                S3_ROLE_ARN_KEY: any_role_arn(),
+                key: 0,
+            }
+
+            response = entrypoint.lambda_handler(
+                {HTTP_METHOD_KEY: "POST", BODY_KEY: body}, any_lambda_context()
+            )
+
+            assert response == {
+                STATUS_CODE_KEY: HTTPStatus.BAD_REQUEST,
+                BODY_KEY: {MESSAGE_KEY: "Bad Request: 0 is less than the minimum of 1"},
+            }
+
+
 @mark.infrastructure
 def should_return_error_if_dataset_id_does_not_exist_in_db() -> None:
     body = {
@@ -1,8 +1,12 @@
-from io import StringIO
-from json import dumps
+from io import BytesIO, StringIO
+from json import dumps, loads
+from os.path import basename
+from typing import Any, Dict
 from unittest.mock import MagicMock, patch
 from urllib.parse import quote
 
+from pytest_subtests import SubTests
+
 from geostore.import_dataset_file import (
     INVOCATION_ID_KEY,
     INVOCATION_SCHEMA_VERSION_KEY,
@@ -18,8 +22,13 @@ from geostore.import_dataset_file import (
     TREAT_MISSING_KEYS_AS_KEY,
 )
 from geostore.import_dataset_keys import NEW_KEY_KEY, ORIGINAL_KEY_KEY, TARGET_BUCKET_NAME_KEY
-from geostore.import_metadata_file.task import S3_BODY_KEY, lambda_handler
-from geostore.stac_format import STAC_ASSETS_KEY, STAC_HREF_KEY
+from geostore.import_metadata_file.task import (
+    S3_BODY_KEY,
+    lambda_handler,
+    write_metadata_with_basename_hrefs,
+)
+from geostore.json_streaming import JSONStreamReader
+from geostore.stac_format import STAC_ASSETS_KEY, STAC_HREF_KEY, STAC_LINKS_KEY
 from geostore.step_function_keys import S3_ROLE_ARN_KEY
 
 from .aws_utils import (
@@ -88,3 +97,41 @@ def should_return_success_response(
         ],
         TREAT_MISSING_KEYS_AS_KEY: RESULT_CODE_PERMANENT_FAILURE,
     }
+
+
+def should_write_metadata_like_json_dumps_of_the_loaded_metadata(subtests: SubTests) -> None:
+    stac_objects: Dict[str, Dict[str, Any]] = {
+        "Links and assets": {
+            "type": "Collection",
+            STAC_LINKS_KEY: [
+                {STAC_HREF_KEY: any_s3_url(), "rel": "item"},
+                {STAC_HREF_KEY: f"./{any_safe_file_path()}", "rel": "child", "title": "ü 中"},
+            ],
+            STAC_ASSETS_KEY: {
+                any_asset_name(): {STAC_HREF_KEY: any_s3_url(), "file:size": 1.5e300},
+                any_asset_name(): {STAC_HREF_KEY: any_safe_file_path(), "roles": []},
+            },
+            "extent": {"spatial": {"bbox": [[-180, -90.25, 180, 90.5]]}},
+            "nested": {"escaped": 'quote " and backslash \\', "empty": {}, "null": None},
+        },
+        "No links or assets": {"type": "Catalog", "description": "\u2028"},
+        "Empty links and assets": {STAC_LINKS_KEY: [], STAC_ASSETS_KEY: {}},
+    }
+
+    for name, stac_object in stac_objects.items():
+        for encoding in ["utf-8", "utf-16"]:
+            contents = dumps(stac_object, ensure_ascii=False, indent=2).encode(encoding)
+            expected_metadata = loads(contents)
+            for item in [
+                *expected_metadata.get(STAC_ASSETS_KEY, {}).values(),
+                *expected_metadata.get(STAC_LINKS_KEY, []),
+            ]:
+                item[STAC_HREF_KEY] = basename(item[STAC_HREF_KEY])
+            metadata_file = BytesIO()
+
+            write_metadata_with_basename_hrefs(
+                JSONStreamReader(BytesIO(contents), chunk_size=7), metadata_file
+            )
+
+            with subtests.test(msg=f"{name} in {encoding}"):
+                assert metadata_file.getvalue() == dumps(expected_metadata).encode()
@@ -0,0 +1,103 @@
+from io import BytesIO, StringIO
+from json import JSONDecodeError, dumps, loads
+from typing import Any, List, Tuple
+
+from pytest import raises
+from pytest_subtests import SubTests
+
+from geostore.json_streaming import JSONStreamReader
+
+
+def read_all(reader: JSONStreamReader) -> Any:
+    if reader.peek() == "{":
+        return {key: read_all(reader) for key in reader.read_object_members()}
+    if reader.peek() == "[":
+        return [read_all(reader) for _ in reader.read_array_elements()]
+    return reader.read_value()
+
+
+def should_read_documents_split_into_chunks_anywhere(subtests: SubTests) -> None:
+    document = {
+        "empty object": {},
+        "empty array": [],
+        "numbers": [0, -12345678901234567890, 1.5e-300, 0.25],
+        "literals": [True, False, None],
+        "nested": {"strings": ["", 'quote " and backslash \\', "ü 中"]},
+    }
+    contents = dumps(document, ensure_ascii=False, indent=1).encode()
+
+    for chunk_size in range(1, 8):
+        with subtests.test(msg=chunk_size):
+            reader = JSONStreamReader(BytesIO(contents), chunk_size=chunk_size)
+
+            assert read_all(reader) == document
+            reader.read_end()
+
+
+def should_read_text_streams() -> None:
+    reader = JSONStreamReader(StringIO('{"key": ["value"]}'), chunk_size=3)
+
+    assert read_all(reader) == {"key": ["value"]}
+
+
+def should_read_values_longer_than_the_chunk_size() -> None:
+    value = {"key": ["a" * 1_000, list(range(1_000))]}
+    reader = JSONStreamReader(StringIO(dumps([value])), chunk_size=10)
+
+    assert [reader.read_value() for _ in reader.read_array_elements()] == [value]
+
+
+def should_decode_values_with_object_pairs_hook() -> None:
+    object_pairs: List[List[Tuple[str, Any]]] = []
+
+    def object_pairs_hook(pairs: List[Tuple[str, Any]]) -> Any:
+        object_pairs.append(pairs)
+        return dict(pairs)
+
+    reader = JSONStreamReader(StringIO('[{"key": 1, "key": 2}]'), object_pairs_hook)
+    for _ in reader.read_array_elements():
+        reader.read_value()
+
+    assert object_pairs == [[("key", 1), ("key", 2)]]
+
+
+def should_raise_json_decode_error_for_invalid_documents(subtests: SubTests) -> None:
+    for contents in ['{"key": 1,}', '{"key" 1}', "[1 2]", '{"key": tru}', "[1,", "{", "1 2", ""]:
+        with subtests.test(msg=contents), raises(JSONDecodeError):
+            reader = JSONStreamReader(StringIO(contents), chunk_size=2)
+            read_all(reader)
+            reader.read_end()
+
+
+def should_report_error_positions_in_the_document_like_json_loads(subtests: SubTests) -> None:
+    for contents in [
+        '{"key": 1,\n "other": tru}',
+        "[1,\n 2\n 3]",
+        '{"key": [1, 2],\n\n  "other" 1}',
+        '{"key": {"nested": [1,\n {"other": 2,\n "last": [3 4]}]}}',
+        '{"key": "value"}\n extra',
+    ]:
+        with raises(JSONDecodeError) as expected_error:
+            loads(contents)
+
+        for chunk_size in range(1, 6):
+            with subtests.test(msg=f"{contents} in chunks of {chunk_size}"):
+                with raises(JSONDecodeError) as actual_error:
+                    reader = JSONStreamReader(StringIO(contents), chunk_size=chunk_size)
+                    read_all(reader)
+                    reader.read_end()
+
+                assert str(actual_error.value) == str(expected_error.value)
+
+
+def should_detect_the_encoding_of_binary_streams_like_json_loads(subtests: SubTests) -> None:
+    document = {"key": ["ü 中", 1.5, None]}
+    for encoding in ["utf-8", "utf-8-sig", "utf-16", "utf-16-be", "utf-32", "utf-32-le"]:
+        contents = dumps(document, ensure_ascii=False).encode(encoding)
+
+        for chunk_size in range(1, 6):
+            with subtests.test(msg=f"{encoding} in chunks of {chunk_size}"):
+                reader = JSONStreamReader(BytesIO(contents), chunk_size=chunk_size)
+
+                assert read_all(reader) == loads(contents)
+                reader.read_end()
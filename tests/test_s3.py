@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pytest_subtests import SubTests
+
+from geostore.s3 import get_s3_client_for_role
+
+from .aws_utils import any_role_arn
+
+
+@pytest.fixture(autouse=True)
+def clear_s3_client_cache() -> Iterator[None]:
+    """Keep clients cached by other tests out of these tests, and vice versa."""
+    get_s3_client_for_role.cache_clear()
+    yield
+    get_s3_client_for_role.cache_clear()
+
+
+@patch("geostore.s3.STS_CLIENT")
+def should_reuse_client_per_role(sts_client_mock: MagicMock, subtests: SubTests) -> None:
+    # Given
+    sts_client_mock.assume_role.return_value = {
+        "Credentials": {
+            "AccessKeyId": "access key",
+            "SecretAccessKey": "secret key",
+            "SessionToken": "token",
+            "Expiration": datetime.now(tz=timezone.utc) + timedelta(hours=1),
+        }
+    }
+    role_arn = any_role_arn()
+
+    # When
+    first_client = get_s3_client_for_role(role_arn)
+    second_client = get_s3_client_for_role(role_arn)
+    other_role_client = get_s3_client_for_role(any_role_arn())
+
+    # Then
+    with subtests.test(msg="Same role"):
+        assert first_client is second_client
+
+    with subtests.test(msg="Other role"):
+        assert other_role_client is not first_client
+
+    with subtests.test(msg="Assume each role once"):
+        assert sts_client_mock.assume_role.call_count == 2
@@ -0,0 +1,195 @@
+from unittest.mock import MagicMock, call, patch
+
+from pytest import raises
+from pytest_subtests import SubTests
+
+from geostore.api_keys import MESSAGE_KEY
+from geostore.check import Check
+from geostore.step_function_keys import MAX_FAILURES_KEY, MAX_FAILURES_PER_CHECK_KEY
+from geostore.validation_policy import (
+    FAILURE_COUNT_ID_PREFIX,
+    SUPPRESSED_FAILURE_COUNT_KEY,
+    TOTAL_FAILURE_COUNTER,
+    FailureLimitReachedError,
+    LimitedValidationResultFactory,
+    ValidationPolicy,
+    apply_validation_policy,
+    check_failure_limit,
+    get_validation_policy,
+    increment_failure_count,
+    is_version_failure_limit_reached,
+)
+from geostore.validation_results_model import ValidationResult
+
+from .aws_utils import MockFailureCounters, MockValidationResultFactory, any_s3_url
+from .dynamodb_generators import any_hash_key
+from .general_generators import any_error_message
+
+
+def should_not_limit_results_without_limits() -> None:
+    validation_result_factory = MockValidationResultFactory()
+
+    assert (
+        apply_validation_policy(validation_result_factory, ValidationPolicy())
+        is validation_result_factory
+    )
+
+
+def should_read_limits_given_as_numbers_or_parameter_strings(subtests: SubTests) -> None:
+    with subtests.test(msg="Numbers"):
+        assert get_validation_policy(
+            {MAX_FAILURES_KEY: 5, MAX_FAILURES_PER_CHECK_KEY: None}
+        ) == ValidationPolicy(5, None)
+    with subtests.test(msg="Strings"):
+        assert get_validation_policy(
+            {MAX_FAILURES_KEY: "0", MAX_FAILURES_PER_CHECK_KEY: "2"}
+        ) == ValidationPolicy(None, 2)
+    with subtests.test(msg="Parameters"):
+        assert ValidationPolicy(None, 2).as_parameters() == {
+            MAX_FAILURES_KEY: "0",
+            MAX_FAILURES_PER_CHECK_KEY: "2",
+        }
+
+
+@patch("geostore.validation_policy.increment_failure_count", new_callable=MockFailureCounters)
+def should_summarise_failures_past_limit_of_each_check(
+    _increment_failure_count_mock: MockFailureCounters, subtests: SubTests
+) -> None:
+    # Given
+    validation_result_factory = MockValidationResultFactory()
+    limited_validation_result_factory = LimitedValidationResultFactory(
+        validation_result_factory, ValidationPolicy(max_failures_per_check=1)
+    )
+    urls = [any_s3_url() for _ in range(4)]
+    details = [{MESSAGE_KEY: any_error_message()} for _ in urls]
+
+    # When
+    for url, url_details in zip(urls, details):
+        limited_validation_result_factory.save(
+            url, Check.CHECKSUM, ValidationResult.FAILED, details=url_details
+        )
+    limited_validation_result_factory.save(urls[0], Check.STAGING_ACCESS, ValidationResult.FAILED)
+    limited_validation_result_factory.save(urls[1], Check.JSON_SCHEMA, ValidationResult.PASSED)
+
+    # Then
+    with subtests.test(msg="Saved before summary"):
+        assert validation_result_factory.save.mock_calls == [
+            call(urls[0], Check.CHECKSUM, ValidationResult.FAILED, details=details[0]),
+            call(urls[0], Check.STAGING_ACCESS, ValidationResult.FAILED, details=None),
+            call(urls[1], Check.JSON_SCHEMA, ValidationResult.PASSED, details=None),
+        ]
+
+    validation_result_factory.reset_mock()
+    limited_validation_result_factory.save_suppressed_failures()
+
+    with subtests.test(msg="Summary"):
+        assert validation_result_factory.save.mock_calls == [
+            call(
+                urls[1],
+                Check.CHECKSUM,
+                ValidationResult.FAILED,
+                details={**details[1], SUPPRESSED_FAILURE_COUNT_KEY: 3},
+            )
+        ]
+
+
+@patch("geostore.validation_policy.increment_failure_count", new_callable=MockFailureCounters)
+def should_stop_saving_failures_once_failure_limit_is_reached(
+    _increment_failure_count_mock: MockFailureCounters, subtests: SubTests
+) -> None:
+    # Given
+    validation_result_factory = MockValidationResultFactory()
+    limited_validation_result_factory = LimitedValidationResultFactory(
+        validation_result_factory, ValidationPolicy(max_failures=2)
+    )
+    urls = [any_s3_url() for _ in range(3)]
+
+    # When
+    limited_validation_result_factory.save(urls[0], Check.CHECKSUM, ValidationResult.FAILED)
+    check_failure_limit(limited_validation_result_factory)
+    limited_validation_result_factory.save(urls[1], Check.JSON_SCHEMA, ValidationResult.FAILED)
+    limited_validation_result_factory.save(urls[2], Check.CHECKSUM, ValidationResult.FAILED)
+
+    # Then
+    with subtests.test(msg="Saved"):
+        assert [
+            save_call.args[0] for save_call in validation_result_factory.save.mock_calls
+        ] == urls[:2]
+    with subtests.test(msg="Stopping"), raises(FailureLimitReachedError):
+        check_failure_limit(limited_validation_result_factory)
+
+
+@patch("geostore.validation_policy.increment_failure_count", new_callable=MockFailureCounters)
+def should_share_failure_limit_with_other_jobs_of_dataset_version(
+    increment_failure_count_mock: MockFailureCounters, subtests: SubTests
+) -> None:
+    # Given another job of the dataset version already recorded two failures
+    increment_failure_count_mock.failure_counts[TOTAL_FAILURE_COUNTER] = 2
+    validation_result_factory = MockValidationResultFactory()
+    limited_validation_result_factory = LimitedValidationResultFactory(
+        validation_result_factory, ValidationPolicy(max_failures=3)
+    )
+    urls = [any_s3_url() for _ in range(2)]
+
+    # When
+    for url in urls:
+        limited_validation_result_factory.save(url, Check.CHECKSUM, ValidationResult.FAILED)
+    limited_validation_result_factory.save_suppressed_failures()
+
+    # Then
+    with subtests.test(msg="Saved"):
+        assert validation_result_factory.save.mock_calls == [
+            call(urls[0], Check.CHECKSUM, ValidationResult.FAILED, details=None),
+            call(
+                urls[1],
+                Check.CHECKSUM,
+                ValidationResult.FAILED,
+                details={SUPPRESSED_FAILURE_COUNT_KEY: 1},
+            ),
+        ]
+    with subtests.test(msg="Stopping"), raises(FailureLimitReachedError):
+        check_failure_limit(limited_validation_result_factory)
+
+
+def should_increment_failure_counter_of_dataset_version() -> None:
+    validation_result_factory = MockValidationResultFactory()
+    counter_mock = validation_result_factory.validation_results_model.return_value
+    counter_mock.failure_count = 2
+
+    assert increment_failure_count(validation_result_factory, Check.CHECKSUM.value) == 2
+    validation_result_factory.validation_results_model.assert_called_once_with(
+        pk=validation_result_factory.hash_key,
+        sk=f"{FAILURE_COUNT_ID_PREFIX}{Check.CHECKSUM.value}",
+    )
+    counter_mock.update.assert_called_once()
+
+
+def should_count_failures_of_dataset_version_up_to_limit(subtests: SubTests) -> None:
+    validation_results_model = MagicMock()
+    get_mock = validation_results_model.get
+    get_mock.return_value.failure_count = 3
+    hash_key = any_hash_key()
+
+    with subtests.test(msg="Without limit"):
+        assert not is_version_failure_limit_reached(
+            validation_results_model, hash_key, ValidationPolicy()
+        )
+        get_mock.assert_not_called()
+    with subtests.test(msg="Reached"):
+        assert is_version_failure_limit_reached(
+            validation_results_model, hash_key, ValidationPolicy(max_failures=3)
+        )
+        assert get_mock.call_args.args == (
+            hash_key,
+            f"{FAILURE_COUNT_ID_PREFIX}{TOTAL_FAILURE_COUNTER}",
+        )
+    with subtests.test(msg="Not reached"):
+        assert not is_version_failure_limit_reached(
+            validation_results_model, hash_key, ValidationPolicy(max_failures=4)
+        )
+    with subtests.test(msg="No failures"):
+        validation_results_model.DoesNotExist = ValueError
+        get_mock.side_effect = ValueError
+        assert not is_version_failure_limit_reached(
+            validation_results_model, hash_key, ValidationPolicy(max_failures=1)
+        )
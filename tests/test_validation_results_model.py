@@ -0,0 +1,123 @@
+from threading import Event, Thread
+from typing import List
+from unittest.mock import MagicMock, patch
+
+from pytest_subtests import SubTests
+
+from geostore.check import Check
+from geostore.validation_results_model import (
+    BufferedValidationResultFactory,
+    ValidationResult,
+    ValidationResultsModelBase,
+)
+
+from .aws_utils import any_s3_url, any_table_name
+from .dynamodb_generators import any_hash_key
+
+
+@patch("geostore.validation_results_model.validation_results_model_with_meta")
+def should_write_buffered_validation_results_in_batches(
+    validation_results_model_mock: MagicMock, subtests: SubTests
+) -> None:
+    # Given
+    validation_results_model_mock.return_value.side_effect = ValidationResultsModelBase
+    batch_mock = validation_results_model_mock.return_value.batch_write.return_value.__enter__
+    first_url = any_s3_url()
+    second_url = any_s3_url()
+
+    with BufferedValidationResultFactory(
+        any_hash_key(), any_table_name(), flush_size=2, flush_interval=3600
+    ) as validation_result_factory:
+        # When
+        validation_result_factory.save(first_url, Check.CHECKSUM, ValidationResult.PASSED)
+
+        with subtests.test(msg="Buffered"):
+            batch_mock.return_value.save.assert_not_called()
+
+        validation_result_factory.save(second_url, Check.CHECKSUM, ValidationResult.PASSED)
+
+        # Then
+        with subtests.test(msg="Written when full"):
+            assert batch_mock.return_value.save.call_count == 2
+
+        validation_result_factory.save(first_url, Check.STAGING_ACCESS, ValidationResult.FAILED)
+
+    with subtests.test(msg="Written when leaving context"):
+        assert batch_mock.return_value.save.call_count == 3
+
+
+@patch("geostore.validation_results_model.validation_results_model_with_meta")
+def should_write_only_last_buffered_result_per_url_and_check(
+    validation_results_model_mock: MagicMock,
+) -> None:
+    # Given
+    validation_results_model_mock.return_value.side_effect = ValidationResultsModelBase
+    batch_mock = validation_results_model_mock.return_value.batch_write.return_value.__enter__
+    url = any_s3_url()
+
+    # When
+    with BufferedValidationResultFactory(
+        any_hash_key(), any_table_name(), flush_interval=3600
+    ) as validation_result_factory:
+        validation_result_factory.save(url, Check.CHECKSUM, ValidationResult.FAILED)
+        validation_result_factory.save(url, Check.CHECKSUM, ValidationResult.PASSED)
+
+    # Then
+    batch_mock.return_value.save.assert_called_once()
+    assert batch_mock.return_value.save.call_args.args[0].result == ValidationResult.PASSED.value
+
+
+@patch("geostore.validation_results_model.validation_results_model_with_meta")
+def should_keep_saving_results_while_writing_a_batch(
+    validation_results_model_mock: MagicMock, subtests: SubTests
+) -> None:
+    # Given a batch which is being written
+    validation_results_model_mock.return_value.side_effect = ValidationResultsModelBase
+    batch_mock = validation_results_model_mock.return_value.batch_write.return_value.__enter__
+    savers: List[Thread] = []
+
+    with BufferedValidationResultFactory(
+        any_hash_key(), any_table_name(), flush_size=1, flush_interval=3600
+    ) as validation_result_factory:
+
+        def save_from_other_thread(_item: ValidationResultsModelBase) -> None:
+            if not savers:
+                saver = Thread(
+                    target=validation_result_factory.save,
+                    args=(any_s3_url(), Check.CHECKSUM, ValidationResult.PASSED),
+                )
+                savers.append(saver)
+                saver.start()
+                saver.join(timeout=10)
+
+        batch_mock.return_value.save.side_effect = save_from_other_thread
+
+        # When
+        validation_result_factory.save(any_s3_url(), Check.CHECKSUM, ValidationResult.PASSED)
+
+        # Then
+        with subtests.test(msg="Saved meanwhile"):
+            assert not savers[0].is_alive()
+
+    with subtests.test(msg="Written when leaving context"):
+        assert batch_mock.return_value.save.call_count == 2
+
+
+@patch("geostore.validation_results_model.validation_results_model_with_meta")
+def should_write_buffered_validation_results_after_flush_interval(
+    validation_results_model_mock: MagicMock,
+) -> None:
+    # Given
+    validation_results_model_mock.return_value.side_effect = ValidationResultsModelBase
+    batch_mock = validation_results_model_mock.return_value.batch_write.return_value.__enter__
+    written = Event()
+    batch_mock.return_value.save.side_effect = lambda _item: written.set()
+
+    with BufferedValidationResultFactory(
+        any_hash_key(), any_table_name(), flush_interval=0.1
+    ) as validation_result_factory:
+        # When
+        validation_result_factory.save(any_s3_url(), Check.CHECKSUM, ValidationResult.PASSED)
+
+        # Then
+        assert written.wait(timeout=10)